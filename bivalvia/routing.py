@@ -14,4 +14,8 @@ websocket_urlpatterns = [
     # WebSocket para enviar datos al dashboard (browser)
     # URL: ws://localhost:8000/ws/dashboard/1/
     re_path(r'ws/dashboard/(?P<sector_id>\d+)/$', consumers.DashboardConsumer.as_asgi()),
+    
+    # WebSocket multiplexado: un socket, suscripción a varios sectores/zonas
+    # URL: ws://localhost:8000/ws/dashboard/
+    re_path(r'ws/dashboard/$', consumers.DashboardConsumer.as_asgi()),
 ]
\ No newline at end of file
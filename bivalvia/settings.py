@@ -7,7 +7,7 @@ ACTUALIZADO para soportar Django Channels y WebSockets.
 import os
 import dj_database_url
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 LOGIN_URL = '/'
 
@@ -114,6 +114,26 @@ else:
         }
     }
 
+# ============================================================================
+# CACHE CONFIGURATION
+# ============================================================================
+
+if IS_CLOUD:
+    # Compartida entre los procesos de daphne (misma instancia que el channel layer)
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL', default='redis://localhost:6379'),
+        }
+    }
+else:
+    # LOCAL: un solo proceso, alcanza con memoria
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # ============================================================================
 # DATABASE CONFIGURATION
 # ============================================================================
@@ -125,6 +145,14 @@ DATABASES = {
     )
 }
 
+# SQLite (LOCAL): modo WAL para que las lecturas largas (exportaciones en
+# el pool de procesos) no bloqueen las escrituras de la ingesta ni la sesión
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'init_command': 'PRAGMA journal_mode=WAL;',
+        'timeout': 20,
+    })
+
 # ============================================================================
 # API CONFIGURATION (para backward compatibility con REST)
 # ============================================================================
@@ -146,6 +174,117 @@ else:
     # En cloud no necesitamos esta variable
     CLOUD_WS_URL = None
 
+# Outbox persistente con las lecturas pendientes de subir al cloud (LOCAL)
+OUTBOX_PATH = config('OUTBOX_PATH', default=str(BASE_DIR / 'outbox.sqlite3'))
+
+# Lecturas por lote al drenar el outbox
+OUTBOX_TAMANO_LOTE = config('OUTBOX_TAMANO_LOTE', default=200, cast=int)
+
+# Lecturas enviadas al cloud sin ack (ventana del uplink)
+UPLINK_VENTANA = config('UPLINK_VENTANA', default=2000, cast=int)
+
+# Formato de los frames del uplink: 'json' o 'msgpack' (binario compacto,
+# ver dashboard.protocolo; se negocia con el cloud al conectar)
+CLOUD_WS_FORMATO = config('CLOUD_WS_FORMATO', default='json')
+
+# ============================================================================
+# SERIAL (Arduino conectado al LOCAL)
+# ============================================================================
+
+SERIAL_PORT = config('SERIAL_PORT', default='/dev/ttyACM0')  # Windows=COM3, Linux=/dev/ttyACM0
+SERIAL_BAUD_RATE = config('SERIAL_BAUD_RATE', default=9600, cast=int)
+SERIAL_TIMEOUT = config('SERIAL_TIMEOUT', default=3, cast=float)
+
+# Varios Arduinos en el mismo LOCAL: "puerto=sector_id" separados por coma
+# (p.ej. "/dev/ttyACM0=1,/dev/ttyACM1=2"). Vacío = solo SERIAL_PORT, y el
+# sector se elige al iniciar la grabación.
+SERIAL_DISPOSITIVOS = config('SERIAL_DISPOSITIVOS', default='', cast=Csv())
+
+# Segundos entre muestras del thread de adquisición
+SERIAL_INTERVALO = config('SERIAL_INTERVALO', default=5.0, cast=float)
+
+# Muestras que se guardan en memoria (720 = 1 hora a 5 s)
+SERIAL_CAPACIDAD_BUFFER = config('SERIAL_CAPACIDAD_BUFFER', default=720, cast=int)
+
+# ============================================================================
+# INGESTA (buffer write-behind del SensorConsumer)
+# ============================================================================
+
+# Lecturas acumuladas antes de forzar un flush a la base de datos
+INGESTA_TAMANO_LOTE = config('INGESTA_TAMANO_LOTE', default=500, cast=int)
+
+# Segundos máximos que una lectura espera en el buffer
+INGESTA_INTERVALO_FLUSH = config('INGESTA_INTERVALO_FLUSH', default=0.25, cast=float)
+
+# Segundos que se cachea la última lectura de cada sector (ver dashboard.ultimas).
+# La ingesta invalida la entrada al escribir; el TTL solo acota lo que puede
+# quedar desactualizada una cache por proceso (LocMem)
+ULTIMA_LECTURA_CACHE_TTL = config('ULTIMA_LECTURA_CACHE_TTL', default=60, cast=int)
+
+# ============================================================================
+# HISTORIAL: PARTICIONES Y RETENCIÓN (ver dashboard.particiones)
+# ============================================================================
+
+# Meses futuros con partición ya creada (PostgreSQL; comando `particiones`)
+PARTICIONES_MESES_ADELANTE = config('PARTICIONES_MESES_ADELANTE', default=3, cast=int)
+
+# Meses de lecturas crudas que se conservan, contando el actual (0 = todo).
+# Los agregados por minuto/hora/día no se borran
+LECTURAS_RETENCION_MESES = config('LECTURAS_RETENCION_MESES', default=0, cast=int)
+
+# Filas por DELETE cuando no hay particiones (SQLite en LOCAL)
+RETENCION_TAMANO_LOTE = config('RETENCION_TAMANO_LOTE', default=5000, cast=int)
+
+# Compactación (comando `compactar_lecturas`): días de lecturas crudas que no
+# se tocan, filas por DELETE y pausa en segundos entre lotes
+COMPACTACION_DIAS = config('COMPACTACION_DIAS', default=30, cast=int)
+COMPACTACION_TAMANO_LOTE = config('COMPACTACION_TAMANO_LOTE', default=2000, cast=int)
+COMPACTACION_PAUSA = config('COMPACTACION_PAUSA', default=0.0, cast=float)
+
+# ============================================================================
+# DASHBOARD EN TIEMPO REAL (DashboardConsumer)
+# ============================================================================
+
+# Segundos mínimos entre envíos a un browser: lo que llega mientras tanto se
+# combina y solo sale la lectura más reciente de cada sector
+DASHBOARD_INTERVALO_ENVIO = config('DASHBOARD_INTERVALO_ENVIO', default=0.25, cast=float)
+
+# Intervalo más largo que puede pedir un cliente (?intervalo=2, p.ej. por celular)
+DASHBOARD_INTERVALO_MAXIMO = config('DASHBOARD_INTERVALO_MAXIMO', default=10.0, cast=float)
+
+# Sectores que puede seguir a la vez una conexión multiplexada (ws/dashboard/)
+DASHBOARD_MAXIMO_SECTORES = config('DASHBOARD_MAXIMO_SECTORES', default=500, cast=int)
+
+# ============================================================================
+# GRÁFICOS Y TABLA (sector_detail)
+# ============================================================================
+
+# Puntos por serie cuando el cliente no indica cuántos (ver dashboard.graficos)
+GRAFICO_PUNTOS = config('GRAFICO_PUNTOS', default=500, cast=int)
+
+# Filas por página de la tabla de lecturas (ver views.tabla_lecturas)
+TABLA_TAMANO_PAGINA = config('TABLA_TAMANO_PAGINA', default=50, cast=int)
+
+# ============================================================================
+# EXPORTACIÓN (dashboard.exportacion)
+# ============================================================================
+
+# Filas que se leen de la base (cursor del lado del servidor) por cada parte
+EXPORTACION_TAMANO_CHUNK = config('EXPORTACION_TAMANO_CHUNK', default=2000, cast=int)
+
+# Trabajos de exportación multi-sector (dashboard.trabajos)
+# Procesos del pool (por defecto uno por núcleo)
+EXPORTACION_PROCESOS = config('EXPORTACION_PROCESOS', default=os.cpu_count() or 2, cast=int)
+
+# Cada sector se parte en ventanas de este largo (una parte por proceso)
+EXPORTACION_DIAS_POR_PARTE = config('EXPORTACION_DIAS_POR_PARTE', default=7, cast=int)
+
+# Carpeta de trabajo y de los .zip (fuera de MEDIA_ROOT: no son públicos)
+EXPORTACION_DIR = config('EXPORTACION_DIR', default=str(BASE_DIR / 'exportaciones'))
+
+# Horas que se guarda el .zip de un trabajo terminado
+EXPORTACION_EXPIRA_HORAS = config('EXPORTACION_EXPIRA_HORAS', default=24, cast=int)
+
 # ============================================================================
 # PASSWORD VALIDATION
 # ============================================================================
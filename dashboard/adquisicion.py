@@ -0,0 +1,383 @@
+"""
+Adquisición continua de los puertos seriales (Arduinos) en el entorno LOCAL.
+
+Cada Arduino tiene un thread en segundo plano que es el único dueño de su
+conexión serial: pide una muestra cada SERIAL_INTERVALO segundos y la
+guarda en un buffer circular en memoria. Las vistas (obtener_lectura) solo
+leen la última muestra, así que muchas pestañas del navegador haciendo
+polling no multiplican el tráfico serial ni bloquean workers esperando al
+Arduino.
+
+Un mismo LOCAL puede tener varios Arduinos (uno por sector): el registro
+SERIAL_DISPOSITIVOS asigna cada puerto a un sector y todos se leen en
+paralelo.
+
+Características:
+- Un thread por puerto, con reconexión automática (backoff)
+- Buffer circular de tamaño fijo (collections.deque con maxlen)
+- Última muestra en O(1)
+- Salud y frecuencia de muestreo real de cada puerto
+- Suscriptores: funciones llamadas con (dispositivo, datos, marca_tiempo)
+  por cada muestra (p.ej. para grabar en la base de datos)
+
+Uso:
+    from dashboard.adquisicion import gestor_serial
+
+    gestor_serial.iniciar()
+    dispositivo = gestor_serial.para_sector(1)
+    muestra = dispositivo.ultima_muestra()   # {'marca_tiempo', 'datos'} o None
+    gestor_serial.estadisticas()             # [{'puerto', 'salud', ...}, ...]
+    gestor_serial.detener()
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import serial
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class AdquisicionSerial:
+    """
+    Thread de muestreo de un Arduino conectado por puerto serial.
+
+    Protocolo del Arduino: se le escribe b'R' y responde una línea JSON
+    con los valores de los sensores.
+    """
+
+    def __init__(self, puerto: str, sector_id: Optional[int] = None, baud_rate: int = 9600,
+                 timeout: float = 3, intervalo: float = 5.0, capacidad: int = 720):
+        self.puerto = puerto
+        self.sector_id = sector_id  # Sector fijo del registro (None = se elige al grabar)
+        self.sector_grabacion: Optional[int] = None  # Sector que se está grabando (None = no graba)
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self.max_reconnect_interval: float = 60.0  # segundos (tope del backoff)
+
+        # Buffer circular: las muestras más viejas se descartan solas
+        self.muestras: deque = deque(maxlen=capacidad)
+
+        self._conexion: Optional[serial.Serial] = None
+        self._listo_desde: float = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+        # Funciones a llamar con (dispositivo, datos, marca_tiempo) por cada muestra
+        self._suscriptores: List[Callable[['AdquisicionSerial', Dict[str, Any], Any], None]] = []
+
+        # Métricas
+        self.muestras_totales: int = 0
+        self.errores: int = 0
+        self.ultimo_error: Optional[str] = None
+
+    @property
+    def activo(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    @property
+    def conectado(self) -> bool:
+        return bool(self._conexion and self._conexion.is_open)
+
+    def suscribir(self, funcion: Callable[['AdquisicionSerial', Dict[str, Any], Any], None]):
+        """Avisar a `funcion(dispositivo, datos, marca_tiempo)` de cada muestra nueva"""
+        if funcion not in self._suscriptores:
+            self._suscriptores.append(funcion)
+
+    def iniciar(self, exigir_conexion: bool = True) -> bool:
+        """
+        Abrir el puerto y arrancar el thread de muestreo (idempotente).
+
+        Args:
+            exigir_conexion: Si es False el thread arranca igual y sigue
+                reintentando abrir el puerto en segundo plano
+
+        Returns:
+            bool: False si el puerto no se pudo abrir
+        """
+        if self.activo:
+            return self.conectado or not exigir_conexion
+
+        conectado = self._conectar()
+        if not conectado and exigir_conexion:
+            return False
+
+        self._detener.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f'serial-{self.puerto}', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"🚀 Adquisición serial iniciada en {self.puerto} (cada {self.intervalo}s)")
+        return conectado
+
+    def detener(self):
+        """Detener el muestreo y cerrar el puerto"""
+        self._detener.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.timeout + 1)
+        self._thread = None
+        self._cerrar()
+
+    def ultima_muestra(self) -> Optional[Dict[str, Any]]:
+        """Última muestra ({'marca_tiempo', 'datos'}) o None si todavía no hay"""
+        try:
+            return self.muestras[-1]
+        except IndexError:
+            return None
+
+    def ultima_lectura(self, max_edad: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Datos de la última muestra, o None si no hay o si es más vieja
+        que `max_edad` segundos (por defecto, tres intervalos de muestreo).
+        """
+        muestra = self.ultima_muestra()
+        if muestra is None:
+            return None
+
+        if max_edad is None:
+            max_edad = self.intervalo * 3
+        if (timezone.now() - muestra['marca_tiempo']).total_seconds() > max_edad:
+            return None
+        return muestra['datos']
+
+    @property
+    def salud(self) -> str:
+        """'ok', 'sin_datos' (conectado pero sin muestras recientes), 'desconectado' o 'detenido'"""
+        if not self.activo:
+            return 'detenido'
+        if not self.conectado:
+            return 'desconectado'
+        if self.ultima_lectura() is None:
+            return 'sin_datos'
+        return 'ok'
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del puerto y frecuencia de muestreo real"""
+        ultima = self.ultima_muestra()
+        frecuencia = 0.0
+        if len(self.muestras) >= 2:
+            ventana = (self.muestras[-1]['marca_tiempo'] - self.muestras[0]['marca_tiempo']).total_seconds()
+            if ventana > 0:
+                frecuencia = (len(self.muestras) - 1) / ventana
+
+        return {
+            'puerto': self.puerto,
+            'sector_id': self.sector_id,
+            'sector_grabacion': self.sector_grabacion,
+            'salud': self.salud,
+            'activo': self.activo,
+            'conectado': self.conectado,
+            'intervalo': self.intervalo,
+            'muestras_por_segundo': round(frecuencia, 3),
+            'muestras_totales': self.muestras_totales,
+            'muestras_en_buffer': len(self.muestras),
+            'errores': self.errores,
+            'ultimo_error': self.ultimo_error,
+            'ultima_muestra': ultima['marca_tiempo'].isoformat() if ultima else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Serial (solo desde el thread de muestreo, salvo el primer _conectar)
+    # ------------------------------------------------------------------
+
+    def _conectar(self) -> bool:
+        try:
+            if self._conexion is None or not self._conexion.is_open:
+                self._conexion = serial.Serial(self.puerto, self.baud_rate, timeout=self.timeout)
+                self._listo_desde = time.monotonic() + 2  # El Arduino se reinicia al abrir el puerto
+            return True
+        except serial.SerialException as e:
+            logger.error(f"❌ Error conectando Arduino en {self.puerto}: {e}")
+            self._registrar_error(e)
+            return False
+
+    def _cerrar(self):
+        if self._conexion:
+            try:
+                self._conexion.close()
+                logger.info(f"✅ Serial {self.puerto} cerrado")
+            except Exception as e:
+                logger.warning(f"⚠️ Error cerrando serial {self.puerto}: {e}")
+            finally:
+                self._conexion = None
+
+    def _leer(self) -> Optional[Dict[str, Any]]:
+        """Pedir una muestra al Arduino (una ida y vuelta por el puerto)"""
+        self._conexion.reset_input_buffer()
+        self._conexion.write(b'R')
+        linea = self._conexion.readline().decode('utf-8').strip()
+
+        if not linea:
+            return None
+        return json.loads(linea)
+
+    def _registrar_error(self, error: Exception):
+        self.errores += 1
+        self.ultimo_error = str(error)
+
+    def _run(self):
+        intentos = 0
+        proxima = time.monotonic()
+
+        while not self._detener.is_set():
+            if not self.conectado and not self._conectar():
+                intentos += 1
+                espera = min(self.intervalo * 2 ** (intentos - 1), self.max_reconnect_interval)
+                self._detener.wait(espera)
+                continue
+            intentos = 0
+
+            # Esperar a que el Arduino termine de arrancar
+            espera_arranque = self._listo_desde - time.monotonic()
+            if espera_arranque > 0:
+                self._detener.wait(espera_arranque)
+                proxima = time.monotonic()
+                continue
+
+            try:
+                datos = self._leer()
+            except (serial.SerialException, OSError) as e:
+                logger.error(f"❌ Error leyendo {self.puerto}: {e}")
+                self._registrar_error(e)
+                self._cerrar()
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ Muestra inválida de {self.puerto}: {e}")
+                self._registrar_error(e)
+                datos = None
+
+            if datos is not None:
+                marca_tiempo = timezone.now()
+                self.muestras.append({'marca_tiempo': marca_tiempo, 'datos': datos})
+                self.muestras_totales += 1
+
+                for funcion in self._suscriptores:
+                    try:
+                        funcion(self, datos, marca_tiempo)
+                    except Exception as e:
+                        logger.exception(f"❌ Error procesando muestra de {self.puerto}: {e}")
+
+            # Mantener la frecuencia aunque la lectura tarde
+            proxima += self.intervalo
+            ahora = time.monotonic()
+            if proxima < ahora:
+                proxima = ahora
+            self._detener.wait(proxima - ahora)
+
+        self._cerrar()
+
+
+def parsear_registro(entradas: List[str]) -> List[Tuple[str, Optional[int]]]:
+    """
+    Parsear SERIAL_DISPOSITIVOS: cada entrada es "puerto=sector_id" o solo
+    "puerto" (el sector se elige al iniciar la grabación).
+
+    Ejemplo: ['/dev/ttyACM0=1', '/dev/ttyACM1=2', 'COM5']
+    """
+    registro = []
+    for entrada in entradas:
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+
+        puerto, _, sector = entrada.partition('=')
+        if sector.strip():
+            try:
+                sector_id = int(sector)
+            except ValueError:
+                raise ImproperlyConfigured(f"SERIAL_DISPOSITIVOS: sector inválido en '{entrada}'")
+        else:
+            sector_id = None
+        registro.append((puerto.strip(), sector_id))
+    return registro
+
+
+class GestorDispositivos:
+    """
+    Registro de Arduinos del LOCAL: un AdquisicionSerial por puerto.
+
+    Cada puerto muestrea en su propio thread, así que un Arduino lento o
+    desconectado no demora a los demás.
+    """
+
+    def __init__(self, dispositivos: List[AdquisicionSerial]):
+        self.dispositivos: Dict[str, AdquisicionSerial] = {d.puerto: d for d in dispositivos}
+
+    @classmethod
+    def desde_settings(cls) -> 'GestorDispositivos':
+        registro = parsear_registro(settings.SERIAL_DISPOSITIVOS) or [(settings.SERIAL_PORT, None)]
+        return cls([
+            AdquisicionSerial(
+                puerto,
+                sector_id=sector_id,
+                baud_rate=settings.SERIAL_BAUD_RATE,
+                timeout=settings.SERIAL_TIMEOUT,
+                intervalo=settings.SERIAL_INTERVALO,
+                capacidad=settings.SERIAL_CAPACIDAD_BUFFER,
+            )
+            for puerto, sector_id in registro
+        ])
+
+    @property
+    def activo(self) -> bool:
+        """True si al menos un puerto está muestreando"""
+        return any(d.activo for d in self.dispositivos.values())
+
+    def suscribir(self, funcion: Callable[[AdquisicionSerial, Dict[str, Any], Any], None]):
+        """Suscribir `funcion` a las muestras de todos los puertos"""
+        for dispositivo in self.dispositivos.values():
+            dispositivo.suscribir(funcion)
+
+    def para_sector(self, sector_id) -> Optional[AdquisicionSerial]:
+        """
+        Dispositivo que mide el sector: el asignado en el registro o, si
+        no hay, el único puerto sin sector fijo.
+        """
+        try:
+            sector_id = int(sector_id)
+        except (TypeError, ValueError):
+            return None
+
+        libres = []
+        for dispositivo in self.dispositivos.values():
+            if dispositivo.sector_id == sector_id:
+                return dispositivo
+            if dispositivo.sector_id is None:
+                libres.append(dispositivo)
+
+        return libres[0] if len(libres) == 1 else None
+
+    def iniciar(self) -> int:
+        """
+        Arrancar todos los puertos. Los que no se pudieron abrir siguen
+        reintentando en segundo plano (p.ej. un Arduino que se enchufa después).
+
+        Returns:
+            int: Cantidad de puertos conectados
+        """
+        return sum(1 for d in self.dispositivos.values() if d.iniciar(exigir_conexion=False))
+
+    def detener(self):
+        """Detener todos los puertos"""
+        for dispositivo in self.dispositivos.values():
+            dispositivo.sector_grabacion = None
+            dispositivo.detener()
+
+    def estadisticas(self) -> List[Dict[str, Any]]:
+        """Salud y frecuencia de muestreo de cada puerto"""
+        return [d.estadisticas() for d in self.dispositivos.values()]
+
+
+# ============================================================================
+# SINGLETON INSTANCE
+# ============================================================================
+
+gestor_serial = GestorDispositivos.desde_settings()
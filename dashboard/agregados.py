@@ -0,0 +1,315 @@
+"""
+Agregados por intervalo de tiempo (rollups) de las lecturas de sensores.
+
+Por cada sector, métrica e intervalo (1 minuto, 1 hora, 1 día) se guarda
+cantidad, suma, mínimo y máximo en LecturaAgregada. Los gráficos de
+rangos largos leen estos resúmenes (miles de filas) en lugar de recorrer
+las lecturas crudas (millones).
+
+Características:
+- Actualización incremental: escribir_lecturas llama a acumular() dentro de
+  la misma transacción que inserta las Lectura
+- Un solo UPSERT por lote (INSERT ... ON CONFLICT DO UPDATE) que suma los
+  contadores y combina mínimo/máximo en la base, sin leer antes las filas
+- Reconstrucción completa o por rango con recalcular() (comando
+  `recalcular_agregados`)
+- Elección automática de la granularidad según el largo del rango
+
+Uso:
+    from dashboard.agregados import acumular, consultar, recalcular
+
+    acumular(filas)                                   # [Lectura, ...] recién insertadas
+    serie = consultar(sector_id, 'temperatura', desde, hasta)
+    recalcular(sector_id=3, desde=desde, hasta=hasta)
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Greatest, Least, Trunc
+from django.utils import timezone
+
+from dashboard.models import Compactacion, Lectura, LecturaAgregada
+
+logger = logging.getLogger(__name__)
+
+
+# granularidad -> (duración del intervalo, kind de Trunc)
+GRANULARIDADES = {
+    '1m': (timedelta(minutes=1), 'minute'),
+    '1h': (timedelta(hours=1), 'hour'),
+    '1d': (timedelta(days=1), 'day'),
+}
+
+# Largo máximo de rango que se consulta con cada granularidad (de fina a gruesa)
+RANGO_MAXIMO = [
+    ('1m', timedelta(hours=6)),
+    ('1h', timedelta(days=14)),
+    ('1d', None),
+]
+
+# Funciones escalares de mínimo/máximo entre dos valores según el motor
+FUNCIONES_MIN_MAX = {
+    'postgresql': ('LEAST', 'GREATEST'),
+    'sqlite': ('MIN', 'MAX'),
+}
+
+
+def inicio_intervalo(marca_tiempo: datetime, granularidad: str) -> datetime:
+    """Comienzo del intervalo que contiene a marca_tiempo (en la zona horaria actual)"""
+    local = timezone.localtime(marca_tiempo)
+    if granularidad == '1m':
+        return local.replace(second=0, microsecond=0)
+    if granularidad == '1h':
+        return local.replace(minute=0, second=0, microsecond=0)
+    if granularidad == '1d':
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f'Granularidad inválida: {granularidad}')
+
+
+def elegir_granularidad(desde: datetime, hasta: datetime) -> str:
+    """La granularidad más fina cuyo rango máximo cubre [desde, hasta]"""
+    largo = hasta - desde
+    for granularidad, maximo in RANGO_MAXIMO:
+        if maximo is None or largo <= maximo:
+            return granularidad
+    return RANGO_MAXIMO[-1][0]
+
+
+# ============================================================================
+# ACTUALIZACIÓN INCREMENTAL
+# ============================================================================
+
+def _resumir(filas: Iterable[Lectura]) -> Dict[Tuple, List[float]]:
+    """
+    Agrupa las lecturas del lote en memoria.
+
+    Returns:
+        dict: (sector_id, metrica, granularidad, inicio) -> [cantidad, suma, minimo, maximo]
+    """
+    resumen: Dict[Tuple, List[float]] = {}
+
+    for fila in filas:
+        inicios = {g: inicio_intervalo(fila.marca_tiempo, g) for g in GRANULARIDADES}
+
+        for metrica in Lectura.METRICAS:
+            valor = getattr(fila, metrica)
+            if valor is None:
+                continue
+            valor = float(valor)
+
+            for granularidad, inicio in inicios.items():
+                clave = (fila.sector_id, metrica, granularidad, inicio)
+                acumulado = resumen.get(clave)
+                if acumulado is None:
+                    resumen[clave] = [1, valor, valor, valor]
+                else:
+                    acumulado[0] += 1
+                    acumulado[1] += valor
+                    acumulado[2] = min(acumulado[2], valor)
+                    acumulado[3] = max(acumulado[3], valor)
+
+    return resumen
+
+
+def _upsert_sql() -> str:
+    minimo, maximo = FUNCIONES_MIN_MAX[connection.vendor]
+    q = connection.ops.quote_name
+    tabla = q(LecturaAgregada._meta.db_table)
+
+    return (
+        f"INSERT INTO {tabla} (sector_id, metrica, granularidad, inicio, cantidad, suma, minimo, maximo) "
+        f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT (sector_id, metrica, granularidad, inicio) DO UPDATE SET "
+        f"cantidad = {tabla}.cantidad + EXCLUDED.cantidad, "
+        f"suma = {tabla}.suma + EXCLUDED.suma, "
+        f"minimo = {minimo}({tabla}.minimo, EXCLUDED.minimo), "
+        f"maximo = {maximo}({tabla}.maximo, EXCLUDED.maximo)"
+    )
+
+
+def _upsert_orm(resumen: Dict[Tuple, List[float]]):
+    """Camino genérico para motores sin UPSERT soportado aquí (una consulta por intervalo)"""
+    for (sector_id, metrica, granularidad, inicio), (cantidad, suma, minimo, maximo) in resumen.items():
+        actualizadas = LecturaAgregada.objects.filter(
+            sector_id=sector_id, metrica=metrica, granularidad=granularidad, inicio=inicio
+        ).update(
+            cantidad=F('cantidad') + cantidad,
+            suma=F('suma') + suma,
+            minimo=Least(F('minimo'), minimo),
+            maximo=Greatest(F('maximo'), maximo),
+        )
+        if not actualizadas:
+            LecturaAgregada.objects.create(
+                sector_id=sector_id, metrica=metrica, granularidad=granularidad, inicio=inicio,
+                cantidad=cantidad, suma=suma, minimo=minimo, maximo=maximo,
+            )
+
+
+def acumular(filas: Iterable[Lectura]) -> int:
+    """
+    Sumar un lote de lecturas recién insertadas a sus agregados.
+
+    Debe llamarse dentro de la transacción que insertó las lecturas, así
+    los agregados nunca cuentan filas que no llegaron a guardarse.
+
+    Returns:
+        int: Cantidad de filas de LecturaAgregada tocadas
+    """
+    resumen = _resumir(filas)
+    if not resumen:
+        return 0
+
+    if connection.vendor not in FUNCIONES_MIN_MAX:
+        _upsert_orm(resumen)
+        return len(resumen)
+
+    # Orden fijo de claves: dos lotes concurrentes bloquean las filas en el
+    # mismo orden y no se produce un deadlock
+    parametros = [
+        (sector_id, metrica, granularidad, connection.ops.adapt_datetimefield_value(inicio),
+         cantidad, suma, minimo, maximo)
+        for (sector_id, metrica, granularidad, inicio), (cantidad, suma, minimo, maximo)
+        in sorted(resumen.items(), key=lambda item: (item[0][0], item[0][1], item[0][2], item[0][3]))
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), parametros)
+
+    return len(resumen)
+
+
+# ============================================================================
+# CONSULTA Y RECONSTRUCCIÓN
+# ============================================================================
+
+def consultar(sector_id: int, metrica: str, desde: datetime, hasta: datetime,
+              granularidad: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Serie agregada de una métrica para el rango [desde, hasta].
+
+    Args:
+        granularidad: '1m', '1h' o '1d'. Si no se indica se elige según el rango
+
+    Returns:
+        list: [{'inicio', 'cantidad', 'promedio', 'minimo', 'maximo'}, ...] en orden cronológico
+    """
+    if metrica not in Lectura.METRICAS:
+        raise ValueError(f'Métrica inválida: {metrica}')
+
+    granularidad = granularidad or elegir_granularidad(desde, hasta)
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f'Granularidad inválida: {granularidad}')
+
+    filas = LecturaAgregada.objects.filter(
+        sector_id=sector_id,
+        metrica=metrica,
+        granularidad=granularidad,
+        inicio__gte=inicio_intervalo(desde, granularidad),
+        inicio__lte=hasta,
+    ).order_by('inicio').values_list('inicio', 'cantidad', 'suma', 'minimo', 'maximo')
+
+    return [
+        {
+            'inicio': inicio,
+            'cantidad': cantidad,
+            'promedio': suma / cantidad if cantidad else None,
+            'minimo': minimo,
+            'maximo': maximo,
+        }
+        for inicio, cantidad, suma, minimo, maximo in filas
+    ]
+
+
+def recalcular(sector_id: Optional[int] = None, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None, tamano_lote: int = 1000) -> int:
+    """
+    Reconstruir los agregados desde las lecturas crudas.
+
+    El rango se extiende a días completos para que ningún intervalo (de
+    ninguna granularidad) quede calculado a medias. Los agregados del rango
+    se borran y se vuelven a crear con un GROUP BY por granularidad.
+
+    Lo anterior al límite de compactación (ver dashboard.compactacion) no se
+    toca: las lecturas crudas ya no están completas y sus agregados se
+    calcularon antes de borrarlas.
+
+    Returns:
+        int: Cantidad de filas de LecturaAgregada creadas
+    """
+    limite = Compactacion.limite()
+    if limite is not None:
+        # Primer día completo desde el límite
+        primer_dia = inicio_intervalo(limite, '1d')
+        if primer_dia < limite:
+            primer_dia = inicio_intervalo(primer_dia + timedelta(hours=36), '1d')
+
+        if desde is None or inicio_intervalo(desde, '1d') < primer_dia:
+            if hasta is not None and hasta < primer_dia:
+                logger.warning(f"⚠️ Rango compactado (antes de {primer_dia}): agregados sin cambios")
+                return 0
+            desde = primer_dia
+            logger.warning(f"⚠️ Recalculando desde {primer_dia} (lo anterior está compactado)")
+
+    lecturas = Lectura.objects.all()
+    agregados = LecturaAgregada.objects.all()
+
+    if sector_id is not None:
+        lecturas = lecturas.filter(sector_id=sector_id)
+        agregados = agregados.filter(sector_id=sector_id)
+    if desde is not None:
+        desde = inicio_intervalo(desde, '1d')
+        lecturas = lecturas.filter(marca_tiempo__gte=desde)
+        agregados = agregados.filter(inicio__gte=desde)
+    if hasta is not None:
+        hasta = inicio_intervalo(hasta, '1d') + GRANULARIDADES['1d'][0]
+        lecturas = lecturas.filter(marca_tiempo__lt=hasta)
+        agregados = agregados.filter(inicio__lt=hasta)
+
+    # Un GROUP BY por granularidad con las seis métricas a la vez
+    anotaciones = {}
+    for metrica in Lectura.METRICAS:
+        anotaciones[f'{metrica}__cantidad'] = Count(metrica)
+        anotaciones[f'{metrica}__suma'] = Sum(metrica)
+        anotaciones[f'{metrica}__minimo'] = Min(metrica)
+        anotaciones[f'{metrica}__maximo'] = Max(metrica)
+
+    creadas = 0
+    with transaction.atomic():
+        borradas, _ = agregados.delete()
+
+        for granularidad, (_, kind) in GRANULARIDADES.items():
+            grupos = lecturas.order_by().annotate(
+                inicio=Trunc('marca_tiempo', kind, tzinfo=timezone.get_current_timezone())
+            ).values('sector_id', 'inicio').annotate(**anotaciones)
+
+            nuevas = []
+            for grupo in grupos.iterator():
+                for metrica in Lectura.METRICAS:
+                    cantidad = grupo[f'{metrica}__cantidad']
+                    if not cantidad:
+                        continue
+                    nuevas.append(LecturaAgregada(
+                        sector_id=grupo['sector_id'],
+                        metrica=metrica,
+                        granularidad=granularidad,
+                        inicio=grupo['inicio'],
+                        cantidad=cantidad,
+                        suma=float(grupo[f'{metrica}__suma']),
+                        minimo=float(grupo[f'{metrica}__minimo']),
+                        maximo=float(grupo[f'{metrica}__maximo']),
+                    ))
+
+                if len(nuevas) >= tamano_lote:
+                    LecturaAgregada.objects.bulk_create(nuevas)
+                    creadas += len(nuevas)
+                    nuevas = []
+
+            LecturaAgregada.objects.bulk_create(nuevas)
+            creadas += len(nuevas)
+
+    logger.info(f"📊 Agregados recalculados: {borradas} borrados, {creadas} creados")
+    return creadas
@@ -2,7 +2,8 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from dashboard.models import Sector, Zona, HistorialTemperatura, HistorialSalinidad, HistorialPh, HistorialTurbidez, HistorialHumedad
+from dashboard.models import Sector, Zona, Lectura
+from dashboard.ingesta import normalizar_lectura, escribir_lecturas
 from dashboard.serializers import LecturaSerializer
 
 @api_view(['POST'])
@@ -99,50 +100,20 @@ def recibir_lectura(request):
     data = serializer.validated_data
     
     try:
-        sector = Sector.objects.get(id=data['sector_id'])
-        marca_tiempo = data['marca_tiempo']
-        guardados = 0
+        lectura = normalizar_lectura(data)
+        error = escribir_lecturas([lectura])[0]
+        if error:
+            return Response({'error': error}, status=404)
         
-        # Guardar cada sensor que tenga datos
-        if data.get('temperatura') is not None:
-            HistorialTemperatura.objects.create(
-                sector=sector, valor=data['temperatura'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        if data.get('salinidad') is not None:
-            HistorialSalinidad.objects.create(
-                sector=sector, valor=data['salinidad'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        if data.get('ph') is not None:
-            HistorialPh.objects.create(
-                sector=sector, valor=data['ph'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        if data.get('turbidez') is not None:
-            HistorialTurbidez.objects.create(
-                sector=sector, valor=data['turbidez'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        if data.get('humedad') is not None:
-            HistorialHumedad.objects.create(
-                sector=sector, valor=data['humedad'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        print(f"✓ {guardados} lecturas guardadas en PostgreSQL para sector {sector.id}")
+        # Una sola fila en Lectura con todos los sensores que tengan datos
+        guardados = sum(1 for campo in Lectura.METRICAS if lectura[campo] is not None)
+        print(f"✓ {guardados} lecturas guardadas en PostgreSQL para sector {lectura['sector_id']}")
         
         return Response({
             'status': 'success',
             'mensaje': f'Lectura guardada ({guardados} registros)'
         }, status=201)
         
-    except Sector.DoesNotExist:
-        return Response({'error': f'Sector {data["sector_id"]} no existe'}, status=404)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -0,0 +1,131 @@
+"""
+Campos de modelo propios.
+
+ValorEscalado guarda un número con `decimal_places` decimales como entero
+(centésimas con decimal_places=2): 21.37 °C se guarda como 2137. Reemplaza a
+DecimalField en las métricas de Lectura y de las vistas Historial*.
+
+Características:
+- Sin pérdida: DecimalField ya redondeaba a `decimal_places` al guardar, y
+  entero / 100 es el float más cercano al decimal (repr() da "21.37")
+- Columna smallint (2 bytes) si max_digits <= 4, integer (4 bytes) si no,
+  en lugar de numeric en PostgreSQL y REAL (8 bytes) en SQLite
+- Lecturas, filtros, Sum, Min y Max trabajan en unidades reales y devuelven
+  float: sin construir un Decimal por valor
+- Avg no: su resultado es un FloatField genérico y queda en unidades
+  escaladas (100 veces más grande). Para promedios usar Promedio
+- sin_escalar() trae la columna entera tal cual, para armar arrays NumPy y
+  dividir todo junto (ver dashboard.graficos y dashboard.exportacion)
+- Conserva max_digits y decimal_places: el control de rango de
+  normalizar_lectura no cambia
+
+Uso:
+    from dashboard.campos import Promedio, ValorEscalado, escalas, sin_escalar
+
+    temperatura = ValorEscalado(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    Lectura.objects.aggregate(Promedio('temperatura'))  # {'temperatura__avg': 21.109}
+
+    filas = Lectura.objects.values_list(sin_escalar('temperatura'))  # [(2137,), ...]
+    valores = np.array(filas, dtype=np.float64) / escalas(Lectura, ['temperatura'])
+"""
+
+from typing import List, Sequence, Type
+
+from django import forms
+from django.core import exceptions
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models
+from django.db.models import Avg, ExpressionWrapper, F, lookups
+from django.utils.functional import cached_property
+
+
+class ValorEscalado(models.IntegerField):
+    """Número de `decimal_places` decimales guardado como entero escalado"""
+
+    description = "Número decimal guardado como entero escalado"
+
+    def __init__(self, *args, max_digits=5, decimal_places=2, **kwargs):
+        self.max_digits = max_digits
+        self.decimal_places = decimal_places
+        super().__init__(*args, **kwargs)
+
+    @property
+    def escala(self) -> int:
+        return 10 ** self.decimal_places
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['max_digits'] = self.max_digits
+        kwargs['decimal_places'] = self.decimal_places
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        # 99.99 -> 9999 entra en un smallint (hasta 32767)
+        return 'SmallIntegerField' if 10 ** self.max_digits - 1 <= 32767 else 'IntegerField'
+
+    @cached_property
+    def validators(self):
+        # El rango del entero no sirve (está en centésimas): el de DecimalField
+        maximo = 10 ** (self.max_digits - self.decimal_places) - 1 / self.escala
+        return [*self._validators, MinValueValidator(-maximo), MaxValueValidator(maximo)]
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return value / self.escala
+
+    def to_python(self, value):
+        if value is None or isinstance(value, float):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError(
+                f"'{value}' no es un número",
+                code='invalid',
+                params={'value': value},
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        return round(self.to_python(value) * self.escala)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.FloatField,
+            **kwargs,
+        })
+
+
+# Los lookups de IntegerField redondean hacia arriba los float (20.5 -> 21)
+# y comparan el rango del entero con el valor sin escalar: los genéricos
+# pasan por get_prep_value, que escala y redondea
+for _lookup in (lookups.Exact, lookups.GreaterThan, lookups.GreaterThanOrEqual,
+                lookups.LessThan, lookups.LessThanOrEqual):
+    ValorEscalado.register_lookup(_lookup)
+
+
+def sin_escalar(campo: str) -> ExpressionWrapper:
+    """La columna entera de un ValorEscalado, sin pasar por from_db_value"""
+    return ExpressionWrapper(F(campo), output_field=models.IntegerField())
+
+
+class Promedio(Avg):
+    """Avg de un ValorEscalado en unidades reales (Avg queda en unidades escaladas)"""
+
+    def get_db_converters(self, connection):
+        return [*super().get_db_converters(connection), self._desescalar]
+
+    def _desescalar(self, value, expression, connection):
+        if value is None:
+            return value
+        campo = self.get_source_fields()[0]
+        return value / getattr(campo, 'escala', 1)
+
+
+def escalas(modelo: Type[models.Model], campos: Sequence[str]) -> List[int]:
+    """Divisor de cada columna traída con sin_escalar()"""
+    return [modelo._meta.get_field(campo).escala for campo in campos]
@@ -0,0 +1,201 @@
+"""
+Compactación del historial crudo viejo.
+
+Las lecturas cada 5 s de hace meses casi no se miran, pero son la mayor
+parte de la tabla y de sus índices. compactar() recorre, de a un día, lo
+anterior a COMPACTACION_DIAS:
+
+1. Recalcula los agregados del día (mínimo, máximo y promedio por minuto,
+   hora y día; ver dashboard.agregados) desde las lecturas crudas
+2. Marca el día como compactado (Compactacion.hasta): desde ahí
+   recalcular_agregados ya no lo reconstruye con datos incompletos
+3. Borra las lecturas crudas del día en lotes de COMPACTACION_TAMANO_LOTE
+   filas, cada lote en su propia transacción, dejando opcionalmente la
+   primera de cada franja de `conservar_cada` × SERIAL_INTERVALO segundos
+   por sector
+4. Marca el día como borrado (Compactacion.borrado_hasta)
+
+Características:
+- Retoma donde quedó la pasada anterior: primero termina el borrado del
+  día que se cortó (borrado_hasta) y sigue desde Compactacion.limite()
+- Borrar dos veces el mismo día da lo mismo: lo que se conserva depende
+  de franjas fijas de tiempo, no de la posición entre las que quedan
+- La ingesta espera como mucho un lote; COMPACTACION_PAUSA agrega una
+  pausa entre lotes para cederle la base
+- Los DELETE llevan el rango del día: en PostgreSQL solo tocan la
+  partición del mes (ver dashboard.particiones)
+- Informa filas procesadas, borradas y filas por segundo
+
+Uso:
+    from dashboard.compactacion import compactar
+
+    resultado = compactar(dias=30, conservar_cada=12)  # 1 lectura por minuto
+    # {'dias': 45, 'procesadas': 3888000, 'borradas': 3564000, 'segundos': 80.2, 'filas_por_segundo': 48478.0}
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from dashboard.agregados import inicio_intervalo, recalcular
+from dashboard.models import Compactacion, Lectura, Sector
+
+logger = logging.getLogger(__name__)
+
+
+def _dia_siguiente(dia: datetime) -> datetime:
+    # +36 h y truncar: correcto también en los días con cambio de horario
+    return inicio_intervalo(dia + timedelta(hours=36), '1d')
+
+
+def _primera_lectura(pendientes) -> Optional[datetime]:
+    """
+    marca_tiempo más vieja de `pendientes`, sector por sector.
+
+    Cada consulta es un LIMIT 1 sobre el índice único (sector_id,
+    marca_tiempo): en PostgreSQL marca_tiempo solo tiene un índice BRIN y un
+    ORDER BY de toda la tabla ordenaría todo lo anterior al corte.
+    """
+    primeras = (
+        pendientes.filter(sector_id=sector_id).order_by('marca_tiempo').values_list('marca_tiempo', flat=True).first()
+        for sector_id in Sector.objects.values_list('id', flat=True)
+    )
+    return min((primera for primera in primeras if primera is not None), default=None)
+
+
+def _adelgazar(desde: datetime, hasta: datetime, conservar_cada: int,
+               tamano_lote: int, pausa: float) -> Tuple[int, int]:
+    """
+    Borrar las lecturas de [desde, hasta) salvo la primera de cada franja de
+    `conservar_cada` × SERIAL_INTERVALO segundos por sector (0 = todas).
+
+    Las franjas son fijas (se cuentan desde `desde`, un comienzo de día):
+    volver a pasar por un día adelgazado, entero o a medias, deja las
+    mismas lecturas.
+
+    Returns:
+        tuple: (filas procesadas, filas borradas)
+    """
+    del_dia = Lectura.objects.filter(marca_tiempo__gte=desde, marca_tiempo__lt=hasta)
+    sector_ids = list(del_dia.values_list('sector_id', flat=True).distinct().order_by())
+    franja = timedelta(seconds=conservar_cada * settings.SERIAL_INTERVALO)
+
+    procesadas = borradas = 0
+    for sector_id in sector_ids:
+        filas = list(
+            del_dia.filter(sector_id=sector_id).order_by('marca_tiempo').values_list('id', 'marca_tiempo')
+        )
+        procesadas += len(filas)
+        if conservar_cada > 0:
+            ids = []
+            anterior = None
+            for id_, marca_tiempo in filas:
+                numero = (marca_tiempo - desde) // franja
+                if numero == anterior:
+                    ids.append(id_)
+                anterior = numero
+        else:
+            ids = [id_ for id_, _ in filas]
+
+        for inicio in range(0, len(ids), tamano_lote):
+            borradas += del_dia.filter(id__in=ids[inicio:inicio + tamano_lote]).delete()[0]
+            if pausa:
+                time.sleep(pausa)
+
+    return procesadas, borradas
+
+
+def compactar(dias: Optional[int] = None, conservar_cada: int = 0,
+              tamano_lote: Optional[int] = None, pausa: Optional[float] = None,
+              progreso: Optional[Callable[[datetime, int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Compactar las lecturas crudas de más de `dias` días.
+
+    Primero termina el borrado que haya quedado a medias en una pasada
+    anterior (Compactacion.borrado_pendiente()).
+
+    Args:
+        dias: Antigüedad a partir de la cual se compacta (COMPACTACION_DIAS)
+        conservar_cada: Dejar la primera lectura de cada N × SERIAL_INTERVALO
+            segundos por sector (0 = borrar todas)
+        tamano_lote: Filas por DELETE (COMPACTACION_TAMANO_LOTE)
+        pausa: Segundos entre lotes (COMPACTACION_PAUSA)
+        progreso: Se llama después de cada día con (día, procesadas, borradas)
+
+    Returns:
+        dict: {'dias', 'procesadas', 'borradas', 'segundos', 'filas_por_segundo'}
+    """
+    dias = settings.COMPACTACION_DIAS if dias is None else dias
+    tamano_lote = tamano_lote or settings.COMPACTACION_TAMANO_LOTE
+    pausa = settings.COMPACTACION_PAUSA if pausa is None else pausa
+
+    resultado = {'dias': 0, 'procesadas': 0, 'borradas': 0, 'segundos': 0.0, 'filas_por_segundo': 0.0}
+    inicio = time.perf_counter()
+
+    def adelgazar_dia(registro: Compactacion, dia: datetime, hasta: datetime, comienzo: float):
+        procesadas, borradas = _adelgazar(dia, hasta, registro.conservar_cada, tamano_lote, pausa)
+
+        resultado['dias'] += 1
+        resultado['procesadas'] += procesadas
+        resultado['borradas'] += borradas
+        registro.borrado_hasta = hasta
+        registro.lecturas_procesadas += procesadas
+        registro.lecturas_borradas += borradas
+        registro.segundos += time.perf_counter() - comienzo
+        registro.save(update_fields=['borrado_hasta', 'lecturas_procesadas', 'lecturas_borradas', 'segundos'])
+
+        logger.info(f"🗜️ {dia:%Y-%m-%d}: {procesadas} lecturas, {borradas} borradas")
+        if progreso:
+            progreso(dia, procesadas, borradas)
+
+    # Pasadas cortadas entre el recálculo de un día y el fin de su borrado
+    for registro in Compactacion.borrado_pendiente():
+        dia = registro.borrado_hasta
+        while dia < registro.hasta:
+            adelgazar_dia(registro, dia, min(_dia_siguiente(dia), registro.hasta), time.perf_counter())
+            dia = registro.borrado_hasta
+
+    corte = inicio_intervalo(timezone.now() - timedelta(days=dias), '1d')
+    limite = Compactacion.limite()
+
+    pendientes = Lectura.objects.filter(marca_tiempo__lt=corte)
+    if limite is not None:
+        pendientes = pendientes.filter(marca_tiempo__gte=limite)
+
+    primera = _primera_lectura(pendientes)
+    if primera is not None:
+        dia = inicio_intervalo(primera, '1d')
+        registro = Compactacion.objects.create(hasta=dia, borrado_hasta=dia, conservar_cada=conservar_cada)
+
+        while dia < corte:
+            comienzo = time.perf_counter()
+            siguiente = _dia_siguiente(dia)
+
+            recalcular(desde=dia, hasta=dia)
+            registro.hasta = siguiente
+            registro.save(update_fields=['hasta'])
+
+            # Si se corta acá, la próxima pasada retoma el borrado del día
+            adelgazar_dia(registro, dia, siguiente, comienzo)
+
+            # Saltar los días sin lecturas, de a un día: un rango acotado usa el
+            # índice BRIN de marca_tiempo en PostgreSQL (no hay B-tree para un
+            # ORDER BY marca_tiempo de toda la tabla)
+            dia = siguiente
+            while dia < corte and not pendientes.filter(
+                marca_tiempo__gte=dia, marca_tiempo__lt=_dia_siguiente(dia)
+            ).exists():
+                dia = _dia_siguiente(dia)
+
+        # No quedan lecturas sin compactar antes del corte
+        registro.hasta = registro.borrado_hasta = corte
+        registro.save(update_fields=['hasta', 'borrado_hasta'])
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    if resultado['dias'] and resultado['segundos']:
+        resultado['filas_por_segundo'] = resultado['procesadas'] / resultado['segundos']
+    return resultado
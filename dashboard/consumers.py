@@ -3,35 +3,85 @@ WebSocket Consumers para Django Channels
 
 SensorConsumer: Recibe datos del entorno LOCAL vía WebSocket
 DashboardConsumer: Envía datos a los dashboards en browsers
+
+Los dos hablan JSON o MessagePack compacto (ver dashboard.protocolo),
+según lo que negocie el cliente al conectar.
 """
 
+import asyncio
 import json
-from channels.generic.websocket import AsyncWebsocketConsumer
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
-from django.utils import timezone
+from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
-from datetime import datetime
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from dashboard.ingesta import buffer_ingesta, normalizar_lectura
+from dashboard.graficos import serie_grafico
+from dashboard.models import Sector, Lectura
+from dashboard.protocolo import SUBPROTOCOLO, codificar, decodificar, formato_binario
+from dashboard.ultimas import ultimas_lecturas
 import logging
 logger = logging.getLogger(__name__)
 
 
-class SensorConsumer(AsyncWebsocketConsumer):
+class ConsumerNegociado(AsyncWebsocketConsumer):
+    """
+    Base de los consumers: formato de los frames negociado por conexión.
+    
+    Con el subprotocolo 'bivalvia.msgpack' (o ?formato=msgpack) las
+    respuestas salen en MessagePack; si no, en JSON. Los mensajes del
+    cliente se aceptan en los dos formatos.
+    """
+    
+    binario = False
+    
+    async def aceptar(self):
+        """Aceptar la conexión confirmando el subprotocolo si se pidió"""
+        self.binario = formato_binario(self.scope)
+        subprotocolo = SUBPROTOCOLO if SUBPROTOCOLO in self.scope.get('subprotocols', ()) else None
+        await self.accept(subprotocol=subprotocolo)
+    
+    def leer_mensaje(self, text_data, bytes_data):
+        """Frame recibido (JSON o MessagePack) a dict. ValueError si no es válido"""
+        if bytes_data is not None:
+            return decodificar(bytes_data)
+        return json.loads(text_data)
+    
+    async def responder(self, mensaje):
+        """Enviar un mensaje en el formato de la conexión"""
+        if self.binario:
+            await self.send(bytes_data=codificar(mensaje))
+        else:
+            await self.send(text_data=json.dumps(mensaje))
+
+
+class SensorConsumer(ConsumerNegociado):
     """
     Consumer que recibe datos de sensores desde el entorno LOCAL.
     
     Autenticación: Token en query string
     URL: ws://cloud.com/ws/sensores/?token=YOUR_API_KEY
+         (subprotocolo 'bivalvia.msgpack' o &formato=msgpack para frames binarios)
     
     Flujo:
     1. Valida token en connect()
-    2. Recibe datos en receive()
-    3. Guarda en PostgreSQL
+    2. Recibe datos en receive() (una lectura o un lote)
+    3. Guarda en PostgreSQL (buffer de ingesta, escritura en lote)
     4. Hace broadcast a grupo 'dashboard_{sector_id}'
+    
+    Los lotes se procesan en tareas aparte: el LOCAL puede tener varios
+    frames en vuelo y cada ack lleva el "seq" de cada lectura, así que
+    pueden llegar en cualquier orden.
     """
     
     async def connect(self):
         logger.info("🔌 SensorConsumer.connect() llamado")
         
+        # Lotes que se están guardando (uno por frame recibido)
+        self.tareas_lote = set()
+        
         query_string = self.scope.get('query_string', b'').decode()
         logger.info(f"📋 Query string: {query_string}")
         
@@ -51,16 +101,22 @@ class SensorConsumer(AsyncWebsocketConsumer):
             return
         
         logger.info("✅ Token válido")
-        await self.accept()
+        await self.aceptar()
     
     async def disconnect(self, close_code):
         """Cleanup al desconectar"""
+        # Los lotes sin ack se reenvían al reconectar
+        for tarea in getattr(self, 'tareas_lote', ()):
+            tarea.cancel()
         print(f"🔌 WebSocket LOCAL desconectado (código: {close_code})")
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Recibir datos del LOCAL y procesarlos.
         
+        Los frames binarios traen los mismos mensajes en la forma compacta
+        de dashboard.protocolo; abajo se muestran en JSON.
+        
         Formato esperado:
         {
             "sector_id": 1,
@@ -69,18 +125,34 @@ class SensorConsumer(AsyncWebsocketConsumer):
             "turbidez": 10.5,
             "humedad": 65.3,
             "salinidad": null,
-            "marca_tiempo": "2025-01-15T10:30:00Z"
+            "marca_tiempo": "2025-01-15T10:30:00Z",
+            "seq": 42                      (opcional, se devuelve en el ack)
+        }
+        
+        O un lote de lecturas (ver recibir_lote):
+        {
+            "tipo": "lote",
+            "lote_id": "abc123",
+            "lecturas": [{...}, {...}]
         }
         """
         try:
-            data = json.loads(text_data)
+            data = self.leer_mensaje(text_data, bytes_data)
+            
+            if data.get('tipo') == 'lote':
+                # No esperar el flush: seguir leyendo los siguientes frames
+                tarea = asyncio.create_task(self.recibir_lote(data))
+                self.tareas_lote.add(tarea)
+                tarea.add_done_callback(self.tareas_lote.discard)
+                return
+            
             print(f"📊 Datos recibidos del LOCAL: {data}")
             
             # Validar datos requeridos
             if 'sector_id' not in data:
-                await self.send(text_data=json.dumps({
+                await self.responder({
                     'error': 'Falta sector_id'
-                }))
+                })
                 return
             
             sector_id = data.get('sector_id')
@@ -92,119 +164,182 @@ class SensorConsumer(AsyncWebsocketConsumer):
                 print(f"💾 Lecturas guardadas en PostgreSQL")
                 
                 # Hacer broadcast a todos los dashboards conectados a este sector
-                await self.channel_layer.group_send(
-                    f'dashboard_{sector_id}',
-                    {
-                        'type': 'sensor_update',
-                        'data': data
-                    }
-                )
+                await self.difundir(sector_id, data)
                 print(f"📡 Broadcast enviado a dashboard_{sector_id}")
                 
                 # Confirmar al LOCAL
-                await self.send(text_data=json.dumps({
+                await self.responder({
                     'status': 'success',
-                    'mensaje': 'Datos guardados y broadcast realizado'
-                }))
+                    'mensaje': 'Datos guardados y broadcast realizado',
+                    'seq': data.get('seq')
+                })
             else:
-                await self.send(text_data=json.dumps({
+                await self.responder({
                     'status': 'error',
-                    'mensaje': 'Error al guardar datos'
-                }))
+                    'mensaje': 'Error al guardar datos',
+                    'seq': data.get('seq')
+                })
                 
         except json.JSONDecodeError as e:
             print(f"❌ Error JSON: {e}")
-            await self.send(text_data=json.dumps({
+            await self.responder({
                 'error': f'JSON inválido: {str(e)}'
-            }))
+            })
+        except ValueError as e:
+            print(f"❌ Frame inválido: {e}")
+            await self.responder({
+                'error': str(e)
+            })
         except Exception as e:
             print(f"❌ Error procesando datos: {e}")
-            await self.send(text_data=json.dumps({
+            await self.responder({
                 'error': f'Error: {str(e)}'
-            }))
+            })
     
-    @database_sync_to_async
-    def guardar_lecturas(self, datos):
+    async def recibir_lote(self, data):
         """
-        Guardar lecturas en PostgreSQL (async wrapper)
+        Procesar un lote de lecturas (p.ej. el backlog de un LOCAL que se
+        reconectó) y responder con un solo ack.
+        
+        Respuesta:
+        {
+            "tipo": "ack_lote",
+            "lote_id": "abc123",
+            "status": "success" | "parcial" | "error",
+            "aceptadas": 2,
+            "rechazadas": 1,
+            "resultados": [
+                {"indice": 0, "seq": 41, "aceptada": true},
+                {"indice": 1, "seq": 42, "aceptada": false, "error": "...", "reintentar": false},
+                ...
+            ]
+        }
+        
+        "reintentar" es true cuando el rechazo fue por un error del servidor
+        y el LOCAL debe volver a enviar la lectura más tarde. "seq" es el
+        número de secuencia que mandó el LOCAL en cada lectura (si lo mandó).
+        """
+        lote_id = data.get('lote_id')
+        crudas = data.get('lecturas')
+        
+        if not isinstance(crudas, list):
+            await self.responder({
+                'tipo': 'ack_lote',
+                'lote_id': lote_id,
+                'status': 'error',
+                'error': 'Falta la lista de lecturas'
+            })
+            return
+        
+        resultados = [None] * len(crudas)
+        validas = []  # (indice, lectura normalizada)
+        
+        for indice, cruda in enumerate(crudas):
+            try:
+                if not isinstance(cruda, dict):
+                    raise ValueError('La lectura debe ser un objeto')
+                validas.append((indice, normalizar_lectura(cruda)))
+            except ValueError as e:
+                resultados[indice] = {'indice': indice, 'aceptada': False, 'error': str(e), 'reintentar': False}
+        
+        try:
+            errores = await buffer_ingesta.agregar([lectura for _, lectura in validas])
+        except Exception as e:
+            print(f"❌ Error al guardar lote {lote_id}: {e}")
+            errores = None
+        
+        # Lectura más reciente de cada sector, para el broadcast
+        ultimas = {}
+        
+        for posicion, (indice, lectura) in enumerate(validas):
+            if errores is None:
+                resultados[indice] = {'indice': indice, 'aceptada': False, 'error': 'Error al guardar datos', 'reintentar': True}
+            elif errores[posicion]:
+                resultados[indice] = {'indice': indice, 'aceptada': False, 'error': errores[posicion], 'reintentar': False}
+            else:
+                resultados[indice] = {'indice': indice, 'aceptada': True}
+                
+                actual = ultimas.get(lectura['sector_id'])
+                if actual is None or lectura['marca_tiempo'] >= actual[0]:
+                    ultimas[lectura['sector_id']] = (lectura['marca_tiempo'], crudas[indice])
+        
+        # Devolver el número de secuencia de cada lectura
+        for indice, cruda in enumerate(crudas):
+            if isinstance(cruda, dict) and 'seq' in cruda:
+                resultados[indice]['seq'] = cruda['seq']
+        
+        aceptadas = sum(1 for r in resultados if r['aceptada'])
+        rechazadas = len(resultados) - aceptadas
+        print(f"📦 Lote {lote_id}: {aceptadas} aceptadas, {rechazadas} rechazadas")
+        
+        # Un broadcast por sector con su lectura más reciente (no reenviar todo el backlog)
+        for sector_id, (_, cruda) in ultimas.items():
+            await self.difundir(sector_id, cruda)
+        
+        if rechazadas == 0:
+            status = 'success'
+        elif aceptadas == 0:
+            status = 'error'
+        else:
+            status = 'parcial'
+        
+        await self.responder({
+            'tipo': 'ack_lote',
+            'lote_id': lote_id,
+            'status': status,
+            'aceptadas': aceptadas,
+            'rechazadas': rechazadas,
+            'resultados': resultados
+        })
+    
+    async def difundir(self, sector_id, data):
+        """
+        Broadcast de una lectura a los dashboards del sector.
+        
+        El frame para el browser se codifica una sola vez acá, en JSON y en
+        MessagePack: cada DashboardConsumer envía tal cual el de su formato,
+        así el costo de codificar no crece con la cantidad de browsers
+        conectados.
+        """
+        mensaje = {
+            'type': 'sensor_data',
+            'data': data
+        }
+        await self.channel_layer.group_send(
+            f'dashboard_{sector_id}',
+            {
+                'type': 'sensor_update',
+                'sector_id': int(sector_id),
+                # marca_tiempo es datetime si la lectura llegó en binario
+                'texto': json.dumps(mensaje, cls=DjangoJSONEncoder),
+                'binario': codificar(mensaje)
+            }
+        )
+    
+    async def guardar_lecturas(self, datos):
+        """
+        Guardar lecturas en PostgreSQL a través del buffer de ingesta.
+        
+        La lectura se agrupa con las de otras conexiones y se escribe con
+        bulk_create; esta corrutina espera a que el flush termine.
         
         Returns:
             bool: True si se guardó correctamente
         """
+        sector_id = datos.get('sector_id')
+        
         try:
-            from dashboard.models import (
-                Sector, HistorialTemperatura, HistorialSalinidad,
-                HistorialPh, HistorialTurbidez, HistorialHumedad
-            )
-            
-            sector_id = datos.get('sector_id')
-            sector = Sector.objects.get(id=sector_id)
-            
-            # Parsear timestamp (si viene del LOCAL) o usar actual
-            marca_tiempo_str = datos.get('marca_tiempo')
-            if marca_tiempo_str:
-                # Intentar parsear ISO format
-                try:
-                    marca_tiempo = datetime.fromisoformat(marca_tiempo_str.replace('Z', '+00:00'))
-                    if timezone.is_naive(marca_tiempo):
-                        marca_tiempo = timezone.make_aware(marca_tiempo)
-                except:
-                    marca_tiempo = timezone.now()
-            else:
-                marca_tiempo = timezone.now()
-            
-            guardados = 0
-            
-            # Guardar temperatura
-            if datos.get('temperatura') is not None and datos['temperatura'] != -999:
-                HistorialTemperatura.objects.create(
-                    sector=sector,
-                    valor=datos['temperatura'],
-                    marca_tiempo=marca_tiempo
-                )
-                guardados += 1
-            
-            # Guardar pH
-            if datos.get('ph') is not None:
-                HistorialPh.objects.create(
-                    sector=sector,
-                    valor=datos['ph'],
-                    marca_tiempo=marca_tiempo
-                )
-                guardados += 1
-            
-            # Guardar turbidez
-            if datos.get('turbidez') is not None:
-                HistorialTurbidez.objects.create(
-                    sector=sector,
-                    valor=datos['turbidez'],
-                    marca_tiempo=marca_tiempo
-                )
-                guardados += 1
+            lectura = normalizar_lectura(datos)
+            errores = await buffer_ingesta.agregar([lectura])
             
-            # Guardar humedad
-            if datos.get('humedad') is not None:
-                HistorialHumedad.objects.create(
-                    sector=sector,
-                    valor=datos['humedad'],
-                    marca_tiempo=marca_tiempo
-                )
-                guardados += 1
-            
-            # Guardar salinidad
-            if datos.get('salinidad') is not None:
-                HistorialSalinidad.objects.create(
-                    sector=sector,
-                    valor=datos['salinidad'],
-                    marca_tiempo=marca_tiempo
-                )
-                guardados += 1
+            if errores[0]:
+                print(f"❌ {errores[0]}")
+                return False
             
-            print(f"💾 {guardados} lecturas guardadas en PostgreSQL")
             return True
             
-        except Sector.DoesNotExist:
-            print(f"❌ Sector {sector_id} no existe en cloud")
+        except ValueError as e:
+            print(f"❌ Lectura inválida del sector {sector_id}: {e}")
             return False
         except Exception as e:
             print(f"❌ Error al guardar en PostgreSQL: {e}")
@@ -213,26 +348,70 @@ class SensorConsumer(AsyncWebsocketConsumer):
             return False
 
 
-class DashboardConsumer(AsyncWebsocketConsumer):
+# Lecturas que devuelve un resync como máximo (si faltan más, el browser
+# pide request_history: es más barato que mandar el detalle crudo)
+RESYNC_MAXIMO = 1000
+
+
+def _parsear_fecha(valor):
+    """Fecha ISO 8601 del browser a datetime aware (ValueError si no es válida)"""
+    fecha = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+class DashboardConsumer(ConsumerNegociado):
     """
     Consumer que envía datos en tiempo real a los dashboards (browsers).
     
     Autenticación: Session de Django (usuario logueado)
-    URL: ws://cloud.com/ws/dashboard/1/
+    URL: ws://cloud.com/ws/dashboard/1/   (un sector)
+         ws://cloud.com/ws/dashboard/     (multiplexado, ver receive)
+         (?formato=msgpack o subprotocolo 'bivalvia.msgpack' para frames binarios)
     
     Flujo:
     1. Usuario debe estar autenticado (Django session)
-    2. Se une al grupo 'dashboard_{sector_id}'
+    2. Se une al grupo 'dashboard_{sector_id}' de cada sector suscripto
     3. Recibe broadcasts de SensorConsumer
     4. Envía datos al browser
+    
+    En la URL multiplexada la conexión empieza sin sectores y el browser se
+    suscribe a los que necesite (o a zonas enteras), así una vista general
+    de 50 sectores usa un solo socket en lugar de 50. Cada frame
+    'sensor_data' trae data.sector_id para saber de qué sector es.
+    
+    Al conectar (y al suscribirse) se envía un 'snapshot' con el último
+    valor de cada sector; el historial y la recuperación después de una
+    reconexión se piden por el mismo socket (ver receive).
+    
+    Los broadcasts llegan ya codificados (ver SensorConsumer.difundir) y no
+    se reenvían uno por uno: sensor_update deja el frame en `pendientes`
+    (uno por sector, el más nuevo reemplaza al anterior) y
+    una tarea por conexión las envía como mucho una vez cada
+    DASHBOARD_INTERVALO_ENVIO segundos. Un sector a 10 Hz o el replay de un
+    backlog no llenan el buffer de salida de un browser lento: lo pendiente
+    nunca pasa de una lectura por sector. El cliente puede pedir un
+    intervalo más largo con ?intervalo=<segundos>.
     """
     
     async def connect(self):
         """Validar autenticación y unirse al grupo"""
         
-        # Obtener sector_id de la URL
-        self.sector_id = self.scope['url_route']['kwargs']['sector_id']
-        self.group_name = f'dashboard_{self.sector_id}'
+        # Cola de salida: sector_id -> frame (texto o bytes) más reciente sin enviar
+        self.pendientes = {}
+        self.hay_pendientes = asyncio.Event()
+        self.combinadas = 0  # Lecturas reemplazadas antes de enviarse
+        self.tarea_envio = None
+        
+        # Suscripciones: sectores pedidos directamente y por zona
+        # (el sector de la URL cuenta como directo)
+        self.sectores_directos = set()
+        self.zonas = {}  # zona_id -> {sector_id, ...}
+        self.suscritos = set()  # Grupos a los que está unido el canal
+        
+        # Obtener sector_id de la URL (no hay en la URL multiplexada)
+        self.sector_id = self.scope['url_route']['kwargs'].get('sector_id')
         
         # Verificar autenticación (si el usuario está logueado)
         user = self.scope.get('user')
@@ -242,47 +421,273 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             return
         
         # Unirse al grupo del sector
-        await self.channel_layer.group_add(
-            self.group_name,
-            self.channel_name
-        )
+        if self.sector_id is not None:
+            self.sector_id = int(self.sector_id)
+            self.sectores_directos.add(self.sector_id)
+            await self._actualizar_grupos()
+        
+        self.intervalo_envio = self._intervalo_envio()
         
-        print(f"✅ Dashboard WebSocket conectado para sector {self.sector_id} (usuario: {user.username})")
-        await self.accept()
+        print(f"✅ Dashboard WebSocket conectado para sector {self.sector_id or '(multiplexado)'} (usuario: {user.username})")
+        await self.aceptar()
+        
+        self.tarea_envio = asyncio.create_task(self._bucle_envio())
         
         # Enviar mensaje de bienvenida
-        await self.send(text_data=json.dumps({
+        await self.responder({
             'type': 'connection_established',
-            'message': f'Conectado al sector {self.sector_id}',
+            'message': f'Conectado al sector {self.sector_id}' if self.sector_id is not None else 'Conectado',
             'sector_id': self.sector_id
-        }))
+        })
+        
+        if self.suscritos:
+            await self.enviar_snapshot(self.suscritos)
     
     async def disconnect(self, close_code):
-        """Salir del grupo al desconectar"""
+        """Salir de los grupos al desconectar"""
         
-        # Salir del grupo
-        await self.channel_layer.group_discard(
-            self.group_name,
-            self.channel_name
-        )
+        if self.tarea_envio:
+            self.tarea_envio.cancel()
         
-        print(f"🔌 Dashboard WebSocket desconectado para sector {self.sector_id} (código: {close_code})")
+        # Salir de los grupos
+        for sector_id in getattr(self, 'suscritos', ()):
+            await self.channel_layer.group_discard(
+                f'dashboard_{sector_id}',
+                self.channel_name
+            )
+        
+        print(f"🔌 Dashboard WebSocket desconectado para sector {self.sector_id} (código: {close_code}, {self.combinadas} lecturas combinadas)")
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
-        Opcional: Manejar mensajes del browser (por si quieres comandos bidireccionales)
+        Mensajes del browser (JSON, o MessagePack en un frame binario). Los pedidos pueden traer un "id" que se
+        devuelve en la respuesta (y en el error, si falla).
+        
+        Suscripciones (cualquier URL):
+        {"type": "subscribe", "id": 6, "sectores": [1, 2], "zonas": [3]}
+        {"type": "unsubscribe", "sectores": [2], "zonas": [3]}
+        -> {"type": "subscribed", "id": 6, "sectores": [1, 5, 6], "zonas": [3]}
+           (seguido de un "snapshot" de los sectores nuevos)
+        
+        Historial de un sector suscripto, reducido como en datos_grafico
+        (agregados + LTTB):
+        {"type": "request_history", "id": 7, "sector_id": 1,
+         "desde": "2025-01-15T00:00:00Z", "hasta": "...", "puntos": 500}
+        -> {"type": "history", "id": 7, "sector_id": 1, "fuente": "1h",
+            "marcas_tiempo": [...], "temperatura": [...], ...}
+        
+        Lecturas posteriores a la última que vio el browser (al reconectar):
+        {"type": "resync", "id": 8, "sector_id": 1, "desde": "<marca_tiempo>"}
+        -> {"type": "resync", "id": 8, "sector_id": 1, "lecturas": [...], "completo": true}
+           Si faltan más de RESYNC_MAXIMO lecturas: "lecturas": [] y
+           "completo": false, y el browser pide request_history.
+        
+        Keep-alive:
+        {"type": "ping"} -> {"type": "pong"}
         """
+        pedido_id = None
         try:
-            data = json.loads(text_data)
-            print(f"📨 Mensaje del dashboard: {data}")
+            data = self.leer_mensaje(text_data, bytes_data)
+            tipo = data.get('type')
+            pedido_id = data.get('id')
             
-            # Aquí podrías implementar comandos como:
-            # - "ping" para keep-alive
-            # - "request_history" para pedir datos históricos
-            # etc.
+            if tipo in ('subscribe', 'unsubscribe'):
+                await self.cambiar_suscripcion(
+                    pedido_id,
+                    tipo == 'subscribe',
+                    data.get('sectores') or [],
+                    data.get('zonas') or [],
+                )
+            elif tipo == 'request_history':
+                await self.enviar_historial(pedido_id, data)
+            elif tipo == 'resync':
+                await self.enviar_resync(pedido_id, data)
+            elif tipo == 'ping':
+                await self.responder({'type': 'pong', 'id': pedido_id})
+            else:
+                raise ValueError(f'Tipo de mensaje desconocido: {tipo}')
             
         except Exception as e:
             print(f"❌ Error procesando mensaje del dashboard: {e}")
+            await self.responder({
+                'type': 'error',
+                'id': pedido_id,
+                'error': str(e)
+            })
+    
+    async def cambiar_suscripcion(self, pedido_id, suscribir, sectores, zonas):
+        """Agregar o quitar sectores/zonas y ajustar los grupos del canal"""
+        sectores = {int(sector_id) for sector_id in sectores}
+        zonas = {int(zona_id) for zona_id in zonas}
+        
+        if suscribir:
+            directos = self.sectores_directos | await self._sectores_existentes(sectores)
+            por_zona = dict(self.zonas)
+            for zona_id in zonas - set(por_zona):
+                por_zona[zona_id] = await self._sectores_de_zona(zona_id)
+            
+            if len(directos.union(*por_zona.values())) > settings.DASHBOARD_MAXIMO_SECTORES:
+                raise ValueError(f'Máximo {settings.DASHBOARD_MAXIMO_SECTORES} sectores por conexión')
+            self.sectores_directos, self.zonas = directos, por_zona
+        else:
+            self.sectores_directos -= sectores
+            for zona_id in zonas:
+                self.zonas.pop(zona_id, None)
+        
+        nuevos = await self._actualizar_grupos()
+        
+        await self.responder({
+            'type': 'subscribed',
+            'id': pedido_id,
+            'sectores': sorted(self.suscritos),
+            'zonas': sorted(self.zonas)
+        })
+        
+        if nuevos:
+            await self.enviar_snapshot(nuevos)
+    
+    async def enviar_snapshot(self, sector_ids):
+        """Último valor de cada sector (ver dashboard.ultimas)"""
+        ultimas = await database_sync_to_async(ultimas_lecturas)(sorted(sector_ids))
+        
+        await self.responder({
+            'type': 'snapshot',
+            'sectores': {
+                sector_id: dict(ultima, marca_tiempo=ultima['marca_tiempo'].isoformat()) if ultima else None
+                for sector_id, ultima in ultimas.items()
+            }
+        })
+    
+    def _sector_suscripto(self, data):
+        try:
+            sector_id = int(data.get('sector_id'))
+        except (TypeError, ValueError):
+            raise ValueError(f"sector_id inválido: {data.get('sector_id')}")
+        if sector_id not in self.suscritos:
+            raise ValueError(f'No hay suscripción al sector {sector_id}')
+        return sector_id
+    
+    async def enviar_historial(self, pedido_id, data):
+        sector_id = self._sector_suscripto(data)
+        hasta = _parsear_fecha(data['hasta']) if data.get('hasta') else timezone.now()
+        desde = _parsear_fecha(data['desde']) if data.get('desde') else hasta - timedelta(hours=24)
+        if desde > hasta:
+            raise ValueError('desde debe ser anterior a hasta')
+        
+        serie = await database_sync_to_async(serie_grafico)(
+            sector_id, desde, hasta,
+            puntos=int(data.get('puntos') or settings.GRAFICO_PUNTOS),
+            metricas=data.get('metricas'),
+        )
+        
+        await self.responder({
+            'type': 'history',
+            'id': pedido_id,
+            'sector_id': sector_id,
+            **serie
+        })
+    
+    async def enviar_resync(self, pedido_id, data):
+        sector_id = self._sector_suscripto(data)
+        desde = _parsear_fecha(data['desde'])
+        
+        lecturas = await self._lecturas_desde(sector_id, desde)
+        completo = len(lecturas) <= RESYNC_MAXIMO
+        
+        await self.responder({
+            'type': 'resync',
+            'id': pedido_id,
+            'sector_id': sector_id,
+            'lecturas': lecturas if completo else [],
+            'completo': completo
+        })
+    
+    @database_sync_to_async
+    def _lecturas_desde(self, sector_id, desde):
+        """Hasta RESYNC_MAXIMO + 1 lecturas posteriores a `desde`, en orden"""
+        filas = Lectura.objects.filter(
+            sector_id=sector_id, marca_tiempo__gt=desde
+        ).order_by('marca_tiempo').values_list('marca_tiempo', *Lectura.METRICAS)[:RESYNC_MAXIMO + 1]
+        
+        return [
+            {
+                'sector_id': sector_id,
+                'marca_tiempo': marca_tiempo.isoformat(),
+                **{
+                    metrica: float(valor) if valor is not None else None
+                    for metrica, valor in zip(Lectura.METRICAS, valores)
+                },
+            }
+            for marca_tiempo, *valores in filas
+        ]
+    
+    async def _actualizar_grupos(self):
+        """
+        Unir/sacar el canal de los grupos según las suscripciones.
+        Devuelve los sectores agregados.
+        """
+        deseados = self.sectores_directos.union(*self.zonas.values())
+        nuevos = deseados - self.suscritos
+        
+        for sector_id in deseados - self.suscritos:
+            await self.channel_layer.group_add(f'dashboard_{sector_id}', self.channel_name)
+        for sector_id in self.suscritos - deseados:
+            await self.channel_layer.group_discard(f'dashboard_{sector_id}', self.channel_name)
+            self.pendientes.pop(sector_id, None)
+        
+        self.suscritos = deseados
+        return nuevos
+    
+    @database_sync_to_async
+    def _sectores_existentes(self, sector_ids):
+        return set(Sector.objects.filter(id__in=sector_ids).values_list('id', flat=True))
+    
+    @database_sync_to_async
+    def _sectores_de_zona(self, zona_id):
+        return set(Sector.objects.filter(zonas__id=zona_id).values_list('id', flat=True))
+    
+    def _intervalo_envio(self):
+        """DASHBOARD_INTERVALO_ENVIO, o el ?intervalo= del cliente si es más largo"""
+        intervalo = settings.DASHBOARD_INTERVALO_ENVIO
+        
+        parametros = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            pedido = float(parametros.get('intervalo', [0])[0])
+        except ValueError:
+            pedido = 0
+        
+        return min(max(intervalo, pedido), max(intervalo, settings.DASHBOARD_INTERVALO_MAXIMO))
+    
+    async def _bucle_envio(self):
+        """
+        Enviar lo pendiente y esperar el intervalo antes del siguiente envío.
+        La primera lectura después de un rato sin datos sale enseguida.
+        
+        Si un envío falla (socket a medio cerrar) se cierra la conexión: el
+        browser reconecta y pide resync, en lugar de quedar conectado sin
+        recibir nada.
+        """
+        try:
+            while True:
+                await self.hay_pendientes.wait()
+                self.hay_pendientes.clear()
+                
+                pendientes, self.pendientes = self.pendientes, {}
+                for frame in pendientes.values():
+                    if self.binario:
+                        await self.send(bytes_data=frame)
+                    else:
+                        await self.send(text_data=frame)
+                
+                await asyncio.sleep(self.intervalo_envio)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Error enviando al dashboard del sector {self.sector_id}: {e}")
+            try:
+                await self.close(code=1011)
+            except Exception:
+                pass  # El socket ya estaba cerrado
     
     async def sensor_update(self, event):
         """
@@ -290,13 +695,11 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         Este método se llama cuando SensorConsumer hace group_send.
         
         El nombre 'sensor_update' debe coincidir con el 'type' en group_send.
+        Solo encola el frame (ya codificado); lo envía _bucle_envio.
         """
-        data = event['data']
-        
-        # Enviar datos al browser
-        await self.send(text_data=json.dumps({
-            'type': 'sensor_data',
-            'data': data
-        }))
+        sector_id = event['sector_id']
         
-        print(f"📤 Datos enviados al dashboard: {data}")
\ No newline at end of file
+        if sector_id in self.pendientes:
+            self.combinadas += 1
+        self.pendientes[sector_id] = event['binario'] if self.binario else event['texto']
+        self.hay_pendientes.set()
@@ -0,0 +1,339 @@
+"""
+Exportación del historial de lecturas de un sector.
+
+Los exportadores recorren la tabla Lectura (ya alineada: una fila por
+marca de tiempo) en bloques con un cursor del lado del servidor
+(en_bloques) y van entregando el archivo por partes, así la memoria no
+depende del largo del rango.
+
+Características:
+- CSV en streaming: generador async que se pasa directo a
+  StreamingHttpResponse (bajo ASGI Django no lo junta en memoria)
+- Compresión gzip opcional al vuelo
+- Incluye las lecturas aunque no tengan temperatura
+- Formatos columnares para análisis: Parquet y Arrow IPC (requieren
+  pyarrow) o .npz de NumPy si pyarrow no está instalado. marca_tiempo es
+  int64 (milisegundos desde epoch, UTC) y cada métrica una columna float32
+  con NaN donde no hay dato
+
+Uso:
+    from dashboard.exportacion import lecturas_a_exportar, csv_streaming, gzip_streaming
+
+    lecturas = lecturas_a_exportar(sector_id, desde, hasta)
+    partes = gzip_streaming(csv_streaming(lecturas))
+    return StreamingHttpResponse(partes, content_type='application/gzip')
+
+    from dashboard.exportacion import escribir_columnar
+
+    with open('sector_3.parquet', 'wb') as archivo:
+        filas = escribir_columnar(archivo, 'parquet', sector_id=3)
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+from dashboard.campos import escalas, sin_escalar
+from dashboard.models import Lectura
+
+# pyarrow es opcional: sin él solo se exporta .npz
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Columnas del CSV (mismo orden que el encabezado)
+COLUMNAS_CSV = ('temperatura', 'ph', 'turbidez', 'humedad')
+ENCABEZADO_CSV = ['Fecha', 'Hora', 'Temperatura (°C)', 'pH', 'Turbidez (NTU)', 'Humedad (%)']
+
+
+def alguna_columna(columnas) -> Q:
+    """Filtro de las lecturas con al menos una de las columnas"""
+    alguna = Q()
+    for columna in columnas:
+        alguna |= Q(**{f'{columna}__isnull': False})
+    return alguna
+
+
+def lecturas_a_exportar(sector_id: int, desde: datetime, hasta: datetime,
+                        columnas=COLUMNAS_CSV) -> QuerySet:
+    """
+    Lecturas del sector en [desde, hasta] con al menos una de las columnas,
+    más recientes primero, como tuplas (marca_tiempo, *columnas)
+    """
+    return Lectura.objects.filter(
+        alguna_columna(columnas),
+        sector_id=sector_id,
+        marca_tiempo__gte=desde,
+        marca_tiempo__lte=hasta,
+    ).order_by('-marca_tiempo').values_list('marca_tiempo', *columnas)
+
+
+def _filas_csv(bloque: List[tuple]) -> Iterator[list]:
+    """Tuplas (marca_tiempo, *valores) -> filas del CSV"""
+    for marca_tiempo, *valores in bloque:
+        yield [
+            marca_tiempo.strftime('%d/%m/%Y'),
+            marca_tiempo.strftime('%H:%M:%S'),
+            *('' if valor is None else f'{valor:.2f}' for valor in valores),
+        ]
+
+
+def escribir_csv(destino: BinaryIO, lecturas: QuerySet, tamano_chunk: int = None) -> int:
+    """
+    Versión sincrónica de csv_streaming: escribe el CSV en un archivo
+    binario abierto (p.ej. desde un proceso del pool de exportación).
+
+    Returns:
+        int: Cantidad de lecturas escritas
+    """
+    tamano_chunk = tamano_chunk or settings.EXPORTACION_TAMANO_CHUNK
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='', write_through=True)
+    writer = csv.writer(texto)
+    writer.writerow(ENCABEZADO_CSV)
+
+    filas = 0
+    iterador = lecturas.iterator(chunk_size=tamano_chunk)
+    while True:
+        bloque = list(islice(iterador, tamano_chunk))
+        if not bloque:
+            break
+        writer.writerows(_filas_csv(bloque))
+        filas += len(bloque)
+
+    texto.flush()
+    texto.detach()  # No cerrar `destino`: es de quien lo abrió
+    return filas
+
+
+async def en_bloques(queryset: QuerySet, tamano_chunk: int = None) -> AsyncIterator[List[tuple]]:
+    """
+    Recorrer un queryset desde código async en listas de `tamano_chunk` filas.
+
+    Usa queryset.iterator() (cursor del lado del servidor en PostgreSQL,
+    fetchmany en SQLite) y pide cada bloque con sync_to_async, siempre en
+    el mismo thread, así el cursor sigue abierto entre un bloque y otro.
+    (QuerySet.aiterator() no sirve: con values_list ejecuta la consulta
+    dentro del event loop.)
+    """
+    tamano_chunk = tamano_chunk or settings.EXPORTACION_TAMANO_CHUNK
+    iterador = queryset.iterator(chunk_size=tamano_chunk)
+    siguiente_bloque = sync_to_async(lambda: list(islice(iterador, tamano_chunk)), thread_sensitive=True)
+
+    while True:
+        bloque = await siguiente_bloque()
+        if not bloque:
+            break
+        yield bloque
+        if len(bloque) < tamano_chunk:
+            break
+
+
+async def csv_streaming(lecturas: QuerySet, tamano_chunk: int = None) -> AsyncIterator[bytes]:
+    """
+    CSV (UTF-8 con BOM, para Excel) de las tuplas de lecturas_a_exportar,
+    una parte por bloque leído de la base
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(ENCABEZADO_CSV)
+
+    async for bloque in en_bloques(lecturas, tamano_chunk):
+        writer.writerows(_filas_csv(bloque))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Solo el encabezado si no hubo lecturas
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+async def gzip_streaming(partes: AsyncIterator[bytes], nivel: int = 6) -> AsyncIterator[bytes]:
+    """Comprimir un stream de bytes a formato .gz sin juntarlo en memoria"""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    async for parte in partes:
+        comprimido = compresor.compress(parte)
+        if comprimido:
+            yield comprimido
+
+    yield compresor.flush()
+
+
+# ============================================================================
+# FORMATOS COLUMNARES
+# ============================================================================
+
+# formato -> (extensión, content type)
+FORMATOS_COLUMNARES = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+    'npz': ('.npz', 'application/octet-stream'),
+}
+
+# Filas por row group (Parquet) / record batch (Arrow): grupos grandes
+# comprimen mejor y se leen más rápido que un grupo por bloque de la base
+FILAS_POR_GRUPO = 131072
+
+
+def formatos_disponibles() -> List[str]:
+    """Formatos columnares que se pueden escribir con lo instalado"""
+    return [formato for formato in FORMATOS_COLUMNARES if formato == 'npz' or pa is not None]
+
+
+def formato_por_defecto() -> str:
+    return 'parquet' if pa is not None else 'npz'
+
+
+def bloques_columnares(sector_id: int, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                       tamano_chunk: int = None) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Lecturas del sector en orden cronológico, en bloques de columnas NumPy
+    armados desde values_list (sin instanciar modelos).
+
+    Yields:
+        dict: {'marca_tiempo': int64 ms epoch, '<metrica>': float32, ...}
+    """
+    tamano_chunk = tamano_chunk or settings.EXPORTACION_TAMANO_CHUNK
+
+    lecturas = Lectura.objects.filter(sector_id=sector_id)
+    if desde is not None:
+        lecturas = lecturas.filter(marca_tiempo__gte=desde)
+    if hasta is not None:
+        lecturas = lecturas.filter(marca_tiempo__lte=hasta)
+
+    iterador = lecturas.order_by('marca_tiempo').values_list(
+        'marca_tiempo', *map(sin_escalar, Lectura.METRICAS)
+    ).iterator(chunk_size=tamano_chunk)
+    divisores = np.array(escalas(Lectura, Lectura.METRICAS), dtype=np.float64)
+
+    while True:
+        bloque = list(islice(iterador, tamano_chunk))
+        if not bloque:
+            break
+
+        segundos = np.fromiter((fila[0].timestamp() for fila in bloque), dtype=np.float64, count=len(bloque))
+        # Enteros escalados -> unidades reales (None -> NaN)
+        valores = (np.array([fila[1:] for fila in bloque], dtype=np.float64) / divisores).astype(np.float32)
+
+        columnas = {'marca_tiempo': np.round(segundos * 1000).astype(np.int64)}
+        for i, metrica in enumerate(Lectura.METRICAS):
+            columnas[metrica] = np.ascontiguousarray(valores[:, i])
+        yield columnas
+
+
+def _agrupar(bloques: Iterator[Dict[str, np.ndarray]], filas: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Juntar bloques chicos en grupos de ~`filas` filas"""
+    pendientes = []
+    cantidad = 0
+    for bloque in bloques:
+        pendientes.append(bloque)
+        cantidad += len(bloque['marca_tiempo'])
+        if cantidad >= filas:
+            yield {nombre: np.concatenate([b[nombre] for b in pendientes]) for nombre in bloque}
+            pendientes = []
+            cantidad = 0
+
+    if pendientes:
+        yield {nombre: np.concatenate([b[nombre] for b in pendientes]) for nombre in pendientes[0]}
+
+
+def _esquema_arrow(sector_id: int):
+    return pa.schema(
+        [('marca_tiempo', pa.timestamp('ms', tz='UTC'))] +
+        [(metrica, pa.float32()) for metrica in Lectura.METRICAS],
+        metadata={'sector_id': str(sector_id)},
+    )
+
+
+def _a_record_batch(columnas: Dict[str, np.ndarray], esquema):
+    return pa.record_batch(
+        [pa.array(columnas['marca_tiempo'], type=pa.timestamp('ms', tz='UTC'))] +
+        # NaN -> null: columnas sin dato casi no ocupan y pandas las lee como NaN
+        [pa.array(columnas[metrica], type=pa.float32(), mask=np.isnan(columnas[metrica]))
+         for metrica in Lectura.METRICAS],
+        schema=esquema,
+    )
+
+
+def escribir_columnar(destino: BinaryIO, formato: str, sector_id: int,
+                      desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> int:
+    """
+    Escribir el historial del sector en `destino` (archivo binario abierto).
+
+    Parquet y Arrow se escriben por grupos (memoria acotada). El .npz
+    necesita las columnas completas: ocupa ~32 bytes por lectura en memoria.
+
+    Returns:
+        int: Cantidad de lecturas escritas
+
+    Raises:
+        ValueError: si el formato no existe o falta pyarrow para escribirlo
+    """
+    if formato not in FORMATOS_COLUMNARES:
+        raise ValueError(f'Formato inválido: {formato}')
+    if formato not in formatos_disponibles():
+        raise ValueError(f'El formato {formato} requiere pyarrow (disponibles: {", ".join(formatos_disponibles())})')
+
+    grupos = _agrupar(bloques_columnares(sector_id, desde, hasta), FILAS_POR_GRUPO)
+    filas = 0
+
+    if formato == 'npz':
+        columnas = {nombre: [] for nombre in ('marca_tiempo',) + Lectura.METRICAS}
+        for grupo in grupos:
+            for nombre, valores in grupo.items():
+                columnas[nombre].append(valores)
+            filas += len(grupo['marca_tiempo'])
+
+        np.savez_compressed(destino, **{
+            nombre: np.concatenate(partes) if partes else np.empty(0, dtype=np.int64 if nombre == 'marca_tiempo' else np.float32)
+            for nombre, partes in columnas.items()
+        })
+        return filas
+
+    esquema = _esquema_arrow(sector_id)
+
+    if formato == 'parquet':
+        # BYTE_STREAM_SPLIT agrupa los bytes de cada float: comprime mucho mejor
+        with pq.ParquetWriter(destino, esquema, compression='zstd', use_dictionary=False,
+                              use_byte_stream_split=list(Lectura.METRICAS)) as writer:
+            for grupo in grupos:
+                writer.write_batch(_a_record_batch(grupo, esquema))
+                filas += len(grupo['marca_tiempo'])
+    else:
+        opciones = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_file(destino, esquema, options=opciones) as writer:
+            for grupo in grupos:
+                writer.write_batch(_a_record_batch(grupo, esquema))
+                filas += len(grupo['marca_tiempo'])
+
+    return filas
+
+
+async def archivo_streaming(archivo: BinaryIO, tamano: int = 256 * 1024) -> AsyncIterator[bytes]:
+    """
+    Enviar un archivo ya escrito por partes y cerrarlo al terminar.
+    (FileResponse bajo ASGI lee el archivo entero a memoria antes de enviarlo.)
+    """
+    leer = sync_to_async(archivo.read, thread_sensitive=False)
+    try:
+        while True:
+            parte = await leer(tamano)
+            if not parte:
+                break
+            yield parte
+    finally:
+        archivo.close()
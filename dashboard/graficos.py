@@ -0,0 +1,210 @@
+"""
+Series para los gráficos de sector_detail con resolución automática.
+
+Dado un rango y una cantidad de puntos objetivo, elige la fuente más
+liviana que todavía tenga detalle suficiente (lecturas crudas o los
+agregados de 1 minuto / 1 hora / 1 día) y la reduce con
+Largest-Triangle-Three-Buckets (LTTB) a esa cantidad de puntos. Un
+gráfico de 30 días lee ~720 agregados por hora y devuelve ~500 puntos.
+
+Características:
+- Todas las métricas comparten el mismo eje de tiempo (sin desalinear por índice)
+- LTTB multi-serie: el área del triángulo se suma sobre las métricas
+  normalizadas, así un pico en cualquiera de ellas conserva su punto
+- Cálculo con NumPy: cada intervalo se evalúa vectorizado sobre todos sus
+  candidatos y métricas
+- Si los agregados del rango todavía no existen se usan las lecturas crudas
+
+Uso:
+    from dashboard.graficos import serie_grafico
+
+    serie = serie_grafico(sector_id, desde, hasta, puntos=500)
+    # {'fuente': '1h', 'marcas_tiempo': [...], 'temperatura': [...], ...}
+"""
+
+import logging
+import warnings
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dashboard.agregados import GRANULARIDADES, inicio_intervalo
+from dashboard.campos import escalas, sin_escalar
+from dashboard.models import Lectura, LecturaAgregada
+
+logger = logging.getLogger(__name__)
+
+
+# Métricas que dibuja sector_detail
+METRICAS_GRAFICO = ('temperatura', 'ph', 'turbidez', 'humedad')
+
+# Tope de puntos por respuesta (lo que pida el cliente)
+PUNTOS_MAXIMO = 5000
+
+
+def lttb(x: np.ndarray, y: np.ndarray, umbral: int) -> np.ndarray:
+    """
+    Índices de los puntos que conserva Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Tiempos, forma (n,), en orden creciente
+        y: Valores, forma (n, m), una columna por métrica (NaN = sin dato)
+        umbral: Cantidad de puntos a conservar (incluye el primero y el último)
+
+    Returns:
+        np.ndarray: Índices crecientes, a lo sumo `umbral`
+    """
+    n = len(x)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+
+    # Normalizar cada métrica a [0, 1] para que ninguna domine el área
+    # (una métrica sin ningún dato queda en NaN y no suma)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        minimo = np.nanmin(y, axis=0)
+        rango = np.nanmax(y, axis=0) - minimo
+    rango = np.where(rango > 0, rango, 1.0)
+    yn = (y - np.nan_to_num(minimo)) / rango
+    tx = (x - x[0]) / ((x[-1] - x[0]) or 1.0)
+
+    # Intervalos para los puntos intermedios (el primero y el último quedan fijos)
+    bordes = np.linspace(1, n - 1, umbral - 1).astype(np.int64)
+
+    # Promedio de cada intervalo (punto "C" del triángulo del intervalo anterior)
+    validos = np.isfinite(yn)
+    sumas_x = np.add.reduceat(tx[:-1], bordes[:-1])
+    sumas_y = np.add.reduceat(np.where(validos, yn, 0.0)[:-1], bordes[:-1], axis=0)
+    cuentas_y = np.add.reduceat(validos[:-1], bordes[:-1], axis=0)
+    largos = np.diff(bordes)
+    promedio_x = sumas_x / largos
+    with np.errstate(invalid='ignore', divide='ignore'):
+        promedio_y = sumas_y / cuentas_y
+
+    # El "siguiente" del último intervalo es el último punto
+    promedio_x = np.append(promedio_x, tx[-1])
+    promedio_y = np.vstack([promedio_y, yn[-1]])
+
+    indices = np.empty(umbral, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for k in range(umbral - 2):
+        inicio, fin = bordes[k], bordes[k + 1]
+        cx, cy = promedio_x[k + 1], promedio_y[k + 1]
+        ax, ay = tx[a], yn[a]
+
+        bx = tx[inicio:fin, None]
+        by = yn[inicio:fin]
+        areas = np.abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+        areas = np.nansum(areas, axis=1)
+
+        a = inicio + int(np.argmax(areas))
+        indices[k + 1] = a
+
+    return indices
+
+
+def _fuente(desde: datetime, hasta: datetime, puntos: int) -> str:
+    """
+    La granularidad más gruesa que todavía da al menos `puntos` puntos en
+    el rango ('crudo' si ni la de 1 minuto alcanza)
+    """
+    ancho = (hasta - desde).total_seconds() / max(puntos, 1)
+    fuente = 'crudo'
+    for granularidad, (duracion, _) in GRANULARIDADES.items():
+        if duracion.total_seconds() <= ancho:
+            fuente = granularidad
+    return fuente
+
+
+def _cargar_crudo(sector_id: int, desde: datetime, hasta: datetime,
+                  metricas: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    filas = list(
+        Lectura.objects.filter(
+            sector_id=sector_id, marca_tiempo__gte=desde, marca_tiempo__lte=hasta
+        ).order_by('marca_tiempo').values_list('marca_tiempo', *map(sin_escalar, metricas))
+    )
+    if not filas:
+        return np.empty(0), np.empty((0, len(metricas)))
+
+    x = np.fromiter((fila[0].timestamp() for fila in filas), dtype=np.float64, count=len(filas))
+    # Enteros escalados -> unidades reales en una sola división (None -> NaN)
+    y = np.array([fila[1:] for fila in filas], dtype=np.float64) / escalas(Lectura, metricas)
+    return x, y
+
+
+def _cargar_agregado(sector_id: int, desde: datetime, hasta: datetime,
+                     metricas: Sequence[str], granularidad: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Promedios por intervalo, pivotados a una fila por intervalo y una columna por métrica"""
+    filas = list(
+        LecturaAgregada.objects.filter(
+            sector_id=sector_id,
+            granularidad=granularidad,
+            metrica__in=metricas,
+            inicio__gte=inicio_intervalo(desde, granularidad),
+            inicio__lte=hasta,
+        ).order_by('inicio').values_list('inicio', 'metrica', 'suma', 'cantidad')
+    )
+    if not filas:
+        return np.empty(0), np.empty((0, len(metricas)))
+
+    tiempos = np.fromiter((fila[0].timestamp() for fila in filas), dtype=np.float64, count=len(filas))
+    columna = {metrica: i for i, metrica in enumerate(metricas)}
+    columnas = np.fromiter((columna[fila[1]] for fila in filas), dtype=np.int64, count=len(filas))
+    promedios = np.fromiter((fila[2] / fila[3] for fila in filas), dtype=np.float64, count=len(filas))
+
+    x, fila_de = np.unique(tiempos, return_inverse=True)
+    y = np.full((len(x), len(metricas)), np.nan)
+    y[fila_de, columnas] = promedios
+    return x, y
+
+
+def serie_grafico(sector_id: int, desde: datetime, hasta: datetime, puntos: int = 500,
+                  metricas: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Serie alineada y reducida a ~`puntos` puntos para el rango [desde, hasta].
+
+    Returns:
+        dict: {'fuente': 'crudo'|'1m'|'1h'|'1d', 'puntos': int,
+               'marcas_tiempo': [iso, ...], '<metrica>': [float|None, ...], ...}
+    """
+    metricas = tuple(metricas or METRICAS_GRAFICO)
+    for metrica in metricas:
+        if metrica not in Lectura.METRICAS:
+            raise ValueError(f'Métrica inválida: {metrica}')
+
+    puntos = max(3, min(int(puntos), PUNTOS_MAXIMO))
+    fuente = _fuente(desde, hasta, puntos)
+
+    if fuente == 'crudo':
+        x, y = _cargar_crudo(sector_id, desde, hasta, metricas)
+    else:
+        x, y = _cargar_agregado(sector_id, desde, hasta, metricas, fuente)
+        if not len(x):
+            logger.warning(
+                f"⚠️ Sin agregados '{fuente}' para sector {sector_id}; usando lecturas crudas "
+                f"(correr recalcular_agregados)"
+            )
+            fuente = 'crudo'
+            x, y = _cargar_crudo(sector_id, desde, hasta, metricas)
+
+    indices = lttb(x, y, puntos)
+    x, y = x[indices], np.round(y[indices], 2)
+
+    # NaN -> None para el JSON
+    valores = y.astype(object)
+    valores[np.isnan(y)] = None
+
+    serie = {
+        'fuente': fuente,
+        'puntos': len(x),
+        'marcas_tiempo': [
+            datetime.fromtimestamp(t, tz=dt_timezone.utc).isoformat() for t in x.tolist()
+        ],
+    }
+    for i, metrica in enumerate(metricas):
+        serie[metrica] = valores[:, i].tolist()
+    return serie
@@ -0,0 +1,337 @@
+"""
+Ingesta de lecturas de sensores con buffer write-behind.
+
+Junta las lecturas que llegan por todos los SensorConsumer del proceso y
+las escribe en lote con bulk_create (una sola inserción en la tabla
+Lectura por flush) en lugar de un INSERT por sensor y por mensaje.
+
+Características:
+- Flush por tamaño (INGESTA_TAMANO_LOTE) o por tiempo (INGESTA_INTERVALO_FLUSH)
+- Una sola consulta de validación de sectores por lote
+- Idempotente: (sector, marca_tiempo) es única, así que los reintentos y el
+  replay del outbox se aceptan sin duplicar filas ni sumar dos veces a los
+  agregados
+- Los agregados por intervalo (dashboard.agregados) y la última lectura de
+  cada sector (dashboard.ultimas) se actualizan con el mismo lote, en la
+  misma transacción
+- Cada llamada recibe un Future con el resultado de sus lecturas, así el
+  consumer solo confirma al LOCAL cuando los datos ya están en la base
+- Métricas de latencia de flush y tamaño de lote
+
+Uso:
+    from dashboard.ingesta import buffer_ingesta, normalizar_lectura
+
+    lectura = normalizar_lectura(datos)
+    errores = await buffer_ingesta.agregar([lectura])
+    # errores[i] es None si la lectura i se guardó
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard import agregados, ultimas
+from dashboard.models import Sector, Lectura
+
+logger = logging.getLogger(__name__)
+
+
+# Valor que manda el Arduino cuando el sensor de temperatura no responde
+TEMPERATURA_INVALIDA = -999
+
+
+def _parsear_marca_tiempo(valor) -> datetime:
+    """Convierte el timestamp del LOCAL (ISO o datetime) a datetime aware"""
+    if not valor:
+        return timezone.now()
+
+    if isinstance(valor, datetime):
+        marca_tiempo = valor
+    else:
+        try:
+            marca_tiempo = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+        except ValueError:
+            return timezone.now()
+
+    if timezone.is_naive(marca_tiempo):
+        marca_tiempo = timezone.make_aware(marca_tiempo)
+
+    # Milisegundos: la misma lectura tiene la misma clave (sector,
+    # marca_tiempo) llegue en JSON o en MessagePack (ver dashboard.protocolo)
+    return marca_tiempo.replace(microsecond=marca_tiempo.microsecond // 1000 * 1000)
+
+
+def normalizar_lectura(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida y normaliza una lectura recibida del LOCAL.
+
+    Returns:
+        dict: {'sector_id': int, 'marca_tiempo': datetime, 'temperatura': float|None, ...}
+
+    Raises:
+        ValueError: si falta sector_id o algún valor no es numérico / no cabe en la columna
+    """
+    if datos.get('sector_id') is None:
+        raise ValueError('Falta sector_id')
+
+    try:
+        sector_id = int(datos['sector_id'])
+    except (TypeError, ValueError):
+        raise ValueError(f"sector_id inválido: {datos['sector_id']}")
+
+    lectura = {
+        'sector_id': sector_id,
+        'marca_tiempo': _parsear_marca_tiempo(datos.get('marca_tiempo')),
+    }
+
+    for campo in Lectura.METRICAS:
+        valor = datos.get(campo)
+        if valor is None:
+            lectura[campo] = None
+            continue
+
+        try:
+            valor = float(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f'{campo} no es numérico: {valor}')
+
+        if campo == 'temperatura' and valor == TEMPERATURA_INVALIDA:
+            lectura[campo] = None
+            continue
+
+        # Un valor fuera de rango haría fallar el INSERT de todo el lote
+        columna = Lectura._meta.get_field(campo)
+        if abs(valor) >= 10 ** (columna.max_digits - columna.decimal_places):
+            raise ValueError(f'{campo} fuera de rango: {valor}')
+
+        lectura[campo] = valor
+
+    return lectura
+
+
+def _claves_existentes(filas: List[Lectura]) -> set:
+    """(sector_id, marca_tiempo) de las filas del lote que ya están en la base"""
+    claves = set()
+    for desde in range(0, len(filas), settings.INGESTA_TAMANO_LOTE):
+        trozo = filas[desde:desde + settings.INGESTA_TAMANO_LOTE]
+        # Superconjunto (sectores x marcas del trozo) resuelto con el índice único
+        claves.update(
+            Lectura.objects.filter(
+                sector_id__in={fila.sector_id for fila in trozo},
+                marca_tiempo__in={fila.marca_tiempo for fila in trozo},
+            ).values_list('sector_id', 'marca_tiempo')
+        )
+    return claves
+
+
+def escribir_lecturas(lecturas: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """
+    Escribe un lote de lecturas normalizadas con un solo bulk_create
+    (una fila de Lectura por lectura, con todas sus métricas) y suma el
+    lote a los agregados por minuto/hora/día y a la última lectura de cada
+    sector en la misma transacción.
+
+    Una lectura que ya estaba guardada (mismo sector y marca_tiempo) se
+    acepta pero no se vuelve a insertar ni a sumar: el LOCAL puede
+    reintentar todo lo que no tuvo ack sin generar duplicados.
+
+    Args:
+        lecturas: Lista de lecturas (ver normalizar_lectura)
+
+    Returns:
+        list: Un elemento por lectura, None si se guardó (o ya estaba) o el
+        motivo del rechazo
+    """
+    sector_ids = {lectura['sector_id'] for lectura in lecturas}
+
+    with transaction.atomic():
+        # FOR NO KEY UPDATE sobre los sectores del lote: dos flushes del mismo
+        # sector (otro proceso de daphne) se serializan acá y la consulta de
+        # existentes ve lo que insertó el otro. No bloquea los INSERT que
+        # solo referencian al sector. En SQLite la escritura ya es exclusiva.
+        existentes = set(
+            Sector.objects.select_for_update(no_key=True)
+            .filter(id__in=sector_ids).values_list('id', flat=True)
+        )
+
+        filas = []
+        errores = []
+
+        for lectura in lecturas:
+            if lectura['sector_id'] not in existentes:
+                errores.append(f"Sector {lectura['sector_id']} no existe")
+                continue
+
+            valores = {campo: lectura.get(campo) for campo in Lectura.METRICAS}
+            if any(valor is not None for valor in valores.values()):
+                filas.append(Lectura(
+                    sector_id=lectura['sector_id'],
+                    marca_tiempo=lectura['marca_tiempo'],
+                    **valores
+                ))
+            errores.append(None)
+
+        # Descartar las que ya están guardadas y las repetidas dentro del lote
+        vistas = _claves_existentes(filas)
+        nuevas = []
+        for fila in filas:
+            clave = (fila.sector_id, fila.marca_tiempo)
+            if clave not in vistas:
+                vistas.add(clave)
+                nuevas.append(fila)
+
+        # ignore_conflicts (ON CONFLICT DO NOTHING) por las dudas: la
+        # restricción única es la que garantiza que no haya duplicados
+        Lectura.objects.bulk_create(nuevas, batch_size=settings.INGESTA_TAMANO_LOTE, ignore_conflicts=True)
+        agregados.acumular(nuevas)
+        ultimas.actualizar(nuevas)
+
+    if len(nuevas) < len(filas):
+        logger.info(f"♻️ {len(filas) - len(nuevas)} lecturas repetidas ignoradas")
+
+    return errores
+
+
+class BufferIngesta:
+    """
+    Buffer write-behind compartido por todas las conexiones del proceso.
+
+    Las lecturas se acumulan en memoria y se escriben juntas cuando el buffer
+    llega a `tamano_lote` o pasa `intervalo` segundos. Solo hay un flush en
+    curso a la vez; lo que llegue mientras tanto entra en el siguiente.
+    """
+
+    def __init__(self, tamano_lote: Optional[int] = None, intervalo: Optional[float] = None):
+        self.tamano_lote: int = tamano_lote or settings.INGESTA_TAMANO_LOTE
+        self.intervalo: float = intervalo or settings.INGESTA_INTERVALO_FLUSH
+
+        # (lecturas, futuro) por cada llamada a agregar()
+        self._pendientes: List[tuple] = []
+        self._cantidad_pendiente: int = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._despertar: Optional[asyncio.Event] = None
+        self._tarea: Optional[asyncio.Task] = None
+
+        self.metricas: Dict[str, Any] = {
+            'flushes': 0,
+            'lecturas': 0,
+            'ultimo_lote': 0,
+            'lote_maximo': 0,
+            'ultima_latencia_ms': 0.0,
+            'latencia_maxima_ms': 0.0,
+            'latencia_total_ms': 0.0,
+        }
+
+    def _asegurar_tarea(self, loop: asyncio.AbstractEventLoop):
+        """Arrancar el bucle de flush en el event loop actual (una vez por loop)"""
+        if self._tarea and not self._tarea.done() and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._despertar = asyncio.Event()
+        self._tarea = loop.create_task(self._bucle_flush())
+
+    def agregar(self, lecturas: List[Dict[str, Any]]) -> asyncio.Future:
+        """
+        Encolar lecturas normalizadas para el próximo flush.
+
+        Returns:
+            asyncio.Future: se resuelve con la lista de errores por lectura
+            (ver escribir_lecturas) o con la excepción si falló el flush
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+
+        if not lecturas:
+            futuro.set_result([])
+            return futuro
+
+        self._asegurar_tarea(loop)
+        self._pendientes.append((lecturas, futuro))
+        self._cantidad_pendiente += len(lecturas)
+
+        if self._cantidad_pendiente >= self.tamano_lote:
+            self._despertar.set()
+
+        return futuro
+
+    async def _bucle_flush(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+
+            self._despertar.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Escribir todo lo pendiente y resolver los futures de cada llamada"""
+        if not self._pendientes:
+            return
+
+        pendientes, self._pendientes = self._pendientes, []
+        self._cantidad_pendiente = 0
+
+        lecturas = [lectura for grupo, _ in pendientes for lectura in grupo]
+        inicio = time.perf_counter()
+
+        try:
+            errores = await database_sync_to_async(escribir_lecturas)(lecturas)
+        except Exception as e:
+            logger.exception(f"❌ Error en flush de ingesta ({len(lecturas)} lecturas): {e}")
+            for _, futuro in pendientes:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        self._registrar_flush(len(lecturas), latencia_ms)
+
+        # Repartir los resultados en el mismo orden en que se agregaron
+        desde = 0
+        for grupo, futuro in pendientes:
+            hasta = desde + len(grupo)
+            if not futuro.done():
+                futuro.set_result(errores[desde:hasta])
+            desde = hasta
+
+    def _registrar_flush(self, cantidad: int, latencia_ms: float):
+        m = self.metricas
+        m['flushes'] += 1
+        m['lecturas'] += cantidad
+        m['ultimo_lote'] = cantidad
+        m['lote_maximo'] = max(m['lote_maximo'], cantidad)
+        m['ultima_latencia_ms'] = latencia_ms
+        m['latencia_maxima_ms'] = max(m['latencia_maxima_ms'], latencia_ms)
+        m['latencia_total_ms'] += latencia_ms
+
+        logger.info(f"💾 Flush de ingesta: {cantidad} lecturas en {latencia_ms:.1f} ms")
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Copia de las métricas con el promedio ya calculado"""
+        m = dict(self.metricas)
+        m['latencia_promedio_ms'] = (
+            m['latencia_total_ms'] / m['flushes'] if m['flushes'] else 0.0
+        )
+        m['lote_promedio'] = m['lecturas'] / m['flushes'] if m['flushes'] else 0.0
+        m['pendientes'] = self._cantidad_pendiente
+        return m
+
+
+# ============================================================================
+# SINGLETON INSTANCE
+# ============================================================================
+
+# Un buffer por proceso (daphne corre un event loop por proceso)
+buffer_ingesta = BufferIngesta()
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.compactacion import compactar
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacts raw readings older than the given number of days: walks them one day at a '
+        'time, rebuilds that day\'s 1m/1h/1d min/max/avg rollups, then deletes the raw rows in '
+        'small batches (optionally keeping the first reading of every N sampling periods per sector). '
+        'Resumes where the previous run stopped, finishing any day whose deletion was cut short; '
+        'meant to run nightly from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int,
+                            help=f'Keep raw readings of the last N days (default: {settings.COMPACTACION_DIAS})')
+        parser.add_argument('--conservar-cada', type=int, default=0,
+                            help='Keep the first raw reading of every N x SERIAL_INTERVALO seconds per sector; '
+                                 '0 deletes them all (default: 0)')
+        parser.add_argument('--lote', type=int,
+                            help=f'Rows per DELETE (default: {settings.COMPACTACION_TAMANO_LOTE})')
+        parser.add_argument('--pausa', type=float,
+                            help=f'Seconds to sleep between batches (default: {settings.COMPACTACION_PAUSA})')
+
+    def handle(self, *args, **options):
+        for opcion in ('dias', 'conservar_cada', 'pausa'):
+            if options[opcion] is not None and options[opcion] < 0:
+                raise CommandError(f"--{opcion.replace('_', '-')} must be 0 or more")
+        if options['lote'] is not None and options['lote'] < 1:
+            raise CommandError('--lote must be 1 or more')
+
+        def progreso(dia, procesadas, borradas):
+            self.stdout.write(f'  {dia:%Y-%m-%d}: {procesadas} readings, {borradas} deleted')
+
+        self.stdout.write('Compacting raw readings...')
+        resultado = compactar(
+            dias=options['dias'],
+            conservar_cada=options['conservar_cada'],
+            tamano_lote=options['lote'],
+            pausa=options['pausa'],
+            progreso=progreso,
+        )
+
+        if not resultado['dias']:
+            self.stdout.write(self.style.SUCCESS('Nothing to compact'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {resultado['procesadas']} readings from {resultado['dias']} days "
+            f"(deleted {resultado['borradas']}) in {resultado['segundos']:.1f} s: "
+            f"{resultado['filas_por_segundo']:.0f} rows/s"
+        ))
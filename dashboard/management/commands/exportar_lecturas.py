@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.exportacion import FORMATOS_COLUMNARES, escribir_columnar, formato_por_defecto
+from dashboard.models import Sector
+
+
+def _parsear_fecha(valor):
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (usar YYYY-MM-DD o ISO 8601)')
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports a sector reading history as a columnar file (Parquet, Arrow IPC or NumPy .npz): '
+        'int64 epoch-millisecond timestamps and one float32 column per metric.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sector', type=int, help='Sector id')
+        parser.add_argument('--formato', choices=list(FORMATOS_COLUMNARES),
+                            help='Output format (default: parquet, or npz without pyarrow)')
+        parser.add_argument('--desde', help='Start date (YYYY-MM-DD or ISO 8601)')
+        parser.add_argument('--hasta', help='End date (YYYY-MM-DD or ISO 8601)')
+        parser.add_argument('--salida', help='Output path (default: sector_<id>_datos.<ext>)')
+
+    def handle(self, *args, **options):
+        if not Sector.objects.filter(id=options['sector']).exists():
+            raise CommandError(f"Sector {options['sector']} does not exist")
+
+        formato = options['formato'] or formato_por_defecto()
+        desde = _parsear_fecha(options['desde']) if options['desde'] else None
+        hasta = _parsear_fecha(options['hasta']) if options['hasta'] else None
+        salida = options['salida'] or f"sector_{options['sector']}_datos{FORMATOS_COLUMNARES[formato][0]}"
+
+        self.stdout.write(f'Exporting sector {options["sector"]} to {salida} ({formato})...')
+        try:
+            with open(salida, 'wb') as archivo:
+                filas = escribir_columnar(archivo, formato, options['sector'], desde, hasta)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {filas} readings'))
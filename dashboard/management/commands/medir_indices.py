@@ -0,0 +1,207 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dashboard.models import Lectura
+
+
+# Índices de Lectura antes y después de la migración 0010 ({t} = tabla)
+ANTERIOR = [
+    'CREATE UNIQUE INDEX {t}_unico ON {t} (sector_id, marca_tiempo)',
+    'CREATE INDEX {t}_sector_tiempo ON {t} (sector_id, marca_tiempo DESC)',
+    'CREATE INDEX {t}_sector ON {t} (sector_id)',
+    'CREATE INDEX {t}_tiempo ON {t} (marca_tiempo)',
+]
+ACTUAL = {
+    'postgresql': [
+        'CREATE UNIQUE INDEX {t}_unico ON {t} (sector_id, marca_tiempo) INCLUDE ({metricas})',
+        'CREATE INDEX {t}_tiempo ON {t} USING brin (marca_tiempo)',
+    ],
+    'sqlite': [
+        'CREATE UNIQUE INDEX {t}_unico ON {t} (sector_id, marca_tiempo)',
+        'CREATE INDEX {t}_tiempo ON {t} (marca_tiempo)',
+    ],
+}
+
+# Una lectura cada 5 s por sector, generada en la base (sin ida y vuelta por fila)
+VALORES = (
+    "2000 + i %% 700, 500 + i %% 300, 3000 + i %% 500, 700 + i %% 100, 100 + i %% 2000, 6000 + i %% 3000"
+)
+INSERTAR = {
+    'postgresql': (
+        "INSERT INTO {t} SELECT i, 1 + i %% {sectores}, "
+        "%s::timestamptz + (i / {sectores}) * interval '5 seconds', " + VALORES + " "
+        "FROM generate_series(%s, %s) AS i"
+    ),
+    'sqlite': (
+        "WITH RECURSIVE serie(i) AS (SELECT %s UNION ALL SELECT i + 1 FROM serie WHERE i < %s) "
+        "INSERT INTO {t} SELECT i, 1 + i %% {sectores}, "
+        "datetime(%s, '+' || (i / {sectores} * 5) || ' seconds'), " + VALORES + " FROM serie"
+    ),
+}
+TIPO_MARCA_TIEMPO = {'postgresql': 'timestamp with time zone', 'sqlite': 'datetime'}
+
+INICIO = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the readings index layout against the previous one on scratch tables: '
+        'insert throughput (batched, one transaction per batch), chart range scans '
+        '(one sector, time window, all metrics), time-only range counts and index size. '
+        'On PostgreSQL the current layout is a BRIN index on marca_tiempo plus the unique '
+        '(sector, marca_tiempo) index with the metrics INCLUDEd; the previous one had four '
+        'B-trees. The scratch tables are dropped at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=200000, help='Rows to insert (default: 200000)')
+        parser.add_argument('--sectores', type=int, default=4, help='Sectors (default: 4)')
+        parser.add_argument('--lote', type=int, default=1000, help='Rows per INSERT (default: 1000)')
+        parser.add_argument('--consultas', type=int, default=50, help='Range scans per layout (default: 50)')
+        parser.add_argument('--horas', type=int, default=6, help='Hours per range scan (default: 6)')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ACTUAL:
+            raise CommandError(f'Unsupported database: {vendor}')
+        for opcion in ('filas', 'sectores', 'lote', 'consultas', 'horas'):
+            if options[opcion] < 1:
+                raise CommandError(f'--{opcion} must be 1 or more')
+
+        self.vendor = vendor
+        self.opciones = options
+
+        # Mismas ventanas para los dos esquemas
+        azar = random.Random(0)
+        duracion = timedelta(seconds=5 * options['filas'] // options['sectores'])
+        ventana = timedelta(hours=options['horas'])
+        self.ventanas = [
+            (azar.randint(1, options['sectores']), INICIO + (duracion - ventana) * azar.random())
+            for _ in range(options['consultas'])
+        ]
+
+        resultados = {
+            'previous': self._medir('bench_lectura_anterior', ANTERIOR),
+            'current': self._medir('bench_lectura_actual', ACTUAL[vendor]),
+        }
+
+        self.stdout.write('')
+        self.stdout.write(f"{'layout':<10} {'insert rows/s':>14} {'chart ms':>9} {'range ms':>9} {'index KB':>9}  chart plan")
+        for nombre, r in resultados.items():
+            tamano = f"{r['tamano'] // 1024:>9}" if r['tamano'] is not None else f"{'-':>9}"
+            self.stdout.write(
+                f"{nombre:<10} {r['filas_por_segundo']:>14.0f} {r['grafico_ms']:>9.2f} "
+                f"{r['rango_ms']:>9.2f} {tamano}  {r['plan']}"
+            )
+
+        anterior, actual = resultados['previous'], resultados['current']
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserts x{actual['filas_por_segundo'] / anterior['filas_por_segundo']:.2f}, "
+            f"chart scans x{anterior['grafico_ms'] / actual['grafico_ms']:.2f}, "
+            f"time ranges x{anterior['rango_ms'] / actual['rango_ms']:.2f}"
+        ))
+
+    def _q(self, nombre):
+        return connection.ops.quote_name(nombre)
+
+    def _medir(self, tabla, indices):
+        q = self._q
+        metricas = ', '.join(q(m) for m in Lectura.METRICAS)
+        columnas = ', '.join(
+            f"{q(m)} {Lectura._meta.get_field(m).db_type(connection)}" for m in Lectura.METRICAS
+        )
+
+        self.stdout.write(f'Measuring {tabla}...')
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {q(tabla)}")
+            cursor.execute(
+                f"CREATE TABLE {q(tabla)} (id bigint PRIMARY KEY, sector_id integer NOT NULL, "
+                f"marca_tiempo {TIPO_MARCA_TIEMPO[self.vendor]} NOT NULL, {columnas})"
+            )
+            for indice in indices:
+                cursor.execute(indice.format(t=tabla, metricas=metricas))
+
+        try:
+            return self._medir_tabla(tabla, metricas)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {q(tabla)}")
+
+    def _medir_tabla(self, tabla, metricas):
+        q = self._q
+        opciones = self.opciones
+        insertar = INSERTAR[self.vendor].format(t=q(tabla), sectores=opciones['sectores'])
+        inicio = INICIO if self.vendor == 'postgresql' else INICIO.strftime('%Y-%m-%d %H:%M:%S')
+
+        # 1. Inserción: cada lote en su transacción (autocommit), como la ingesta
+        comienzo = time.perf_counter()
+        with connection.cursor() as cursor:
+            for desde in range(0, opciones['filas'], opciones['lote']):
+                hasta = min(desde + opciones['lote'], opciones['filas']) - 1
+                if self.vendor == 'postgresql':
+                    cursor.execute(insertar, [inicio, desde, hasta])
+                else:
+                    cursor.execute(insertar, [desde, hasta, inicio])
+        filas_por_segundo = opciones['filas'] / (time.perf_counter() - comienzo)
+
+        with connection.cursor() as cursor:
+            # VACUUM actualiza el mapa de visibilidad (Index Only Scan)
+            cursor.execute(f"VACUUM ANALYZE {q(tabla)}" if self.vendor == 'postgresql' else f"ANALYZE {q(tabla)}")
+
+        grafico = (
+            f"SELECT marca_tiempo, {metricas} FROM {q(tabla)} "
+            f"WHERE sector_id = %s AND marca_tiempo >= %s AND marca_tiempo <= %s ORDER BY marca_tiempo"
+        )
+        rango = f"SELECT COUNT(*) FROM {q(tabla)} WHERE marca_tiempo >= %s AND marca_tiempo < %s"
+        ventana = timedelta(hours=opciones['horas'])
+
+        def parametros(desde):
+            if self.vendor == 'postgresql':
+                return [desde, desde + ventana]
+            return [desde.strftime('%Y-%m-%d %H:%M:%S'), (desde + ventana).strftime('%Y-%m-%d %H:%M:%S')]
+
+        with connection.cursor() as cursor:
+            # 2. Gráficos: un sector, una ventana, todas las métricas
+            comienzo = time.perf_counter()
+            for sector_id, desde in self.ventanas:
+                cursor.execute(grafico, [sector_id, *parametros(desde)])
+                cursor.fetchall()
+            grafico_ms = (time.perf_counter() - comienzo) * 1000 / len(self.ventanas)
+
+            # 3. Rangos de tiempo de todos los sectores (retención, compactación, recalcular)
+            comienzo = time.perf_counter()
+            for _, desde in self.ventanas:
+                cursor.execute(rango, parametros(desde))
+                cursor.fetchall()
+            rango_ms = (time.perf_counter() - comienzo) * 1000 / len(self.ventanas)
+
+            sector_id, desde = self.ventanas[0]
+            if self.vendor == 'postgresql':
+                cursor.execute(f"EXPLAIN {grafico}", [sector_id, *parametros(desde)])
+                plan = next((fila[0].split('  (')[0].strip(' ->') for fila in cursor.fetchall() if 'Scan' in fila[0]), '')
+                cursor.execute("SELECT pg_indexes_size(%s::regclass)", [tabla])
+                tamano = cursor.fetchone()[0]
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {grafico}", [sector_id, *parametros(desde)])
+                plan = cursor.fetchall()[0][-1]
+                try:
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                        [tabla],
+                    )
+                    tamano = cursor.fetchone()[0]
+                except Exception:
+                    tamano = None  # SQLite compilado sin dbstat
+
+        return {
+            'filas_por_segundo': filas_por_segundo,
+            'grafico_ms': grafico_ms,
+            'rango_ms': rango_ms,
+            'tamano': tamano,
+            'plan': plan,
+        }
@@ -3,15 +3,13 @@ from django.utils import timezone
 from django.db import connection
 from decimal import Decimal
 import random
+from dashboard import agregados, ultimas
 from dashboard.models import (
     Sector, 
     Bivalvo, 
-    HistorialTemperatura, 
-    HistorialSalinidad,
-    HistorialPh,
-    HistorialHumedad,
-    HistorialTurbidez,
-    HistorialOxigeno,
+    Lectura,
+    LecturaAgregada,
+    UltimaLectura,
     HistorialClasificacion,
     Zona
 )
@@ -28,12 +26,9 @@ class Command(BaseCommand):
             
             # Eliminar datos
             HistorialClasificacion.objects.all().delete()
-            HistorialTemperatura.objects.all().delete()
-            HistorialSalinidad.objects.all().delete()
-            HistorialHumedad.objects.all().delete()
-            HistorialPh.objects.all().delete()
-            HistorialTurbidez.objects.all().delete()
-            HistorialOxigeno.objects.all().delete()
+            LecturaAgregada.objects.all().delete()
+            UltimaLectura.objects.all().delete()
+            Lectura.objects.all().delete()
             Bivalvo.objects.all().delete()
             Sector.objects.all().delete()
             
@@ -43,12 +38,8 @@ class Command(BaseCommand):
                 tablas = [
                     'dashboard_sector',
                     'dashboard_bivalvo',
-                    'dashboard_historialtemperatura',
-                    'dashboard_historialsalinidad',
-                    'dashboard_historialph',
-                    'dashboard_historialhumedad',
-                    'dashboard_historialturbidez',
-                    'dashboard_historialoxigeno',
+                    'dashboard_lectura',
+                    'dashboard_lecturaagregada',
                     'dashboard_historialclasificacion',
                     'dashboard_zona',
                 ]
@@ -99,65 +90,23 @@ class Command(BaseCommand):
         ]
         self.stdout.write(self.style.SUCCESS(f'Created {len(bivalvos)} bivalves'))
 
-        # Crear historial de temperatura
-        count = 0
+        # Crear lecturas (una fila por sector y día con todas las métricas)
+        lecturas = []
         for sector in sectores:
             for i in range(30):  # 30 registros por sector
-                HistorialTemperatura.objects.create(
-                    sector=sector,
-                    valor=Decimal(str(round(random.uniform(20.0, 32.0), 2))),
-                    marca_tiempo=timezone.now() - timezone.timedelta(days=i)
-                )
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Created {count} temperature records'))
-
-        # Crear historial de salinidad
-        count = 0
-        for sector in sectores:
-            for i in range(30):
-                HistorialSalinidad.objects.create(
-                    sector=sector,
-                    valor=Decimal(str(round(random.uniform(30.0, 38.0), 2))),
-                    marca_tiempo=timezone.now() - timezone.timedelta(days=i)
-                )
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Created {count} salinity records'))
-        
-        # Crear historial de pH
-        count = 0
-        for sector in sectores:
-            for i in range(30):
-                HistorialPh.objects.create(
-                    sector=sector,
-                    valor=Decimal(str(round(random.uniform(6.5, 8.5), 2))),
-                    marca_tiempo=timezone.now() - timezone.timedelta(days=i)
-                )
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Created {count} pH records'))
-
-        # Crear historial de humedad
-        count = 0
-        for sector in sectores:
-            for i in range(30):
-                HistorialHumedad.objects.create(
+                lecturas.append(Lectura(
                     sector=sector,
-                    valor=Decimal(str(round(random.uniform(60.0, 95.0), 2))),
+                    temperatura=Decimal(str(round(random.uniform(20.0, 32.0), 2))),
+                    salinidad=Decimal(str(round(random.uniform(30.0, 38.0), 2))),
+                    ph=Decimal(str(round(random.uniform(6.5, 8.5), 2))),
+                    humedad=Decimal(str(round(random.uniform(60.0, 95.0), 2))),
+                    turbidez=Decimal(str(round(random.uniform(0.5, 50.0), 2))),
                     marca_tiempo=timezone.now() - timezone.timedelta(days=i)
-                )
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Created {count} humidity records'))
-
-        # Crear historial de turbidez
-        count = 0
-        for sector in sectores:
-            for i in range(30):
-                HistorialTurbidez.objects.create(
-                    sector=sector,
-                    valor=Decimal(str(round(random.uniform(0.5, 50.0), 2))),
-                    marca_tiempo=timezone.now() - timezone.timedelta(days=i)
-                )
-                count += 1
-        self.stdout.write(self.style.SUCCESS(f'Created {count} turbidity records'))
+                ))
+        Lectura.objects.bulk_create(lecturas)
+        agregados.acumular(lecturas)
+        ultimas.actualizar(lecturas)
+        self.stdout.write(self.style.SUCCESS(f'Created {len(lecturas)} sensor readings'))
 
         # Crear historial de clasificación
         count = 0
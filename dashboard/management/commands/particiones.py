@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.particiones import aplicar_retencion, asegurar_particiones, particionada
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates the upcoming monthly partitions of the readings table (PostgreSQL) and applies '
+        'the raw-reading retention policy: whole months older than the retention window are '
+        'dropped (on SQLite they are deleted month by month in small batches). '
+        'Meant to run daily from cron. Rollups and the latest-reading snapshot are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses-adelante', type=int,
+                            help=f'Months ahead to pre-create (default: {settings.PARTICIONES_MESES_ADELANTE})')
+        parser.add_argument('--retener-meses', type=int,
+                            help='Months of raw readings to keep, current one included; 0 keeps everything '
+                                 f'(default: {settings.LECTURAS_RETENCION_MESES})')
+
+    def handle(self, *args, **options):
+        for opcion in ('meses_adelante', 'retener_meses'):
+            if options[opcion] is not None and options[opcion] < 0:
+                raise CommandError(f"--{opcion.replace('_', '-')} must be 0 or more")
+
+        if particionada():
+            creadas = asegurar_particiones(options['meses_adelante'])
+            self.stdout.write(self.style.SUCCESS(f'Created {len(creadas)} partitions'))
+            for nombre in creadas:
+                self.stdout.write(f'  {nombre}')
+        else:
+            self.stdout.write('The readings table is not partitioned (SQLite): skipping partition creation')
+
+        meses, filas = aplicar_retencion(options['retener_meses'])
+        if particionada():
+            self.stdout.write(self.style.SUCCESS(f'Dropped {meses} monthly partitions'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {filas} readings from {meses} months'))
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.agregados import recalcular
+from dashboard import ultimas
+
+
+def _parsear_fecha(valor):
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (usar YYYY-MM-DD o ISO 8601)')
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the 1m/1h/1d reading rollups (LecturaAgregada) and the latest-reading '
+        'snapshot (UltimaLectura) from the raw Lectura rows. '
+        'Run it for closed ranges or with ingestion stopped: readings inserted while it runs '
+        'inside the same range may be counted twice.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sector', type=int, help='Only this sector id')
+        parser.add_argument('--desde', help='Start date (YYYY-MM-DD), extended to the start of the day')
+        parser.add_argument('--hasta', help='End date (YYYY-MM-DD), extended to the end of the day')
+
+    def handle(self, *args, **options):
+        desde = _parsear_fecha(options['desde']) if options['desde'] else None
+        hasta = _parsear_fecha(options['hasta']) if options['hasta'] else None
+
+        if desde and hasta and desde > hasta:
+            raise CommandError('--desde must be before --hasta')
+
+        self.stdout.write('Rebuilding rollups...')
+        creadas = recalcular(sector_id=options['sector'], desde=desde, hasta=hasta)
+        self.stdout.write(self.style.SUCCESS(f'Created {creadas} rollup rows'))
+
+        sectores = ultimas.reconstruir(sector_id=options['sector'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the latest reading of {sectores} sectors'))
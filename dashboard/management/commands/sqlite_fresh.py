@@ -3,12 +3,9 @@ from django.db import connection
 from dashboard.models import (
     Sector, 
     Bivalvo, 
-    HistorialTemperatura, 
-    HistorialSalinidad,
-    HistorialPh,
-    HistorialHumedad,
-    HistorialTurbidez,
-    HistorialOxigeno,
+    Lectura,
+    LecturaAgregada,
+    UltimaLectura,
     HistorialClasificacion,
     Zona,
 )
@@ -23,12 +20,9 @@ class Command(BaseCommand):
         
         # Eliminar datos
         HistorialClasificacion.objects.all().delete()
-        HistorialTemperatura.objects.all().delete()
-        HistorialSalinidad.objects.all().delete()
-        HistorialHumedad.objects.all().delete()
-        HistorialPh.objects.all().delete()
-        HistorialTurbidez.objects.all().delete()
-        HistorialOxigeno.objects.all().delete()
+        LecturaAgregada.objects.all().delete()
+        UltimaLectura.objects.all().delete()
+        Lectura.objects.all().delete()  # Las vistas Historial* quedan vacías
         Bivalvo.objects.all().delete()
         Sector.objects.all().delete()
         Zona.objects.all().delete()
@@ -38,13 +32,9 @@ class Command(BaseCommand):
             tablas = [
                 'dashboard_sector',
                 'dashboard_bivalvo',
-                'dashboard_historialtemperatura',
-                'dashboard_historialsalinidad',
-                'dashboard_historialph',
-                'dashboard_historialhumedad',
-                'dashboard_historialturbidez',
+                'dashboard_lectura',
+                'dashboard_lecturaagregada',
                 'dashboard_historialclasificacion',
-                'dashboard_historialoxigeno',
                 'dashboard_zona',
                 'dashboard_sector_zonas',
             ]
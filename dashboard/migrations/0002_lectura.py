@@ -0,0 +1,141 @@
+"""
+Tabla ancha Lectura (una fila por sector y marca de tiempo).
+
+1. Crea dashboard_lectura
+2. Copia las tablas Historial* agrupando por (sector, marca_tiempo)
+3. Reemplaza cada tabla Historial* por una vista de solo lectura sobre
+   dashboard_lectura, con las mismas columnas (id, sector_id, valor,
+   marca_tiempo), para que el código que las consulta siga funcionando
+"""
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Modelo Historial* -> columna de Lectura
+HISTORIALES = {
+    'HistorialTemperatura': 'temperatura',
+    'HistorialOxigeno': 'oxigeno',
+    'HistorialSalinidad': 'salinidad',
+    'HistorialPh': 'ph',
+    'HistorialTurbidez': 'turbidez',
+    'HistorialHumedad': 'humedad',
+}
+
+
+def copiar_historiales(apps, schema_editor):
+    """
+    Un solo INSERT ... SELECT: las filas de todas las tablas se juntan con
+    UNION ALL y se agrupan por (sector, marca_tiempo); cada métrica queda en
+    su columna (MAX por si había duplicados exactos).
+    """
+    q = schema_editor.quote_name
+    Lectura = apps.get_model('dashboard', 'Lectura')
+
+    partes = []
+    columnas = []
+    for nombre, columna in HISTORIALES.items():
+        tabla = apps.get_model('dashboard', nombre)._meta.db_table
+        partes.append(
+            f"SELECT sector_id, marca_tiempo, '{columna}' AS metrica, valor FROM {q(tabla)}"
+        )
+        columnas.append(columna)
+
+    agregados = ', '.join(
+        f"MAX(CASE WHEN metrica = '{columna}' THEN valor END)" for columna in columnas
+    )
+    schema_editor.execute(
+        f"INSERT INTO {q(Lectura._meta.db_table)} "
+        f"(sector_id, marca_tiempo, {', '.join(q(c) for c in columnas)}) "
+        f"SELECT sector_id, marca_tiempo, {agregados} "
+        f"FROM ({' UNION ALL '.join(partes)}) historiales "
+        f"GROUP BY sector_id, marca_tiempo "
+        f"ORDER BY marca_tiempo"
+    )
+
+
+def tablas_a_vistas(apps, schema_editor):
+    q = schema_editor.quote_name
+    Lectura = apps.get_model('dashboard', 'Lectura')
+
+    for nombre, columna in HISTORIALES.items():
+        modelo = apps.get_model('dashboard', nombre)
+        schema_editor.delete_model(modelo)
+        schema_editor.execute(
+            f"CREATE VIEW {q(modelo._meta.db_table)} AS "
+            f"SELECT id, sector_id, {q(columna)} AS valor, marca_tiempo "
+            f"FROM {q(Lectura._meta.db_table)} WHERE {q(columna)} IS NOT NULL"
+        )
+
+
+def vistas_a_tablas(apps, schema_editor):
+    q = schema_editor.quote_name
+    Lectura = apps.get_model('dashboard', 'Lectura')
+
+    for nombre, columna in HISTORIALES.items():
+        modelo = apps.get_model('dashboard', nombre)
+        tabla = modelo._meta.db_table
+        schema_editor.execute(f"DROP VIEW {q(tabla)}")
+        schema_editor.create_model(modelo)
+        schema_editor.execute(
+            f"INSERT INTO {q(tabla)} (sector_id, valor, marca_tiempo) "
+            f"SELECT sector_id, {q(columna)}, marca_tiempo "
+            f"FROM {q(Lectura._meta.db_table)} WHERE {q(columna)} IS NOT NULL"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lectura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marca_tiempo', models.DateTimeField(db_index=True)),
+                ('temperatura', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(-50), django.core.validators.MaxValueValidator(100)])),
+                ('oxigeno', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(-50), django.core.validators.MaxValueValidator(100)])),
+                ('salinidad', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('ph', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(14)])),
+                ('turbidez', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('humedad', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('sector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lecturas', to='dashboard.sector')),
+            ],
+            options={
+                'verbose_name': 'Lectura',
+                'verbose_name_plural': 'Lecturas',
+                'ordering': ['-marca_tiempo'],
+                'indexes': [models.Index(fields=['sector', '-marca_tiempo'], name='dashboard_l_sector__564b3d_idx')],
+            },
+        ),
+        migrations.RunPython(copiar_historiales, migrations.RunPython.noop),
+        migrations.RunPython(tablas_a_vistas, vistas_a_tablas),
+        migrations.AlterModelOptions(
+            name='historialhumedad',
+            options={'managed': False, 'ordering': ['-marca_tiempo'], 'verbose_name': 'Historial de Humedad', 'verbose_name_plural': 'Historiales de Humedad'},
+        ),
+        migrations.AlterModelOptions(
+            name='historialoxigeno',
+            options={'managed': False, 'ordering': ['-marca_tiempo'], 'verbose_name': 'Historial de Oxígeno', 'verbose_name_plural': 'Historiales de Oxígeno'},
+        ),
+        migrations.AlterModelOptions(
+            name='historialph',
+            options={'managed': False, 'ordering': ['-marca_tiempo'], 'verbose_name': 'Historial de pH', 'verbose_name_plural': 'Historiales de pH'},
+        ),
+        migrations.AlterModelOptions(
+            name='historialsalinidad',
+            options={'managed': False, 'ordering': ['-marca_tiempo'], 'verbose_name': 'Historial de Salinidad', 'verbose_name_plural': 'Historiales de Salinidad'},
+        ),
+        migrations.AlterModelOptions(
+            name='historialtemperatura',
+            options={'managed': False, 'ordering': ['-marca_tiempo'], 'verbose_name': 'Historial de Temperatura', 'verbose_name_plural': 'Historiales de Temperatura'},
+        ),
+        migrations.AlterModelOptions(
+            name='historialturbidez',
+            options={'managed': False, 'ordering': ['-marca_tiempo'], 'verbose_name': 'Historial de Turbidez', 'verbose_name_plural': 'Historiales de Turbidez'},
+        ),
+    ]
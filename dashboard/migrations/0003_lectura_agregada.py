@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_lectura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturaAgregada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrica', models.CharField(choices=[('temperatura', 'temperatura'), ('oxigeno', 'oxigeno'), ('salinidad', 'salinidad'), ('ph', 'ph'), ('turbidez', 'turbidez'), ('humedad', 'humedad')], max_length=20)),
+                ('granularidad', models.CharField(choices=[('1m', '1 minuto'), ('1h', '1 hora'), ('1d', '1 día')], max_length=2)),
+                ('inicio', models.DateTimeField()),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('suma', models.FloatField(default=0)),
+                ('minimo', models.FloatField()),
+                ('maximo', models.FloatField()),
+                ('sector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agregados', to='dashboard.sector')),
+            ],
+            options={
+                'verbose_name': 'Lectura agregada',
+                'verbose_name_plural': 'Lecturas agregadas',
+                'ordering': ['inicio'],
+                'constraints': [models.UniqueConstraint(fields=('sector', 'metrica', 'granularidad', 'inicio'), name='unique_lectura_agregada')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_lectura_agregada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportacionTrabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('parquet', 'Parquet'), ('arrow', 'Arrow IPC'), ('npz', 'NumPy .npz')], max_length=10)),
+                ('desde', models.DateTimeField()),
+                ('hasta', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=12)),
+                ('partes_totales', models.PositiveIntegerField(default=0)),
+                ('partes_completadas', models.PositiveIntegerField(default=0)),
+                ('lecturas', models.PositiveBigIntegerField(default=0)),
+                ('archivo', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('sectores', models.ManyToManyField(related_name='exportaciones', to='dashboard.sector')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exportaciones', to=settings.AUTH_USER_MODEL)),
+                ('zona', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exportaciones', to='dashboard.zona')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de exportación',
+                'verbose_name_plural': 'Trabajos de exportación',
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+METRICAS = ('temperatura', 'oxigeno', 'salinidad', 'ph', 'turbidez', 'humedad')
+
+
+def llenar_ultimas_lecturas(apps, schema_editor):
+    """Snapshot inicial desde las lecturas existentes (ver dashboard.ultimas.reconstruir)"""
+    Lectura = apps.get_model('dashboard', 'Lectura')
+    UltimaLectura = apps.get_model('dashboard', 'UltimaLectura')
+
+    snapshots = []
+    for sector_id in Lectura.objects.values_list('sector_id', flat=True).distinct().order_by():
+        del_sector = Lectura.objects.filter(sector_id=sector_id).order_by('-marca_tiempo')
+        snapshot = UltimaLectura(
+            sector_id=sector_id,
+            marca_tiempo=del_sector.values_list('marca_tiempo', flat=True)[0],
+        )
+        for metrica in METRICAS:
+            valor = del_sector.filter(**{f'{metrica}__isnull': False}).values_list(metrica, flat=True).first()
+            setattr(snapshot, metrica, float(valor) if valor is not None else None)
+        snapshots.append(snapshot)
+
+    UltimaLectura.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_exportacion_trabajo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UltimaLectura',
+            fields=[
+                ('sector', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ultima_lectura', serialize=False, to='dashboard.sector')),
+                ('marca_tiempo', models.DateTimeField()),
+                ('temperatura', models.FloatField(blank=True, null=True)),
+                ('oxigeno', models.FloatField(blank=True, null=True)),
+                ('salinidad', models.FloatField(blank=True, null=True)),
+                ('ph', models.FloatField(blank=True, null=True)),
+                ('turbidez', models.FloatField(blank=True, null=True)),
+                ('humedad', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Última lectura',
+                'verbose_name_plural': 'Últimas lecturas',
+            },
+        ),
+        migrations.RunPython(llenar_ultimas_lecturas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:26
+
+"""
+Lectura única por (sector, marca_tiempo).
+
+1. Borra los duplicados que dejaron los reintentos del LOCAL (se queda con
+   la fila más vieja de cada par). Cuentan como duplicadas las que solo
+   difieren en los microsegundos: la ingesta guarda marca_tiempo en
+   milisegundos
+2. Lleva las marca_tiempo que quedan a milisegundos, así un reenvío de una
+   lectura vieja choca con la restricción en lugar de duplicarla
+3. Agrega la restricción única, que pasa a ser la clave de idempotencia de
+   la ingesta. En SQLite como índice único: AddConstraint reconstruiría la
+   tabla y el RENAME falla por las vistas Historial* que la usan
+"""
+
+import logging
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def _en_milisegundos(schema_editor, columna):
+    """Expresión SQL con `columna` truncada a milisegundos"""
+    if schema_editor.connection.vendor == 'postgresql':
+        return f"date_trunc('milliseconds', {columna})"
+    # SQLite guarda 'YYYY-MM-DD HH:MM:SS[.ffffff]' y Django omite la
+    # fracción cuando es cero: conservar ese formato para que las
+    # comparaciones de texto sigan funcionando
+    return (
+        f"CASE WHEN length({columna}) <= 19 THEN {columna} "
+        f"WHEN substr({columna}, 21, 3) = '000' THEN substr({columna}, 1, 19) "
+        f"ELSE substr({columna}, 1, 23) || '000' END"
+    )
+
+
+def borrar_duplicados(apps, schema_editor):
+    q = schema_editor.quote_name
+    tabla = q(apps.get_model('dashboard', 'Lectura')._meta.db_table)
+    marca_tiempo = _en_milisegundos(schema_editor, q('marca_tiempo'))
+
+    with schema_editor.connection.cursor() as cursor:
+        # Todas menos la de menor id de cada clave. No NOT IN (SELECT MIN(id)
+        # ... GROUP BY): en PostgreSQL, si el resultado no entra en work_mem,
+        # el subplan se recorre una vez por fila
+        cursor.execute(
+            f"DELETE FROM {tabla} WHERE {q('id')} IN ("
+            f"SELECT {q('id')} FROM (SELECT {q('id')}, ROW_NUMBER() OVER ("
+            f"PARTITION BY {q('sector_id')}, {marca_tiempo} ORDER BY {q('id')}) AS numero "
+            f"FROM {tabla}) AS repetidas WHERE numero > 1)"
+        )
+        borradas = cursor.rowcount
+
+        # Ya no hay dos filas con la misma clave truncada: no hay choques
+        cursor.execute(
+            f"UPDATE {tabla} SET {q('marca_tiempo')} = {marca_tiempo} "
+            f"WHERE {q('marca_tiempo')} <> {marca_tiempo}"
+        )
+
+    if borradas > 0:
+        # Los agregados y el snapshot contaban esas filas
+        logger.warning(f"🧹 {borradas} lecturas duplicadas borradas: "
+                       f"ejecutar `python manage.py recalcular_agregados`")
+
+
+UNIQUE_LECTURA = models.UniqueConstraint(fields=('sector', 'marca_tiempo'), name='unique_lectura')
+
+
+def agregar_restriccion(apps, schema_editor):
+    q = schema_editor.quote_name
+    Lectura = apps.get_model('dashboard', 'Lectura')
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE UNIQUE INDEX {q(UNIQUE_LECTURA.name)} "
+            f"ON {q(Lectura._meta.db_table)} ({q('sector_id')}, {q('marca_tiempo')})"
+        )
+    else:
+        schema_editor.add_constraint(Lectura, UNIQUE_LECTURA)
+
+
+def quitar_restriccion(apps, schema_editor):
+    Lectura = apps.get_model('dashboard', 'Lectura')
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP INDEX {schema_editor.quote_name(UNIQUE_LECTURA.name)}")
+    else:
+        schema_editor.remove_constraint(Lectura, UNIQUE_LECTURA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_ultima_lectura'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_duplicados, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(model_name='lectura', constraint=UNIQUE_LECTURA),
+            ],
+            database_operations=[
+                migrations.RunPython(agregar_restriccion, quitar_restriccion),
+            ],
+        ),
+    ]
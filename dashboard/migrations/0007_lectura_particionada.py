@@ -0,0 +1,132 @@
+"""
+Particiones mensuales de dashboard_lectura (solo PostgreSQL).
+
+1. Saca las vistas Historial* (dependen de la tabla)
+2. Renombra la tabla y crea dashboard_lectura particionada por rango de
+   marca_tiempo, con las mismas columnas, una partición por mes desde la
+   lectura más vieja hasta MESES_ADELANTE meses después del actual y una
+   partición DEFAULT
+3. Copia las filas y borra la tabla vieja
+4. Vuelve a crear la secuencia del id, las restricciones, los índices (con
+   los mismos nombres) y las vistas
+
+La clave primaria pasa a ser (id, marca_tiempo): PostgreSQL exige que las
+claves únicas de una tabla particionada incluyan la columna de partición.
+Django sigue usando id, que la secuencia mantiene único.
+
+En SQLite no hace nada: la retención borra por mes (ver dashboard.particiones).
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+
+HISTORIALES = {
+    'HistorialTemperatura': 'temperatura',
+    'HistorialOxigeno': 'oxigeno',
+    'HistorialSalinidad': 'salinidad',
+    'HistorialPh': 'ph',
+    'HistorialTurbidez': 'turbidez',
+    'HistorialHumedad': 'humedad',
+}
+
+MESES_ADELANTE = 3
+
+
+def _sumar_meses(fecha, meses):
+    """Primer instante (UTC) del mes que está `meses` después del de `fecha`"""
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return datetime(indice // 12, indice % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    q = schema_editor.quote_name
+    tabla = apps.get_model('dashboard', 'Lectura')._meta.db_table
+    vieja = f'{tabla}_sin_particiones'
+    vistas = {
+        apps.get_model('dashboard', nombre)._meta.db_table: columna
+        for nombre, columna in HISTORIALES.items()
+    }
+
+    with schema_editor.connection.cursor() as cursor:
+        for vista in vistas:
+            cursor.execute(f"DROP VIEW {q(vista)}")
+
+        # Restricciones e índices actuales, para recrearlos con el mismo nombre
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s)",
+            [tabla],
+        )
+        restricciones = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s",
+            [tabla],
+        )
+        nombres_restricciones = {nombre for nombre, _, _ in restricciones}
+        indices = [
+            definicion for nombre, definicion in cursor.fetchall()
+            if nombre not in nombres_restricciones
+        ]
+
+        cursor.execute(f"SELECT MIN(marca_tiempo), MAX(id) FROM {q(tabla)}")
+        primera, ultimo_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {q(tabla)} RENAME TO {q(vieja)}")
+        cursor.execute(
+            f"CREATE TABLE {q(tabla)} (LIKE {q(vieja)}) PARTITION BY RANGE (marca_tiempo)"
+        )
+
+        ahora = datetime.now(dt_timezone.utc)
+        mes = _sumar_meses((primera or ahora).astimezone(dt_timezone.utc), 0)
+        ultimo = _sumar_meses(ahora, MESES_ADELANTE)
+        while mes <= ultimo:
+            siguiente = _sumar_meses(mes, 1)
+            cursor.execute(
+                f"CREATE TABLE {q(f'{tabla}_p{mes.year}_{mes.month:02d}')} PARTITION OF {q(tabla)} "
+                f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{siguiente.isoformat()}')"
+            )
+            mes = siguiente
+        cursor.execute(f"CREATE TABLE {q(f'{tabla}_default')} PARTITION OF {q(tabla)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {q(tabla)} SELECT * FROM {q(vieja)}")
+        cursor.execute(f"DROP TABLE {q(vieja)}")
+
+        # Secuencia propia del id (la identity/serial se fue con la tabla vieja)
+        secuencia = f'{tabla}_id_seq'
+        cursor.execute(f"CREATE SEQUENCE {q(secuencia)} OWNED BY {q(tabla)}.{q('id')}")
+        cursor.execute(f"ALTER TABLE {q(tabla)} ALTER COLUMN {q('id')} SET DEFAULT nextval('{secuencia}')")
+        if ultimo_id:
+            cursor.execute("SELECT setval(%s, %s)", [secuencia, ultimo_id])
+
+        for nombre, tipo, definicion in restricciones:
+            if tipo == 'p':
+                definicion = f"PRIMARY KEY ({q('id')}, {q('marca_tiempo')})"
+            cursor.execute(f"ALTER TABLE {q(tabla)} ADD CONSTRAINT {q(nombre)} {definicion}")
+        for definicion in indices:
+            cursor.execute(definicion)
+
+        for vista, columna in vistas.items():
+            cursor.execute(
+                f"CREATE VIEW {q(vista)} AS "
+                f"SELECT id, sector_id, {q(columna)} AS valor, marca_tiempo "
+                f"FROM {q(tabla)} WHERE {q(columna)} IS NOT NULL"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_lectura_unica'),
+    ]
+
+    operations = [
+        # Sin vuelta atrás automática: la tabla particionada tiene las mismas
+        # columnas, así que el código de versiones anteriores sigue funcionando
+        migrations.RunPython(particionar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_lectura_particionada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Compactacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hasta', models.DateTimeField()),
+                ('conservar_cada', models.PositiveIntegerField(default=0)),
+                ('lecturas_procesadas', models.PositiveBigIntegerField(default=0)),
+                ('lecturas_borradas', models.PositiveBigIntegerField(default=0)),
+                ('segundos', models.FloatField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Compactación',
+                'verbose_name_plural': 'Compactaciones',
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:39
+
+"""
+Métricas de Lectura como enteros escalados (ValorEscalado, en centésimas).
+
+- PostgreSQL: un solo ALTER TABLE que reescribe la tabla (y sus particiones)
+  con smallint/integer USING round(valor * 100). Las vistas Historial*
+  dependen de las columnas: se sacan y se vuelven a crear
+- SQLite: las columnas decimal tienen afinidad NUMERIC y guardan enteros
+  como enteros (1 a 4 bytes en lugar del REAL de 8): alcanza con un UPDATE,
+  sin reconstruir la tabla (el RENAME fallaría por las vistas)
+
+Sin pérdida: DecimalField ya guardaba dos decimales. La vuelta atrás divide
+por 100 y restaura numeric(max_digits, decimal_places).
+"""
+
+import dashboard.campos
+import django.core.validators
+from django.db import migrations
+
+
+HISTORIALES = {
+    'HistorialTemperatura': 'temperatura',
+    'HistorialOxigeno': 'oxigeno',
+    'HistorialSalinidad': 'salinidad',
+    'HistorialPh': 'ph',
+    'HistorialTurbidez': 'turbidez',
+    'HistorialHumedad': 'humedad',
+}
+
+METRICAS = ('temperatura', 'oxigeno', 'salinidad', 'ph', 'turbidez', 'humedad')
+
+
+def _convertir(apps, schema_editor, a_enteros):
+    q = schema_editor.quote_name
+    Lectura = apps.get_model('dashboard', 'Lectura')
+    tabla = q(Lectura._meta.db_table)
+
+    if schema_editor.connection.vendor == 'sqlite':
+        expresion = 'CAST(ROUND({c} * 100) AS INTEGER)' if a_enteros else '{c} / 100.0'
+        schema_editor.execute(
+            f"UPDATE {tabla} SET " + ', '.join(
+                f"{q(m)} = " + expresion.format(c=q(m)) for m in METRICAS
+            )
+        )
+        return
+
+    vistas = {
+        apps.get_model('dashboard', nombre)._meta.db_table: columna
+        for nombre, columna in HISTORIALES.items()
+    }
+    for vista in vistas:
+        schema_editor.execute(f"DROP VIEW IF EXISTS {q(vista)}")
+
+    cambios = []
+    for metrica in METRICAS:
+        campo = Lectura._meta.get_field(metrica)
+        if a_enteros:
+            # Mismo tipo que ValorEscalado.get_internal_type()
+            tipo = 'smallint' if 10 ** campo.max_digits - 1 <= 32767 else 'integer'
+            cambios.append(f"ALTER COLUMN {q(metrica)} TYPE {tipo} USING round({q(metrica)} * 100)::{tipo}")
+        else:
+            tipo = f"numeric({campo.max_digits}, {campo.decimal_places})"
+            cambios.append(f"ALTER COLUMN {q(metrica)} TYPE {tipo} USING ({q(metrica)} / 100.0)::{tipo}")
+    schema_editor.execute(f"ALTER TABLE {tabla} " + ', '.join(cambios))
+
+    for vista, columna in vistas.items():
+        schema_editor.execute(
+            f"CREATE VIEW {q(vista)} AS "
+            f"SELECT id, sector_id, {q(columna)} AS valor, marca_tiempo "
+            f"FROM {tabla} WHERE {q(columna)} IS NOT NULL"
+        )
+
+
+def a_enteros(apps, schema_editor):
+    _convertir(apps, schema_editor, a_enteros=True)
+
+
+def a_decimales(apps, schema_editor):
+    _convertir(apps, schema_editor, a_enteros=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_compactacion'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='humedad',
+                    field=dashboard.campos.ValorEscalado(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+                ),
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='oxigeno',
+                    field=dashboard.campos.ValorEscalado(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(-50), django.core.validators.MaxValueValidator(100)]),
+                ),
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='ph',
+                    field=dashboard.campos.ValorEscalado(blank=True, decimal_places=2, max_digits=4, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(14)]),
+                ),
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='salinidad',
+                    field=dashboard.campos.ValorEscalado(blank=True, decimal_places=2, max_digits=4, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='temperatura',
+                    field=dashboard.campos.ValorEscalado(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(-50), django.core.validators.MaxValueValidator(100)]),
+                ),
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='turbidez',
+                    field=dashboard.campos.ValorEscalado(blank=True, decimal_places=2, max_digits=6, null=True),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(a_enteros, a_decimales),
+            ],
+        ),
+    ]
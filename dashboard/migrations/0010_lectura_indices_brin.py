@@ -0,0 +1,121 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:45
+
+"""
+Índices de Lectura para una tabla de solo inserciones.
+
+Cada INSERT actualizaba cuatro índices: unique_lectura (sector,
+marca_tiempo), (sector, -marca_tiempo), el de la FK sector_id y el de
+marca_tiempo. Los dos primeros son el mismo índice (un B-tree se recorre en
+los dos sentidos) y el de sector_id es su prefijo.
+
+1. Borra (sector, -marca_tiempo) y el índice de sector_id
+2. PostgreSQL: cambia el B-tree de marca_tiempo por uno BRIN (unas pocas
+   páginas por partición: las filas llegan en orden de marca_tiempo) y
+   vuelve a crear unique_lectura con INCLUDE de las métricas, así las
+   consultas de gráficos y de las vistas Historial* son Index Only Scan
+3. SQLite no tiene BRIN ni INCLUDE: conserva el B-tree de marca_tiempo
+   (fuera del estado de Django, lo usan la retención y la compactación)
+
+Los índices propios de PostgreSQL no están en Meta.indexes: Django los
+intentaría crear también en SQLite al reconstruir la tabla.
+
+Index Only Scan necesita el mapa de visibilidad al día: desde PostgreSQL 13
+el autovacuum también pasa por las tablas que solo reciben INSERT.
+"""
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+METRICAS = ('temperatura', 'oxigeno', 'salinidad', 'ph', 'turbidez', 'humedad')
+
+BRIN = 'dashboard_lectura_marca_tiempo_brin'
+
+
+def _simples(schema_editor):
+    """Columnas cuyo índice de una sola columna se borra en este motor"""
+    if schema_editor.connection.vendor == 'postgresql':
+        return ['sector_id', 'marca_tiempo']
+    return ['sector_id']
+
+
+def quitar_indices_simples(apps, schema_editor):
+    tabla = apps.get_model('dashboard', 'Lectura')._meta.db_table
+    connection = schema_editor.connection
+
+    with connection.cursor() as cursor:
+        restricciones = connection.introspection.get_constraints(cursor, tabla)
+
+    for nombre, info in restricciones.items():
+        if (info['index'] and not info['unique'] and not info['primary_key']
+                and len(info['columns']) == 1 and info['columns'][0] in _simples(schema_editor)):
+            schema_editor.execute(f"DROP INDEX {schema_editor.quote_name(nombre)}")
+
+
+def crear_indices_simples(apps, schema_editor):
+    q = schema_editor.quote_name
+    tabla = apps.get_model('dashboard', 'Lectura')._meta.db_table
+    for columna in _simples(schema_editor):
+        schema_editor.execute(f"CREATE INDEX {q(f'{tabla}_{columna}_idx')} ON {q(tabla)} ({q(columna)})")
+
+
+def _unique_lectura(schema_editor, tabla, incluir):
+    q = schema_editor.quote_name
+    include = f" INCLUDE ({', '.join(q(m) for m in METRICAS)})" if incluir else ''
+    schema_editor.execute(
+        f"ALTER TABLE {q(tabla)} DROP CONSTRAINT {q('unique_lectura')}, "
+        f"ADD CONSTRAINT {q('unique_lectura')} UNIQUE ({q('sector_id')}, {q('marca_tiempo')}){include}"
+    )
+
+
+def crear_brin_y_cobertura(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    q = schema_editor.quote_name
+    tabla = apps.get_model('dashboard', 'Lectura')._meta.db_table
+    schema_editor.execute(f"CREATE INDEX {q(BRIN)} ON {q(tabla)} USING brin ({q('marca_tiempo')})")
+    _unique_lectura(schema_editor, tabla, incluir=True)
+
+
+def quitar_brin_y_cobertura(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    tabla = apps.get_model('dashboard', 'Lectura')._meta.db_table
+    _unique_lectura(schema_editor, tabla, incluir=False)
+    schema_editor.execute(f"DROP INDEX {schema_editor.quote_name(BRIN)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_lectura_valor_escalado'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lectura',
+            name='dashboard_l_sector__564b3d_idx',
+        ),
+        # En SQLite AlterField reconstruiría la tabla (y fallaría por las
+        # vistas Historial*): los índices se borran a mano
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='marca_tiempo',
+                    field=models.DateTimeField(),
+                ),
+                migrations.AlterField(
+                    model_name='lectura',
+                    name='sector',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lecturas', to='dashboard.sector'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(quitar_indices_simples, crear_indices_simples),
+            ],
+        ),
+        migrations.RunPython(crear_brin_y_cobertura, quitar_brin_y_cobertura),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:15
+
+"""
+Compactacion.borrado_hasta: hasta dónde se borraron las lecturas crudas.
+
+Las pasadas anteriores borraban cada día antes de pasar al siguiente y
+terminaban con hasta = corte: se toman como completas (borrado_hasta = hasta).
+"""
+
+from django.db import migrations, models
+
+
+def copiar_hasta(apps, schema_editor):
+    Compactacion = apps.get_model('dashboard', 'Compactacion')
+    Compactacion.objects.update(borrado_hasta=models.F('hasta'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_lectura_indices_brin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compactacion',
+            name='borrado_hasta',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copiar_hasta, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='compactacion',
+            name='borrado_hasta',
+            field=models.DateTimeField(),
+        ),
+    ]
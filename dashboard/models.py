@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from dashboard.campos import ValorEscalado
+
 class Sector(models.Model):
     latitud = models.DecimalField(
         max_digits=10, 
@@ -42,13 +45,215 @@ class Bivalvo(models.Model):
         return self.tipo
 
 
+class Lectura(models.Model):
+    """
+    Una fila por sector y marca de tiempo, con todas las métricas.
+    
+    Reemplaza a las tablas Historial* (una por sensor): una lectura del
+    Arduino es un solo INSERT y una sola actualización de índices en vez de
+    cinco. Las Historial* siguen existiendo como vistas de solo lectura
+    sobre esta tabla.
+
+    Las métricas se guardan en centésimas como enteros (ValorEscalado) y
+    se leen como float.
+    """
+    
+    # Columnas de métricas (mismo nombre que en el JSON del LOCAL)
+    METRICAS = ('temperatura', 'oxigeno', 'salinidad', 'ph', 'turbidez', 'humedad')
+    
+    # Sin índices propios: unique_lectura (sector, marca_tiempo) sirve para
+    # las consultas por sector en los dos sentidos. En PostgreSQL las
+    # consultas por rango de marca_tiempo usan un índice BRIN y
+    # unique_lectura incluye las métricas (INCLUDE) para que los gráficos
+    # se respondan solo con el índice; en SQLite queda el índice B-tree de
+    # marca_tiempo. Ver migración 0010
+    sector = models.ForeignKey(
+        Sector,
+        on_delete=models.CASCADE,
+        related_name='lecturas',
+        db_index=False
+    )
+    marca_tiempo = models.DateTimeField()
+    
+    temperatura = ValorEscalado(
+        max_digits=5, decimal_places=2, null=True, blank=True,
+        validators=[MinValueValidator(-50), MaxValueValidator(100)]
+    )
+    oxigeno = ValorEscalado(
+        max_digits=5, decimal_places=2, null=True, blank=True,
+        validators=[MinValueValidator(-50), MaxValueValidator(100)]
+    )
+    salinidad = ValorEscalado(max_digits=4, decimal_places=2, null=True, blank=True)
+    ph = ValorEscalado(
+        max_digits=4, decimal_places=2, null=True, blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(14)]
+    )
+    turbidez = ValorEscalado(max_digits=6, decimal_places=2, null=True, blank=True)
+    humedad = ValorEscalado(
+        max_digits=5, decimal_places=2, null=True, blank=True,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    
+    class Meta:
+        verbose_name = "Lectura"
+        verbose_name_plural = "Lecturas"
+        ordering = ['-marca_tiempo']
+        constraints = [
+            # Clave de idempotencia: un reintento del LOCAL (o el replay del
+            # outbox) no duplica la lectura (ver escribir_lecturas)
+            models.UniqueConstraint(
+                fields=['sector', 'marca_tiempo'],
+                name='unique_lectura'
+            )
+        ]
+    
+    def __str__(self):
+        return f"Lectura sector {self.sector_id} - {self.marca_tiempo}"
+
+
+class LecturaAgregada(models.Model):
+    """
+    Resumen (cantidad, suma, mínimo, máximo) de una métrica de un sector
+    dentro de un intervalo de 1 minuto, 1 hora o 1 día.
+
+    Se actualiza en la misma transacción que inserta las Lectura (ver
+    dashboard.agregados) y se puede reconstruir con
+    `python manage.py recalcular_agregados`.
+    """
+
+    GRANULARIDADES = [
+        ('1m', '1 minuto'),
+        ('1h', '1 hora'),
+        ('1d', '1 día'),
+    ]
+
+    sector = models.ForeignKey(
+        Sector,
+        on_delete=models.CASCADE,
+        related_name='agregados'
+    )
+    metrica = models.CharField(
+        max_length=20,
+        choices=[(metrica, metrica) for metrica in Lectura.METRICAS]
+    )
+    granularidad = models.CharField(max_length=2, choices=GRANULARIDADES)
+    inicio = models.DateTimeField()  # Comienzo del intervalo
+
+    cantidad = models.PositiveIntegerField(default=0)
+    suma = models.FloatField(default=0)
+    minimo = models.FloatField()
+    maximo = models.FloatField()
+
+    class Meta:
+        verbose_name = "Lectura agregada"
+        verbose_name_plural = "Lecturas agregadas"
+        ordering = ['inicio']
+        constraints = [
+            # También es el índice de las consultas por rango
+            models.UniqueConstraint(
+                fields=['sector', 'metrica', 'granularidad', 'inicio'],
+                name='unique_lectura_agregada'
+            )
+        ]
+
+    @property
+    def promedio(self):
+        return self.suma / self.cantidad if self.cantidad else None
+
+    def __str__(self):
+        return f"{self.metrica} sector {self.sector_id} [{self.granularidad}] {self.inicio}"
+
+
+class UltimaLectura(models.Model):
+    """
+    Último valor conocido de cada métrica de un sector (una fila por sector).
+
+    Se actualiza en la misma transacción que inserta las Lectura (ver
+    dashboard.ultimas) para que home y las cards de sector_detail lean el
+    valor actual de todos los sectores de una sola vez.
+    """
+
+    sector = models.OneToOneField(
+        Sector,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ultima_lectura'
+    )
+    marca_tiempo = models.DateTimeField()  # Lectura más reciente (cualquier métrica)
+
+    temperatura = models.FloatField(null=True, blank=True)
+    oxigeno = models.FloatField(null=True, blank=True)
+    salinidad = models.FloatField(null=True, blank=True)
+    ph = models.FloatField(null=True, blank=True)
+    turbidez = models.FloatField(null=True, blank=True)
+    humedad = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Última lectura"
+        verbose_name_plural = "Últimas lecturas"
+
+    def __str__(self):
+        return f"Última lectura sector {self.sector_id} - {self.marca_tiempo}"
+
+
+class Compactacion(models.Model):
+    """
+    Una pasada de compactación (o de retención) del historial crudo.
+
+    Las lecturas anteriores a `hasta` ya no están completas: se borraron o
+    se dejó una de cada `conservar_cada`. Sus agregados se calcularon antes
+    de borrar y recalcular_agregados no vuelve a tocarlos (ver
+    dashboard.compactacion).
+
+    El borrado va detrás: las de [borrado_hasta, hasta) tienen sus agregados
+    pero quizás no se borraron todavía (la pasada se cortó a mitad de un
+    día). La próxima pasada retoma el borrado desde ahí.
+    """
+
+    hasta = models.DateTimeField()  # Avanza a medida que se compacta cada tramo
+    borrado_hasta = models.DateTimeField()  # Lecturas crudas ya adelgazadas
+    conservar_cada = models.PositiveIntegerField(default=0)  # 0 = se borró todo
+
+    lecturas_procesadas = models.PositiveBigIntegerField(default=0)
+    lecturas_borradas = models.PositiveBigIntegerField(default=0)
+    segundos = models.FloatField(default=0)
+
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Compactación"
+        verbose_name_plural = "Compactaciones"
+        ordering = ['-creado']
+
+    @classmethod
+    def limite(cls):
+        """Instante antes del cual las lecturas crudas están compactadas (o None)"""
+        return cls.objects.aggregate(limite=models.Max('hasta'))['limite']
+
+    @classmethod
+    def borrado_pendiente(cls):
+        """Pasadas con lecturas crudas sin adelgazar, de la más vieja a la más nueva"""
+        return cls.objects.filter(borrado_hasta__lt=models.F('hasta')).order_by('hasta')
+
+    def __str__(self):
+        return f"Compactación hasta {self.hasta} (1 de cada {self.conservar_cada or '∞'})"
+
+
+# ============================================================================
+# HISTORIALES POR SENSOR (vistas de solo lectura sobre Lectura)
+# ============================================================================
+# Se mantienen para el código que consulta un sensor a la vez
+# (sector.temperaturas, sector.ph_registros, ...). Las escrituras van a
+# Lectura (ver dashboard.ingesta.escribir_lecturas).
+
+
 class HistorialTemperatura(models.Model):
     sector = models.ForeignKey(
         Sector, 
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,  # Se borra en cascada desde Lectura
         related_name='temperaturas'  # ← IMPORTANTE
     )
-    valor = models.DecimalField(
+    valor = ValorEscalado(
         max_digits=5, 
         decimal_places=2,
         validators=[MinValueValidator(-50), MaxValueValidator(100)]
@@ -59,9 +264,7 @@ class HistorialTemperatura(models.Model):
         verbose_name = "Historial de Temperatura"
         verbose_name_plural = "Historiales de Temperatura"
         ordering = ['-marca_tiempo']  # Más recientes primero
-        indexes = [
-            models.Index(fields=['sector', '-marca_tiempo']),
-        ]
+        managed = False  # Vista sobre dashboard_lectura (migración 0002)
     
     def __str__(self):
         return f"{self.valor}°C - {self.marca_tiempo}"
@@ -70,10 +273,10 @@ class HistorialTemperatura(models.Model):
 class HistorialOxigeno(models.Model):
     sector = models.ForeignKey(
         Sector, 
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,  # Se borra en cascada desde Lectura
         related_name='oxigenos'  # ← IMPORTANTE
     )
-    valor = models.DecimalField(
+    valor = ValorEscalado(
         max_digits=5, 
         decimal_places=2,
         validators=[MinValueValidator(-50), MaxValueValidator(100)]
@@ -84,9 +287,7 @@ class HistorialOxigeno(models.Model):
         verbose_name = "Historial de Oxígeno"
         verbose_name_plural = "Historiales de Oxígeno"
         ordering = ['-marca_tiempo']  # Más recientes primero
-        indexes = [
-            models.Index(fields=['sector', '-marca_tiempo']),
-        ]
+        managed = False  # Vista sobre dashboard_lectura (migración 0002)
     
     def __str__(self):
         return f"{self.valor}°C - {self.marca_tiempo}"
@@ -95,19 +296,17 @@ class HistorialOxigeno(models.Model):
 class HistorialSalinidad(models.Model):
     sector = models.ForeignKey(
         Sector, 
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,  # Se borra en cascada desde Lectura
         related_name='salinidades'
     )
-    valor = models.DecimalField(max_digits=4, decimal_places=2)
+    valor = ValorEscalado(max_digits=4, decimal_places=2)
     marca_tiempo = models.DateTimeField(db_index=True)
     
     class Meta:
         verbose_name = "Historial de Salinidad"
         verbose_name_plural = "Historiales de Salinidad"
         ordering = ['-marca_tiempo']
-        indexes = [
-            models.Index(fields=['sector', '-marca_tiempo']),
-        ]
+        managed = False  # Vista sobre dashboard_lectura (migración 0002)
     
     def __str__(self):
         return f"{self.valor} PSU - {self.marca_tiempo}"
@@ -116,10 +315,10 @@ class HistorialSalinidad(models.Model):
 class HistorialPh(models.Model):
     sector = models.ForeignKey(
         Sector, 
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,  # Se borra en cascada desde Lectura
         related_name='ph_registros'
     )
-    valor = models.DecimalField(
+    valor = ValorEscalado(
         max_digits=4, 
         decimal_places=2,
         validators=[MinValueValidator(0), MaxValueValidator(14)]
@@ -130,9 +329,7 @@ class HistorialPh(models.Model):
         verbose_name = "Historial de pH"
         verbose_name_plural = "Historiales de pH"
         ordering = ['-marca_tiempo']
-        indexes = [
-            models.Index(fields=['sector', '-marca_tiempo']),
-        ]
+        managed = False  # Vista sobre dashboard_lectura (migración 0002)
     
     def __str__(self):
         return f"pH {self.valor} - {self.marca_tiempo}"
@@ -141,19 +338,17 @@ class HistorialPh(models.Model):
 class HistorialTurbidez(models.Model):
     sector = models.ForeignKey(
         Sector, 
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,  # Se borra en cascada desde Lectura
         related_name='turbideces'
     )
-    valor = models.DecimalField(max_digits=6, decimal_places=2)
+    valor = ValorEscalado(max_digits=6, decimal_places=2)
     marca_tiempo = models.DateTimeField(db_index=True)
     
     class Meta:
         verbose_name = "Historial de Turbidez"
         verbose_name_plural = "Historiales de Turbidez"
         ordering = ['-marca_tiempo']
-        indexes = [
-            models.Index(fields=['sector', '-marca_tiempo']),
-        ]
+        managed = False  # Vista sobre dashboard_lectura (migración 0002)
     
     def __str__(self):
         return f"{self.valor} NTU - {self.marca_tiempo}"
@@ -162,10 +357,10 @@ class HistorialTurbidez(models.Model):
 class HistorialHumedad(models.Model):
     sector = models.ForeignKey(
         Sector, 
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,  # Se borra en cascada desde Lectura
         related_name='humedades'
     )
-    valor = models.DecimalField(
+    valor = ValorEscalado(
         max_digits=5, 
         decimal_places=2,
         validators=[MinValueValidator(0), MaxValueValidator(100)]
@@ -176,9 +371,7 @@ class HistorialHumedad(models.Model):
         verbose_name = "Historial de Humedad"
         verbose_name_plural = "Historiales de Humedad"
         ordering = ['-marca_tiempo']
-        indexes = [
-            models.Index(fields=['sector', '-marca_tiempo']),
-        ]
+        managed = False  # Vista sobre dashboard_lectura (migración 0002)
     
     def __str__(self):
         return f"{self.valor}% - {self.marca_tiempo}"
@@ -221,4 +414,69 @@ class Zona(models.Model):
     geopoligono = models.JSONField()  # GeoJSON del polígono
 
     def __str__(self):
-        return self.nombre
\ No newline at end of file
+        return self.nombre
+
+class ExportacionTrabajo(models.Model):
+    """
+    Exportación de varios sectores (o de una zona) que corre en segundo plano.
+
+    El trabajo se parte por sector y ventana de tiempo; cada parte se
+    escribe en un proceso del pool (ver dashboard.trabajos) y al final se
+    arma un .zip con un dataset particionado (sector_id=<id>/...).
+    """
+
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    FORMATOS = [
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+        ('arrow', 'Arrow IPC'),
+        ('npz', 'NumPy .npz'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='exportaciones'
+    )
+    sectores = models.ManyToManyField(Sector, related_name='exportaciones')
+    zona = models.ForeignKey(
+        Zona,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='exportaciones'
+    )
+    formato = models.CharField(max_length=10, choices=FORMATOS)
+    desde = models.DateTimeField()
+    hasta = models.DateTimeField()
+
+    estado = models.CharField(max_length=12, choices=ESTADOS, default='pendiente', db_index=True)
+    partes_totales = models.PositiveIntegerField(default=0)
+    partes_completadas = models.PositiveIntegerField(default=0)
+    lecturas = models.PositiveBigIntegerField(default=0)
+    archivo = models.CharField(max_length=500, blank=True)  # Ruta del .zip
+    error = models.TextField(blank=True)
+
+    creado = models.DateTimeField(auto_now_add=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de exportación"
+        verbose_name_plural = "Trabajos de exportación"
+        ordering = ['-creado']
+
+    @property
+    def progreso(self):
+        """Fracción de partes terminadas (0 a 1)"""
+        if not self.partes_totales:
+            return 1.0 if self.estado == 'completado' else 0.0
+        return self.partes_completadas / self.partes_totales
+
+    def __str__(self):
+        return f"Exportación {self.id} ({self.formato}, {self.estado})"
@@ -0,0 +1,154 @@
+"""
+Outbox persistente (store-and-forward) para el entorno LOCAL.
+
+Cada lectura que se guarda en local se agrega también a este outbox antes
+de intentar subirla al cloud. El cliente WebSocket lo drena en orden y por
+lotes, y solo borra las filas cuando el cloud confirma que las recibió.
+Si no hay internet las lecturas se acumulan aquí y se suben al volver la
+conexión, sin perder datos.
+
+Características:
+- Tabla SQLite en modo WAL, en un archivo aparte de la base de Django
+- IDs monótonos (AUTOINCREMENT): sirven como número de secuencia de cada lectura
+- Compactación (checkpoint del WAL) cuando el outbox queda vacío
+
+Uso:
+    from dashboard.outbox import outbox_local, construir_payload
+
+    outbox_local.agregar(construir_payload(datos, sector_id, marca_tiempo))
+    pendientes = outbox_local.pendientes(limite=200)   # [(id, payload), ...]
+    outbox_local.confirmar([id for id, _ in pendientes])
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def construir_payload(datos: Dict[str, Any], sector_id, marca_tiempo=None) -> Dict[str, Any]:
+    """
+    Armar el payload que se sube al cloud a partir de una lectura del Arduino.
+
+    Args:
+        datos: Diccionario con los datos de sensores
+        sector_id: ID del sector
+        marca_tiempo: Timestamp (datetime o string ISO)
+    """
+    if marca_tiempo is None:
+        marca_tiempo = timezone.now()
+
+    # Convertir a ISO string si es datetime
+    if hasattr(marca_tiempo, 'isoformat'):
+        marca_tiempo_str = marca_tiempo.isoformat()
+    else:
+        marca_tiempo_str = str(marca_tiempo)
+
+    return {
+        'sector_id': int(sector_id),
+        'temperatura': float(datos.get('temperatura')) if datos.get('temperatura') is not None else None,
+        'salinidad': float(datos.get('salinidad')) if datos.get('salinidad') is not None else None,
+        'ph': float(datos.get('ph')) if datos.get('ph') is not None else None,
+        'turbidez': float(datos.get('turbidez')) if datos.get('turbidez') is not None else None,
+        'humedad': float(datos.get('humedad')) if datos.get('humedad') is not None else None,
+        'marca_tiempo': marca_tiempo_str
+    }
+
+
+class OutboxLocal:
+    """
+    Cola FIFO durable de lecturas pendientes de subir al cloud.
+
+    Segura para usar desde varios threads (vistas de Django, cliente WebSocket).
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion: Optional[sqlite3.Connection] = None
+
+        # Funciones a llamar con (id, payload) después de cada agregar()
+        self._suscriptores: List[Callable[[int, Dict[str, Any]], None]] = []
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self._conexion is None:
+            conexion = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' payload TEXT NOT NULL,'
+                ' creado REAL NOT NULL'
+                ')'
+            )
+            self._conexion = conexion
+        return self._conexion
+
+    def suscribir(self, funcion: Callable[[int, Dict[str, Any]], None]):
+        """Avisar a `funcion(id, payload)` de cada lectura nueva (p.ej. el uplink)"""
+        if funcion not in self._suscriptores:
+            self._suscriptores.append(funcion)
+
+    def agregar(self, payload: Dict[str, Any]) -> int:
+        """Agregar una lectura al final del outbox. Retorna su id (secuencia)"""
+        with self._lock:
+            cursor = self._conectar().execute(
+                'INSERT INTO outbox (payload, creado) VALUES (?, ?)',
+                (json.dumps(payload), time.time())
+            )
+            id_ = cursor.lastrowid
+
+        for funcion in self._suscriptores:
+            funcion(id_, payload)
+        return id_
+
+    def pendientes(self, limite: int = 500, despues_de: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lecturas sin confirmar, en orden de llegada"""
+        with self._lock:
+            filas = self._conectar().execute(
+                'SELECT id, payload FROM outbox WHERE id > ? ORDER BY id LIMIT ?',
+                (despues_de, limite)
+            ).fetchall()
+        return [(id_, json.loads(payload)) for id_, payload in filas]
+
+    def confirmar(self, ids: Iterable[int]) -> int:
+        """Borrar lecturas ya confirmadas por el cloud"""
+        ids = list(ids)
+        if not ids:
+            return 0
+
+        with self._lock:
+            conexion = self._conectar()
+            conexion.execute('BEGIN')
+            conexion.executemany('DELETE FROM outbox WHERE id = ?', [(id_,) for id_ in ids])
+            conexion.execute('COMMIT')
+        return len(ids)
+
+    def tamano(self) -> int:
+        """Cantidad de lecturas pendientes"""
+        with self._lock:
+            return self._conectar().execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def compactar(self):
+        """Devolver al disco el espacio del WAL cuando ya no queda nada pendiente"""
+        with self._lock:
+            conexion = self._conectar()
+            vacio = conexion.execute('SELECT 1 FROM outbox LIMIT 1').fetchone() is None
+            if vacio:
+                conexion.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                logger.debug("🧹 Outbox compactado")
+
+
+# ============================================================================
+# SINGLETON INSTANCE
+# ============================================================================
+
+outbox_local = OutboxLocal(settings.OUTBOX_PATH)
@@ -0,0 +1,255 @@
+"""
+Particiones mensuales de Lectura y retención del historial crudo.
+
+En PostgreSQL dashboard_lectura es una tabla particionada por rango de
+marca_tiempo (una partición por mes, ver migración 0007). Cada partición
+tiene sus propios índices, así que su tamaño no crece con la antigüedad del
+sistema; las consultas por rango solo leen los meses que tocan y la
+retención borra meses enteros con DROP TABLE en lugar de un DELETE que
+recorre millones de filas.
+
+Características:
+- asegurar_particiones() crea el mes actual y los siguientes
+  (PARTICIONES_MESES_ADELANTE); lo corre el comando `particiones`, pensado
+  para un cron diario
+- La partición DEFAULT recibe lo que no tiene mes creado (la ingesta nunca
+  falla por eso); asegurar_particiones() mueve esas filas a su mes
+- aplicar_retencion() borra los meses anteriores a LECTURAS_RETENCION_MESES.
+  Los agregados (LecturaAgregada) y UltimaLectura no se tocan: los gráficos
+  de rangos viejos siguen funcionando
+- SQLite (nodos LOCAL) no tiene particiones: la retención borra mes por mes
+  en lotes de RETENCION_TAMANO_LOTE filas, con el índice de marca_tiempo
+
+Uso:
+    from dashboard.particiones import asegurar_particiones, aplicar_retencion
+
+    creadas = asegurar_particiones()
+    meses, filas = aplicar_retencion(meses=12)
+"""
+
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from dashboard.models import Compactacion, Lectura
+
+logger = logging.getLogger(__name__)
+
+
+def _tabla() -> str:
+    return Lectura._meta.db_table
+
+
+def nombre_particion(mes: datetime) -> str:
+    """dashboard_lectura_p2026_10"""
+    return f'{_tabla()}_p{mes.year}_{mes.month:02d}'
+
+
+def nombre_default() -> str:
+    return f'{_tabla()}_default'
+
+
+def inicio_mes(fecha: datetime) -> datetime:
+    """Primer instante del mes de `fecha`, en UTC"""
+    fecha = fecha.astimezone(dt_timezone.utc)
+    return datetime(fecha.year, fecha.month, 1, tzinfo=dt_timezone.utc)
+
+
+def sumar_meses(mes: datetime, meses: int) -> datetime:
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return datetime(indice // 12, indice % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def particionada() -> bool:
+    """True si dashboard_lectura es una tabla particionada (solo PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [_tabla()],
+        )
+        return cursor.fetchone() is not None
+
+
+def particiones() -> List[datetime]:
+    """Meses con partición creada (sin la DEFAULT), en orden"""
+    prefijo = f'{_tabla()}_p'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [_tabla()],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+
+    meses = []
+    for nombre in nombres:
+        if nombre.startswith(prefijo):
+            anio, mes = nombre[len(prefijo):].split('_')
+            meses.append(datetime(int(anio), int(mes), 1, tzinfo=dt_timezone.utc))
+    return sorted(meses)
+
+
+# ============================================================================
+# CREACIÓN
+# ============================================================================
+
+def _crear_particion(cursor, mes: datetime):
+    """
+    Crear la partición de un mes. Si la DEFAULT tiene filas de ese mes, la
+    partición no se puede agregar sin moverlas: se desprende la DEFAULT, se
+    crea el mes, se mueven las filas y se vuelve a unir (todo en la
+    transacción del llamador).
+    """
+    q = connection.ops.quote_name
+    tabla, default = _tabla(), nombre_default()
+    hasta = sumar_meses(mes, 1)
+
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {q(default)} WHERE marca_tiempo >= %s AND marca_tiempo < %s)",
+        [mes, hasta],
+    )
+    en_default = cursor.fetchone()[0]
+
+    if en_default:
+        cursor.execute(f"ALTER TABLE {q(tabla)} DETACH PARTITION {q(default)}")
+
+    cursor.execute(
+        f"CREATE TABLE {q(nombre_particion(mes))} PARTITION OF {q(tabla)} "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{hasta.isoformat()}')"
+    )
+
+    if en_default:
+        cursor.execute(
+            f"WITH movidas AS (DELETE FROM {q(default)} "
+            f"WHERE marca_tiempo >= %s AND marca_tiempo < %s RETURNING *) "
+            f"INSERT INTO {q(tabla)} SELECT * FROM movidas",
+            [mes, hasta],
+        )
+        logger.info(f"📦 {cursor.rowcount} lecturas movidas de la partición default a {nombre_particion(mes)}")
+        cursor.execute(f"ALTER TABLE {q(tabla)} ATTACH PARTITION {q(default)} DEFAULT")
+
+
+def asegurar_particiones(meses_adelante: Optional[int] = None) -> List[str]:
+    """
+    Crear las particiones que falten: el mes actual, los `meses_adelante`
+    siguientes y los meses que tengan filas en la DEFAULT.
+
+    Returns:
+        list: Nombres de las particiones creadas
+    """
+    if not particionada():
+        return []
+
+    if meses_adelante is None:
+        meses_adelante = settings.PARTICIONES_MESES_ADELANTE
+
+    actual = inicio_mes(timezone.now())
+    deseados = {sumar_meses(actual, i) for i in range(meses_adelante + 1)}
+
+    q = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', marca_tiempo AT TIME ZONE 'UTC') "
+            f"FROM {q(nombre_default())}"
+        )
+        deseados.update(fila[0].replace(tzinfo=dt_timezone.utc) for fila in cursor.fetchall())
+
+    existentes = set(particiones())
+    creadas = []
+    for mes in sorted(deseados - existentes):
+        with transaction.atomic(), connection.cursor() as cursor:
+            _crear_particion(cursor, mes)
+        creadas.append(nombre_particion(mes))
+        logger.info(f"🗂️ Partición creada: {nombre_particion(mes)}")
+
+    return creadas
+
+
+# ============================================================================
+# RETENCIÓN
+# ============================================================================
+
+def aplicar_retencion(meses: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Borrar las lecturas crudas de los meses anteriores a los últimos `meses`
+    (el mes en curso cuenta). 0 = conservar todo.
+
+    Lo borrado queda registrado como Compactacion: recalcular_agregados
+    no reconstruye esos meses (sus agregados se conservan).
+
+    Returns:
+        tuple: (meses borrados, filas borradas). En PostgreSQL las filas no
+        se cuentan (se descarta la partición entera) y se informa 0
+    """
+    if meses is None:
+        meses = settings.LECTURAS_RETENCION_MESES
+    if meses <= 0:
+        return 0, 0
+
+    corte = sumar_meses(inicio_mes(timezone.now()), -(meses - 1))
+
+    if particionada():
+        borrados, filas = _descartar_particiones(corte), 0
+    else:
+        borrados, filas = _borrar_por_mes(corte)
+
+    if borrados:
+        limite = Compactacion.limite()
+        if limite is None or limite < corte:
+            Compactacion.objects.create(hasta=corte, borrado_hasta=corte, conservar_cada=0, lecturas_borradas=filas)
+    return borrados, filas
+
+
+def _descartar_particiones(corte: datetime) -> int:
+    q = connection.ops.quote_name
+    viejas = [mes for mes in particiones() if mes < corte]
+
+    for mes in viejas:
+        nombre = nombre_particion(mes)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {q(_tabla())} DETACH PARTITION {q(nombre)}")
+            cursor.execute(f"DROP TABLE {q(nombre)}")
+        logger.info(f"🗑️ Partición descartada: {nombre}")
+
+    # Lo viejo que haya quedado en la DEFAULT (no debería haber mucho)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {q(nombre_default())} WHERE marca_tiempo < %s", [corte])
+
+    return len(viejas)
+
+
+def _borrar_por_mes(corte: datetime) -> Tuple[int, int]:
+    """SQLite: borrar mes por mes, en lotes chicos para no trabar la ingesta"""
+    primera = Lectura.objects.filter(marca_tiempo__lt=corte).order_by('marca_tiempo').values_list(
+        'marca_tiempo', flat=True
+    ).first()
+    if primera is None:
+        return 0, 0
+
+    meses = filas = 0
+    mes = inicio_mes(primera)
+    while mes < corte:
+        hasta = min(sumar_meses(mes, 1), corte)
+        del_mes = Lectura.objects.filter(marca_tiempo__gte=mes, marca_tiempo__lt=hasta)
+
+        borradas_mes = 0
+        while True:
+            ids = list(del_mes.order_by().values_list('id', flat=True)[:settings.RETENCION_TAMANO_LOTE])
+            if not ids:
+                break
+            # Cada lote es su propia transacción: la ingesta espera como mucho un lote
+            borradas_mes += Lectura.objects.filter(id__in=ids).delete()[0]
+
+        if borradas_mes:
+            meses += 1
+            filas += borradas_mes
+            logger.info(f"🗑️ {borradas_mes} lecturas de {mes:%Y-%m} borradas")
+        mes = sumar_meses(mes, 1)
+
+    return meses, filas
@@ -0,0 +1,218 @@
+"""
+Formato binario compacto (MessagePack) para los WebSockets.
+
+El JSON de siempre repite en cada lectura claves largas ('temperatura',
+'marca_tiempo', ...) y manda la fecha como texto ISO. En el formato binario
+cada lectura es un arreglo corto con ids enteros de métrica, la marca de
+tiempo en milisegundos desde epoch y los valores en float32: el lote pesa
+bastante menos en el enlace celular del LOCAL y el cloud no parsea fechas.
+
+Características:
+- Se negocia por conexión: subprotocolo 'bivalvia.msgpack' o ?formato=msgpack
+- Quien recibe acepta los dos formatos (text_data JSON, bytes_data MessagePack)
+- codificar()/decodificar() traducen entre los mensajes de siempre (los
+  mismos dict que viajan en JSON) y su forma compacta, así los consumers y
+  el cliente no cambian su lógica
+- Los ids de métrica son fijos: no reordenar METRICA_ID, solo agregar
+
+Forma compacta de una lectura:
+    [seq, sector_id, epoch_ms, {metrica_id: valor, ...}]
+    (seq es None si la lectura no lo trae; las métricas nulas se omiten)
+
+Uso:
+    from dashboard.protocolo import codificar, decodificar
+
+    frame = codificar({'tipo': 'lote', 'lote_id': 'abc', 'lecturas': [...]})
+    mensaje = decodificar(frame)  # {'tipo': 'lote', 'lote_id': 'abc', 'lecturas': [...]}
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+import msgpack
+from django.utils import timezone
+
+
+SUBPROTOCOLO = 'bivalvia.msgpack'
+
+# Ids de métrica en el formato compacto (estables entre versiones)
+METRICA_ID = {
+    'temperatura': 1,
+    'oxigeno': 2,
+    'salinidad': 3,
+    'ph': 4,
+    'turbidez': 5,
+    'humedad': 6,
+}
+
+# Códigos de tipo de frame
+LOTE = 'l'
+LECTURA = 'r'
+ACK_LOTE = 'a'
+ACK = 'k'
+SENSOR_DATA = 'd'
+OTRO = 'x'
+
+
+def formato_binario(scope) -> bool:
+    """True si el cliente pidió MessagePack (subprotocolo o ?formato=msgpack)"""
+    if SUBPROTOCOLO in scope.get('subprotocols', ()):
+        return True
+    parametros = parse_qs(scope.get('query_string', b'').decode())
+    return parametros.get('formato', [''])[0] == 'msgpack'
+
+
+# ============================================================================
+# MARCAS DE TIEMPO
+# ============================================================================
+
+def a_epoch_ms(valor) -> int:
+    """datetime o string ISO a milisegundos desde epoch"""
+    if not isinstance(valor, datetime):
+        valor = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    if timezone.is_naive(valor):
+        valor = timezone.make_aware(valor)
+    return int(valor.timestamp() * 1000)
+
+
+def desde_epoch_ms(ms: int) -> datetime:
+    """Milisegundos desde epoch a datetime aware (UTC)"""
+    return datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc)
+
+
+# ============================================================================
+# LECTURAS
+# ============================================================================
+
+def _compactar_lectura(lectura: Dict[str, Any]) -> list:
+    marca_tiempo = lectura.get('marca_tiempo')
+    valores = {
+        METRICA_ID[metrica]: float(lectura[metrica])
+        for metrica in METRICA_ID
+        if lectura.get(metrica) is not None
+    }
+    return [
+        lectura.get('seq'),
+        lectura.get('sector_id'),
+        a_epoch_ms(marca_tiempo) if marca_tiempo else None,
+        valores,
+    ]
+
+
+def _expandir_lectura(compacta: list) -> Dict[str, Any]:
+    seq, sector_id, epoch_ms, valores = compacta
+    lectura = {
+        'sector_id': sector_id,
+        'marca_tiempo': desde_epoch_ms(epoch_ms) if epoch_ms is not None else None,
+    }
+    for metrica, id_ in METRICA_ID.items():
+        valor = valores.get(id_)
+        # float32 -> el decimal más corto que lo representa (7.2, no 7.1999998)
+        lectura[metrica] = float(f'{valor:.7g}') if valor is not None else None
+    if seq is not None:
+        lectura['seq'] = seq
+    return lectura
+
+
+# ============================================================================
+# MENSAJES
+# ============================================================================
+
+def _por_defecto(valor):
+    """Tipos que MessagePack no conoce (mensajes genéricos)"""
+    if isinstance(valor, datetime):
+        return a_epoch_ms(valor)
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f'No se puede codificar {type(valor).__name__}')
+
+
+def codificar(mensaje: Dict[str, Any]) -> bytes:
+    """Mensaje (el mismo dict que se manda en JSON) a frame MessagePack"""
+    if mensaje.get('tipo') == 'lote':
+        compacto = {
+            't': LOTE,
+            'id': mensaje.get('lote_id'),
+            'l': [_compactar_lectura(lectura) for lectura in mensaje['lecturas']],
+        }
+    elif mensaje.get('tipo') == 'ack_lote':
+        compacto = {
+            't': ACK_LOTE,
+            'id': mensaje.get('lote_id'),
+            's': mensaje.get('status'),
+            'e': mensaje.get('error'),
+            'r': [
+                [r['indice'], r.get('seq'), r['aceptada'], r.get('error'), r.get('reintentar', False)]
+                for r in mensaje.get('resultados') or []
+            ],
+        }
+    elif mensaje.get('type') == 'sensor_data':
+        compacto = {'t': SENSOR_DATA, 'l': _compactar_lectura(mensaje['data'])}
+    elif 'type' in mensaje or 'tipo' in mensaje:
+        compacto = {'t': OTRO, 'd': mensaje}
+    elif 'status' in mensaje and 'seq' in mensaje:
+        compacto = {'t': ACK, 's': mensaje['status'], 'q': mensaje['seq'], 'm': mensaje.get('mensaje')}
+    elif 'sector_id' in mensaje:
+        # Lectura suelta
+        compacto = {'t': LECTURA, 'l': _compactar_lectura(mensaje)}
+    else:
+        compacto = {'t': OTRO, 'd': mensaje}
+
+    # Los valores de las lecturas viajan como float32 (alcanza para los
+    # sensores); los mensajes genéricos conservan la precisión
+    return msgpack.packb(compacto, use_single_float=compacto['t'] != OTRO, default=_por_defecto)
+
+
+def decodificar(frame: bytes) -> Dict[str, Any]:
+    """
+    Frame MessagePack al mensaje de siempre. Las marcas de tiempo de las
+    lecturas quedan como datetime.
+
+    Raises:
+        ValueError: si el frame no es un mensaje válido
+    """
+    try:
+        compacto = msgpack.unpackb(frame, strict_map_key=False)
+        tipo = compacto['t']
+
+        if tipo == LOTE:
+            return {
+                'tipo': 'lote',
+                'lote_id': compacto.get('id'),
+                'lecturas': [_expandir_lectura(lectura) for lectura in compacto['l']],
+            }
+        if tipo == ACK_LOTE:
+            resultados: List[Dict[str, Any]] = []
+            for indice, seq, aceptada, error, reintentar in compacto['r']:
+                resultado = {'indice': indice, 'aceptada': aceptada}
+                if not aceptada:
+                    resultado.update(error=error, reintentar=reintentar)
+                if seq is not None:
+                    resultado['seq'] = seq
+                resultados.append(resultado)
+            aceptadas = sum(1 for r in resultados if r['aceptada'])
+            mensaje = {
+                'tipo': 'ack_lote',
+                'lote_id': compacto.get('id'),
+                'status': compacto.get('s'),
+                'aceptadas': aceptadas,
+                'rechazadas': len(resultados) - aceptadas,
+                'resultados': resultados,
+            }
+            if compacto.get('e'):
+                mensaje['error'] = compacto['e']
+            return mensaje
+        if tipo == SENSOR_DATA:
+            return {'type': 'sensor_data', 'data': _expandir_lectura(compacto['l'])}
+        if tipo == LECTURA:
+            return _expandir_lectura(compacto['l'])
+        if tipo == ACK:
+            return {'status': compacto['s'], 'seq': compacto['q'], 'mensaje': compacto.get('m')}
+        if tipo == OTRO and isinstance(compacto['d'], dict):
+            return compacto['d']
+    except (ValueError, TypeError, KeyError, msgpack.UnpackException) as e:
+        raise ValueError(f'Frame MessagePack inválido: {e}')
+
+    raise ValueError(f'Tipo de frame desconocido: {tipo}')
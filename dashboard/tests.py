@@ -1,3 +1,339 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.agregados import inicio_intervalo
+from dashboard.campos import Promedio
+from dashboard.compactacion import _adelgazar, compactar
+from dashboard.graficos import lttb
+from dashboard.ingesta import escribir_lecturas, normalizar_lectura
+from dashboard.models import Compactacion, HistorialTemperatura, Lectura, LecturaAgregada, Sector
+from dashboard.particiones import (
+    aplicar_retencion, asegurar_particiones, inicio_mes, nombre_particion, particionada,
+)
+from dashboard.protocolo import a_epoch_ms, codificar, decodificar, desde_epoch_ms
+
+INICIO = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def crear_sector(nombre='Sector de prueba'):
+    return Sector.objects.create(latitud=-41.5, longitud=-72.9, nombre_sector=nombre)
+
+
+class PromedioTests(TestCase):
+    """Promedio de un ValorEscalado en unidades reales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sector = crear_sector()
+        temperaturas = [21.37, 20.5, 19.99, None, 22.01]
+        Lectura.objects.bulk_create([
+            Lectura(sector=cls.sector, marca_tiempo=INICIO + timedelta(seconds=i), temperatura=t, ph=7.2)
+            for i, t in enumerate(temperaturas)
+        ])
+
+    def test_igual_a_suma_sobre_cantidad(self):
+        r = Lectura.objects.aggregate(
+            promedio=Promedio('temperatura'), suma=Sum('temperatura'), cantidad=Count('temperatura'),
+        )
+        self.assertAlmostEqual(r['promedio'], r['suma'] / r['cantidad'])
+        self.assertAlmostEqual(r['promedio'], 20.9675)
+
+    def test_avg_queda_escalado(self):
+        r = Lectura.objects.aggregate(avg=Avg('temperatura'), promedio=Promedio('temperatura'))
+        self.assertAlmostEqual(r['avg'], r['promedio'] * 100)
+
+    def test_con_filtro(self):
+        r = Lectura.objects.aggregate(
+            promedio=Promedio('temperatura', filter=Q(temperatura__gte=20.5)),
+            suma=Sum('temperatura', filter=Q(temperatura__gte=20.5)),
+            cantidad=Count('temperatura', filter=Q(temperatura__gte=20.5)),
+        )
+        self.assertEqual(r['cantidad'], 3)
+        self.assertAlmostEqual(r['promedio'], r['suma'] / r['cantidad'])
+
+    def test_sin_valores(self):
+        r = Lectura.objects.filter(temperatura__isnull=True).aggregate(promedio=Promedio('temperatura'))
+        self.assertIsNone(r['promedio'])
+
+
+@override_settings(SERIAL_INTERVALO=60)
+class CompactacionTests(TestCase):
+    """El borrado de la compactación se retoma y es idempotente"""
+
+    def setUp(self):
+        self.sector = crear_sector()
+        self.primer_dia = inicio_intervalo(timezone.now() - timedelta(days=40), '1d')
+
+    def crear_lecturas(self):
+        # Una por minuto con desfasaje irregular, durante tres días
+        Lectura.objects.bulk_create([
+            Lectura(
+                sector=self.sector,
+                marca_tiempo=self.primer_dia + timedelta(seconds=i * 60 + (i * 7) % 13),
+                temperatura=20 + i % 50 / 10,
+            )
+            for i in range(3 * 1440)
+        ])
+
+    def conservadas(self):
+        return list(Lectura.objects.order_by('marca_tiempo').values_list('marca_tiempo', flat=True))
+
+    def test_conserva_la_primera_de_cada_franja(self):
+        self.crear_lecturas()
+        compactar(dias=30, conservar_cada=5)
+
+        conservadas = self.conservadas()
+        self.assertEqual(len(conservadas), 3 * 1440 // 5)
+        franjas = [(inicio_intervalo(m, '1d'), (m - inicio_intervalo(m, '1d')) // timedelta(minutes=5))
+                   for m in conservadas]
+        self.assertEqual(len(set(franjas)), len(franjas))
+
+        # Volver a adelgazar lo ya adelgazado no borra nada
+        self.assertEqual(_adelgazar(self.primer_dia, self.primer_dia + timedelta(days=3), 5, 100, 0)[1], 0)
+
+    def test_retoma_el_borrado_cortado(self):
+        self.crear_lecturas()
+        with mock.patch('dashboard.compactacion.time.sleep', side_effect=[None] * 20 + [RuntimeError('corte')]):
+            with self.assertRaises(RuntimeError):
+                compactar(dias=30, conservar_cada=5, tamano_lote=100, pausa=1)
+
+        self.assertTrue(Compactacion.borrado_pendiente().exists())
+        compactar(dias=30, conservar_cada=5)
+        self.assertFalse(Compactacion.borrado_pendiente().exists())
+        cortada = self.conservadas()
+
+        # Mismo resultado que una pasada sin cortes
+        Lectura.objects.all().delete()
+        Compactacion.objects.all().delete()
+        self.crear_lecturas()
+        compactar(dias=30, conservar_cada=5)
+        self.assertEqual(cortada, self.conservadas())
+
+
+class IngestaTests(TestCase):
+    """escribir_lecturas es idempotente por (sector, marca_tiempo)"""
+
+    def setUp(self):
+        self.sector = crear_sector()
+        self.lote = [
+            normalizar_lectura({
+                'sector_id': self.sector.id,
+                'marca_tiempo': (INICIO + timedelta(seconds=5 * i, microseconds=123456)).isoformat(),
+                'temperatura': 20 + i / 10,
+                'ph': 7.1,
+            })
+            for i in range(30)
+        ]
+
+    def huella_agregados(self):
+        return list(
+            LecturaAgregada.objects.order_by('metrica', 'granularidad', 'inicio')
+            .values_list('metrica', 'granularidad', 'inicio', 'cantidad', 'suma')
+        )
+
+    def test_reenvio_no_agrega_filas(self):
+        self.assertEqual(escribir_lecturas(self.lote), [None] * 30)
+        agregados = self.huella_agregados()
+
+        self.assertEqual(escribir_lecturas(self.lote), [None] * 30)
+        self.assertEqual(Lectura.objects.count(), 30)
+        self.assertEqual(self.huella_agregados(), agregados)
+        self.assertEqual(
+            LecturaAgregada.objects.get(metrica='temperatura', granularidad='1d').cantidad, 30
+        )
+
+    def test_reenvio_en_msgpack(self):
+        # Llega primero en JSON (microsegundos en el ISO) y después en
+        # MessagePack (milisegundos): es la misma lectura
+        escribir_lecturas(self.lote)
+        frame = codificar({'tipo': 'lote', 'lote_id': 'x', 'lecturas': self.lote})
+        reenvio = [normalizar_lectura(lectura) for lectura in decodificar(frame)['lecturas']]
+
+        escribir_lecturas(reenvio)
+        self.assertEqual(Lectura.objects.count(), 30)
+
+    def test_duplicadas_dentro_del_lote(self):
+        escribir_lecturas(self.lote + self.lote[:10])
+        self.assertEqual(Lectura.objects.count(), 30)
+
+
+class ProtocoloTests(TestCase):
+    """codificar/decodificar conserva los mensajes"""
+
+    def test_lote_ida_y_vuelta(self):
+        marca_tiempo = datetime(2026, 3, 4, 5, 6, 7, 891000, tzinfo=dt_timezone.utc)
+        lote = {'tipo': 'lote', 'lote_id': 'abc123', 'lecturas': [
+            {'seq': 41, 'sector_id': 3, 'marca_tiempo': marca_tiempo.isoformat(),
+             'temperatura': 21.37, 'ph': 7.2, 'salinidad': None, 'oxigeno': 8.05,
+             'turbidez': 1234.56, 'humedad': 0.01},
+        ]}
+
+        mensaje = decodificar(codificar(lote))
+
+        self.assertEqual(mensaje['tipo'], 'lote')
+        self.assertEqual(mensaje['lote_id'], 'abc123')
+        lectura = mensaje['lecturas'][0]
+        self.assertEqual(lectura['seq'], 41)
+        self.assertEqual(lectura['sector_id'], 3)
+        self.assertEqual(lectura['marca_tiempo'], marca_tiempo)
+        for metrica in ('temperatura', 'ph', 'oxigeno', 'turbidez', 'humedad'):
+            self.assertEqual(lectura[metrica], lote['lecturas'][0][metrica])
+        self.assertIsNone(lectura['salinidad'])
+
+    def test_epoch_ms(self):
+        marca_tiempo = datetime(2026, 3, 4, 5, 6, 7, 891000, tzinfo=dt_timezone.utc)
+        self.assertEqual(a_epoch_ms(marca_tiempo), 1772600767891)
+        self.assertEqual(desde_epoch_ms(a_epoch_ms(marca_tiempo)), marca_tiempo)
+        self.assertEqual(a_epoch_ms('2026-03-04T05:06:07.891Z'), 1772600767891)
+
+    def test_ack_lote_ida_y_vuelta(self):
+        ack = {'tipo': 'ack_lote', 'lote_id': 'abc123', 'status': 'success', 'resultados': [
+            {'indice': 0, 'seq': 41, 'aceptada': True},
+            {'indice': 1, 'seq': 42, 'aceptada': False, 'error': 'Sector 9 no existe', 'reintentar': False},
+        ]}
+
+        mensaje = decodificar(codificar(ack))
+
+        self.assertEqual(mensaje['lote_id'], 'abc123')
+        self.assertEqual(mensaje['resultados'], ack['resultados'])
+
+
+class LttbTests(TestCase):
+    """lttb conserva los extremos y no pasa del umbral"""
+
+    def test_extremos_y_cantidad(self):
+        azar = np.random.default_rng(0)
+        x = np.cumsum(azar.uniform(1, 10, 5000))
+        y = np.column_stack([np.sin(x / 500), azar.normal(size=5000)])
+        y[100:300, 1] = np.nan
+
+        for umbral in (3, 10, 500, 4999):
+            indices = lttb(x, y, umbral)
+            self.assertLessEqual(len(indices), umbral)
+            self.assertEqual(indices[0], 0)
+            self.assertEqual(indices[-1], len(x) - 1)
+            self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_menos_puntos_que_el_umbral(self):
+        x = np.arange(20, dtype=np.float64)
+        y = x.reshape(-1, 1)
+        self.assertEqual(list(lttb(x, y, 50)), list(range(20)))
+
+
+class TablaLecturasTests(TestCase):
+    """El cursor de tabla_lecturas recorre cada fila una sola vez"""
+
+    def setUp(self):
+        self.sector = crear_sector()
+        self.client.force_login(User.objects.create_user('operador', password='x'))
+
+        lecturas = [
+            Lectura(sector=self.sector, marca_tiempo=INICIO + timedelta(seconds=7 * i),
+                    temperatura=20 + i / 100 if i % 5 else None, ph=7.0)
+            for i in range(103)
+        ]
+        # Sin ninguna columna de la tabla: no se muestra
+        lecturas.append(Lectura(sector=self.sector, marca_tiempo=INICIO + timedelta(hours=1), oxigeno=8.0))
+        Lectura.objects.bulk_create(lecturas)
+
+    def test_recorre_todo_una_vez(self):
+        url = reverse('tabla_lecturas', args=[self.sector.id])
+        parametros = {'fecha_inicio': '2026-01-01T00:00', 'fecha_fin': '2026-01-01T02:00', 'limite': 10}
+
+        vistas = []
+        paginas = 0
+        while True:
+            respuesta = self.client.get(url, parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            datos = respuesta.json()
+            vistas += [lectura['marca_tiempo'] for lectura in datos['lecturas']]
+            paginas += 1
+            if not datos['siguiente']:
+                break
+            parametros['cursor'] = datos['siguiente']
+
+        esperadas = [
+            timezone.localtime(m).isoformat() for m in
+            Lectura.objects.filter(ph__isnull=False).order_by('-marca_tiempo').values_list('marca_tiempo', flat=True)
+        ]
+        self.assertEqual(vistas, esperadas)
+        self.assertEqual(len(vistas), 103)
+        self.assertEqual(paginas, 11)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Particiones e índices propios de PostgreSQL')
+class PostgresTests(TestCase):
+    """dashboard_lectura después de las migraciones 0007 (particiones), 0009 y 0010"""
+
+    def setUp(self):
+        self.sector = crear_sector()
+        self.ahora = timezone.now().replace(microsecond=0)
+
+    def particion_de(self, lectura_id):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM dashboard_lectura WHERE id = %s", [lectura_id])
+            return cursor.fetchone()[0]
+
+    def test_particion_del_mes(self):
+        self.assertTrue(particionada())
+        lectura = Lectura.objects.create(sector=self.sector, marca_tiempo=self.ahora, temperatura=21.37)
+        self.assertEqual(self.particion_de(lectura.id), nombre_particion(inicio_mes(self.ahora)))
+
+    def test_id_de_la_secuencia(self):
+        primera = Lectura.objects.create(sector=self.sector, marca_tiempo=self.ahora, ph=7.1)
+        segunda = Lectura.objects.create(sector=self.sector, marca_tiempo=self.ahora + timedelta(seconds=5), ph=7.2)
+        self.assertGreater(segunda.id, primera.id)
+        self.assertEqual(Lectura.objects.get(id=segunda.id).ph, 7.2)
+
+    def test_bulk_create_ignora_repetidas(self):
+        Lectura.objects.create(sector=self.sector, marca_tiempo=self.ahora, temperatura=20.0)
+        Lectura.objects.bulk_create([
+            Lectura(sector=self.sector, marca_tiempo=self.ahora, temperatura=99.0),
+            Lectura(sector=self.sector, marca_tiempo=self.ahora + timedelta(seconds=5), temperatura=12.5),
+        ], ignore_conflicts=True)
+        self.assertEqual(
+            list(Lectura.objects.order_by('marca_tiempo').values_list('temperatura', flat=True)), [20.0, 12.5]
+        )
+
+    def test_vistas_historial(self):
+        Lectura.objects.bulk_create([
+            Lectura(sector=self.sector, marca_tiempo=self.ahora + timedelta(seconds=5 * i),
+                    temperatura=20 + i / 100 if i % 3 else None)
+            for i in range(30)
+        ])
+        self.assertEqual(
+            list(HistorialTemperatura.objects.order_by('marca_tiempo').values_list('id', 'valor')),
+            list(Lectura.objects.filter(temperatura__isnull=False).order_by('marca_tiempo')
+                 .values_list('id', 'temperatura')),
+        )
+
+    def test_indices(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'dashboard_lectura'")
+            indices = dict(cursor.fetchall())
+        self.assertIn('INCLUDE (temperatura, oxigeno, salinidad, ph, turbidez, humedad)', indices['unique_lectura'])
+        self.assertIn('USING brin (marca_tiempo)', indices['dashboard_lectura_marca_tiempo_brin'])
+        self.assertEqual(len(indices), 3)  # + la clave primaria (id, marca_tiempo)
+
+    def test_retencion(self):
+        vieja = Lectura.objects.create(sector=self.sector, marca_tiempo=self.ahora - timedelta(days=400), ph=7.0)
+        nueva = Lectura.objects.create(sector=self.sector, marca_tiempo=self.ahora, ph=7.0)
+        asegurar_particiones()
+        self.assertEqual(self.particion_de(vieja.id), nombre_particion(inicio_mes(vieja.marca_tiempo)))
+
+        # La FK es DEFERRABLE: dentro de la transacción del test sus
+        # chequeos siguen pendientes y no dejan hacer DROP de la partición
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        self.assertEqual(aplicar_retencion(meses=6)[0], 1)
+        self.assertEqual(list(Lectura.objects.values_list('id', flat=True)), [nueva.id])
+        registro = Compactacion.objects.get()
+        self.assertEqual(registro.hasta, registro.borrado_hasta)
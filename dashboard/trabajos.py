@@ -0,0 +1,236 @@
+"""
+Trabajos de exportación multi-sector en un pool de procesos.
+
+Una exportación de varios sectores (o de toda una zona) se parte por
+sector y ventana de tiempo (EXPORTACION_DIAS_POR_PARTE). Cada parte se
+escribe en un archivo desde un proceso del pool, así una exportación de
+toda la granja usa todos los núcleos y no ocupa a un worker web durante
+minutos. Al terminar se arma un .zip con un dataset particionado:
+
+    sector_id=3/20261001T000000.parquet
+    sector_id=3/20261008T000000.parquet
+    sector_id=7/...
+
+(pyarrow.dataset / pandas / DuckDB leen la carpeta descomprimida como una
+sola tabla con la columna sector_id.)
+
+Características:
+- ProcessPoolExecutor con contexto 'spawn' (no hereda threads ni
+  conexiones del proceso web); cada proceso hace django.setup() al iniciar
+- Un thread coordinador por trabajo: reparte las partes, actualiza el
+  progreso en ExportacionTrabajo y arma el .zip
+- Si una parte falla, el trabajo queda en 'error' con el mensaje; las
+  partes que ya estaban corriendo terminan antes de borrar la carpeta
+- Los .zip vencen a las EXPORTACION_EXPIRA_HORAS: cada trabajo nuevo borra
+  los archivos vencidos (la descarga responde 410)
+
+Uso:
+    from dashboard.trabajos import lanzar_exportacion
+
+    trabajo = ExportacionTrabajo.objects.create(formato='parquet', desde=..., hasta=...)
+    trabajo.sectores.set(sectores)
+    lanzar_exportacion(trabajo)
+    # Consultar trabajo.estado / trabajo.progreso
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from dashboard.exportacion import FORMATOS_COLUMNARES, escribir_columnar, escribir_csv, lecturas_a_exportar
+from dashboard.models import ExportacionTrabajo, Lectura
+
+logger = logging.getLogger(__name__)
+
+
+# formato -> extensión de cada parte
+EXTENSIONES = dict(
+    {formato: extension for formato, (extension, _) in FORMATOS_COLUMNARES.items()},
+    csv='.csv',
+)
+
+_ejecutor: Optional[ProcessPoolExecutor] = None
+_lock_ejecutor = threading.Lock()
+
+
+def ejecutor() -> ProcessPoolExecutor:
+    """Pool de procesos compartido (se crea la primera vez que se usa)"""
+    global _ejecutor
+    with _lock_ejecutor:
+        if _ejecutor is None:
+            # El initializer se carga antes de django.setup(), así que no
+            # puede vivir en este módulo (importa modelos). Los procesos
+            # heredan DJANGO_SETTINGS_MODULE del entorno (manage.py / asgi.py)
+            _ejecutor = ProcessPoolExecutor(
+                max_workers=settings.EXPORTACION_PROCESOS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _ejecutor
+
+
+def dividir_en_partes(sector_ids: List[int], desde: datetime, hasta: datetime,
+                      dias: int = None) -> List[Tuple[int, datetime, datetime]]:
+    """
+    (sector_id, desde, hasta) de cada parte: ventanas consecutivas de `dias`
+    días por sector, recortadas al tramo en que el sector tiene lecturas
+    (un rango de años no genera miles de partes vacías). Los extremos son
+    inclusivos, así que cada ventana termina 1 µs antes de la siguiente
+    (la resolución de marca_tiempo)
+    """
+    ventana = timedelta(days=dias or settings.EXPORTACION_DIAS_POR_PARTE)
+
+    extremos = (
+        Lectura.objects.filter(sector_id__in=sector_ids, marca_tiempo__gte=desde, marca_tiempo__lte=hasta)
+        .values('sector_id')
+        .annotate(primera=Min('marca_tiempo'), ultima=Max('marca_tiempo'))
+    )
+
+    partes = []
+    for fila in sorted(extremos, key=lambda fila: fila['sector_id']):
+        inicio = fila['primera']
+        while inicio <= fila['ultima']:
+            fin = min(inicio + ventana - timedelta(microseconds=1), hasta)
+            partes.append((fila['sector_id'], inicio, fin))
+            inicio += ventana
+    return partes
+
+
+def exportar_parte(sector_id: int, desde: datetime, hasta: datetime, formato: str, ruta: str) -> int:
+    """
+    Escribir una parte (corre en un proceso del pool).
+
+    Returns:
+        int: Lecturas escritas (las partes vacías no dejan archivo)
+    """
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    try:
+        with open(ruta, 'wb') as archivo:
+            if formato == 'csv':
+                filas = escribir_csv(archivo, lecturas_a_exportar(sector_id, desde, hasta))
+            else:
+                filas = escribir_columnar(archivo, formato, sector_id, desde, hasta)
+    finally:
+        close_old_connections()
+
+    if not filas:
+        os.remove(ruta)
+    return filas
+
+
+def _armar_zip(carpeta: str, ruta_zip: str, formato: str):
+    # Parquet/Arrow/npz ya vienen comprimidos
+    compresion = zipfile.ZIP_DEFLATED if formato == 'csv' else zipfile.ZIP_STORED
+
+    with zipfile.ZipFile(ruta_zip, 'w', compression=compresion, allowZip64=True) as zip_:
+        for raiz, _, archivos in sorted(os.walk(carpeta)):
+            for nombre in sorted(archivos):
+                ruta = os.path.join(raiz, nombre)
+                zip_.write(ruta, os.path.relpath(ruta, carpeta))
+
+
+def _coordinar(trabajo_id: int):
+    """Thread coordinador: reparte las partes en el pool y arma el resultado"""
+    carpeta = os.path.join(settings.EXPORTACION_DIR, f'trabajo_{trabajo_id}')
+    ruta_zip = os.path.join(settings.EXPORTACION_DIR, f'exportacion_{trabajo_id}.zip')
+    trabajos = ExportacionTrabajo.objects.filter(id=trabajo_id)
+
+    try:
+        trabajo = trabajos.get()
+        sector_ids = sorted(trabajo.sectores.values_list('id', flat=True))
+        partes = dividir_en_partes(sector_ids, trabajo.desde, trabajo.hasta)
+        extension = EXTENSIONES[trabajo.formato]
+
+        trabajos.update(estado='en_proceso', partes_totales=len(partes))
+        logger.info(f"📦 Exportación {trabajo_id}: {len(sector_ids)} sectores, {len(partes)} partes")
+
+        futuros = [
+            ejecutor().submit(
+                exportar_parte, sector_id, desde, hasta, trabajo.formato,
+                os.path.join(carpeta, f'sector_id={sector_id}', f'{desde:%Y%m%dT%H%M%S}{extension}'),
+            )
+            for sector_id, desde, hasta in partes
+        ]
+
+        try:
+            for futuro in as_completed(futuros):
+                filas = futuro.result()
+                trabajos.update(
+                    partes_completadas=F('partes_completadas') + 1,
+                    lecturas=F('lecturas') + filas,
+                )
+        except Exception:
+            for futuro in futuros:
+                futuro.cancel()
+            # Las partes que ya corren no se pueden cancelar: esperar a que
+            # terminen antes de borrar la carpeta en la que escriben
+            wait(futuros)
+            raise
+
+        os.makedirs(settings.EXPORTACION_DIR, exist_ok=True)
+        # Sin lecturas en el rango no queda ninguna parte: el zip sale vacío
+        _armar_zip(carpeta, ruta_zip, trabajo.formato)
+
+        trabajos.update(estado='completado', archivo=ruta_zip, terminado=timezone.now())
+        logger.info(f"✅ Exportación {trabajo_id} lista: {ruta_zip}")
+
+    except Exception as e:
+        logger.exception(f"❌ Error en exportación {trabajo_id}: {e}")
+        if os.path.exists(ruta_zip):
+            os.remove(ruta_zip)  # Zip a medio armar
+        trabajos.update(estado='error', error=str(e) or e.__class__.__name__, terminado=timezone.now())
+
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        connection.close()
+
+
+def limpiar_vencidas() -> int:
+    """
+    Borrar los .zip de los trabajos terminados hace más de
+    EXPORTACION_EXPIRA_HORAS (el registro del trabajo queda).
+
+    Returns:
+        int: Archivos borrados
+    """
+    limite = timezone.now() - timedelta(hours=settings.EXPORTACION_EXPIRA_HORAS)
+    vencidos = ExportacionTrabajo.objects.filter(terminado__lt=limite).exclude(archivo='')
+
+    borrados = 0
+    for trabajo_id, archivo in vencidos.values_list('id', 'archivo'):
+        try:
+            os.remove(archivo)
+            borrados += 1
+        except FileNotFoundError:
+            pass
+        ExportacionTrabajo.objects.filter(id=trabajo_id).update(archivo='')
+
+    if borrados:
+        logger.info(f"🗑️ {borrados} exportaciones vencidas borradas")
+    return borrados
+
+
+def lanzar_exportacion(trabajo: ExportacionTrabajo) -> threading.Thread:
+    """Empezar el trabajo en segundo plano (vuelve enseguida)"""
+    limpiar_vencidas()
+    hilo = threading.Thread(
+        target=_coordinar,
+        args=(trabajo.id,),
+        name=f'exportacion-{trabajo.id}',
+        daemon=True,
+    )
+    hilo.start()
+    return hilo
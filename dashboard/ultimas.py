@@ -0,0 +1,183 @@
+"""
+Último valor de cada sector (snapshot para home y las cards de sector_detail).
+
+UltimaLectura guarda una fila por sector con el último valor conocido de
+cada métrica. escribir_lecturas la actualiza en la misma transacción que
+inserta las Lectura, así leer el estado actual de todos los sectores es
+una sola consulta a una tabla chica (o ninguna, si está en la cache) en
+lugar de un `ORDER BY marca_tiempo DESC LIMIT 1` por sector y métrica.
+
+Características:
+- Un solo UPSERT por lote (bulk_create con update_conflicts)
+- Lecturas atrasadas (reenvíos del outbox) no pisan valores más nuevos;
+  solo completan métricas que el snapshot todavía no tiene
+- Cache de Django (Redis en CLOUD, memoria en LOCAL) con una entrada por
+  sector; la ingesta la invalida cuando la transacción se confirma
+- reconstruir() recalcula el snapshot desde Lectura (lo corre también el
+  comando `recalcular_agregados`)
+
+Uso:
+    from dashboard.ultimas import ultimas_lecturas
+
+    ultimas = ultimas_lecturas([1, 2, 3])
+    # {1: {'marca_tiempo': datetime, 'temperatura': 18.5, ...}, 2: None, ...}
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from dashboard.models import Lectura, UltimaLectura
+
+logger = logging.getLogger(__name__)
+
+
+CAMPOS = ('marca_tiempo',) + Lectura.METRICAS
+
+
+def _clave(sector_id: int) -> str:
+    return f'ultima_lectura:{sector_id}'
+
+
+def _resumir(filas: Iterable[Lectura]) -> Dict[int, Dict[str, Any]]:
+    """
+    Por sector: marca_tiempo más reciente y, por métrica, (marca_tiempo,
+    valor) de su último valor no nulo dentro del lote
+    """
+    resumen: Dict[int, Dict[str, Any]] = {}
+
+    for fila in filas:
+        sector = resumen.setdefault(fila.sector_id, {'marca_tiempo': fila.marca_tiempo})
+        if fila.marca_tiempo > sector['marca_tiempo']:
+            sector['marca_tiempo'] = fila.marca_tiempo
+
+        for metrica in Lectura.METRICAS:
+            valor = getattr(fila, metrica)
+            if valor is None:
+                continue
+            anterior = sector.get(metrica)
+            if anterior is None or fila.marca_tiempo >= anterior[0]:
+                sector[metrica] = (fila.marca_tiempo, float(valor))
+
+    return resumen
+
+
+def actualizar(filas: List[Lectura]):
+    """
+    Combinar un lote de Lectura recién insertadas con el snapshot.
+    Llamar dentro de la transacción que las inserta.
+    """
+    resumen = _resumir(filas)
+    if not resumen:
+        return
+
+    # select_for_update serializa los flushes concurrentes del mismo sector
+    # en PostgreSQL (en SQLite la escritura ya es exclusiva)
+    existentes = UltimaLectura.objects.select_for_update().in_bulk(list(resumen))
+
+    snapshots = []
+    for sector_id, lote in resumen.items():
+        snapshot = existentes.get(sector_id) or UltimaLectura(
+            sector_id=sector_id, marca_tiempo=lote['marca_tiempo']
+        )
+        mas_nuevo = lote['marca_tiempo'] >= snapshot.marca_tiempo
+
+        for metrica in Lectura.METRICAS:
+            if metrica not in lote:
+                continue
+            marca_tiempo, valor = lote[metrica]
+            # Una lectura atrasada solo completa métricas que faltan
+            if marca_tiempo >= snapshot.marca_tiempo or getattr(snapshot, metrica) is None:
+                setattr(snapshot, metrica, valor)
+
+        if mas_nuevo:
+            snapshot.marca_tiempo = lote['marca_tiempo']
+        snapshots.append(snapshot)
+
+    UltimaLectura.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['sector'],
+        update_fields=list(CAMPOS),
+    )
+
+    claves = [_clave(sector_id) for sector_id in resumen]
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def ultimas_lecturas(sector_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Último valor de cada sector.
+
+    Returns:
+        dict: sector_id -> {'marca_tiempo': datetime, '<metrica>': float|None, ...},
+        o None si el sector todavía no tiene lecturas
+    """
+    sector_ids = list(sector_ids)
+    claves = {_clave(sector_id): sector_id for sector_id in sector_ids}
+
+    en_cache = cache.get_many(list(claves))
+    ultimas = {claves[clave]: valor for clave, valor in en_cache.items()}
+
+    faltantes = [sector_id for sector_id in sector_ids if sector_id not in ultimas]
+    if faltantes:
+        leidas = {
+            fila['sector_id']: {campo: fila[campo] for campo in CAMPOS}
+            for fila in UltimaLectura.objects.filter(sector_id__in=faltantes).values('sector_id', *CAMPOS)
+        }
+        # Los sectores sin lecturas también se cachean (como {}) para no
+        # volver a consultarlos en cada request
+        nuevas = {sector_id: leidas.get(sector_id, {}) for sector_id in faltantes}
+        cache.set_many(
+            {_clave(sector_id): valor for sector_id, valor in nuevas.items()},
+            timeout=settings.ULTIMA_LECTURA_CACHE_TTL,
+        )
+        ultimas.update(nuevas)
+
+    return {sector_id: ultimas[sector_id] or None for sector_id in sector_ids}
+
+
+def reconstruir(sector_id: Optional[int] = None) -> int:
+    """
+    Recalcular el snapshot desde Lectura (todos los sectores o uno).
+
+    Returns:
+        int: Sectores con snapshot
+    """
+    lecturas = Lectura.objects.all()
+    if sector_id is not None:
+        lecturas = lecturas.filter(sector_id=sector_id)
+
+    sector_ids = list(lecturas.values_list('sector_id', flat=True).distinct().order_by())
+
+    snapshots = []
+    for id_ in sector_ids:
+        del_sector = lecturas.filter(sector_id=id_)
+        snapshot = UltimaLectura(
+            sector_id=id_,
+            marca_tiempo=del_sector.order_by('-marca_tiempo').values_list('marca_tiempo', flat=True)[0],
+        )
+        # Índice (sector, -marca_tiempo): cada métrica es un recorrido corto
+        # desde la lectura más nueva hasta la primera con valor
+        for metrica in Lectura.METRICAS:
+            valor = (
+                del_sector.filter(**{f'{metrica}__isnull': False})
+                .order_by('-marca_tiempo').values_list(metrica, flat=True).first()
+            )
+            setattr(snapshot, metrica, float(valor) if valor is not None else None)
+        snapshots.append(snapshot)
+
+    with transaction.atomic():
+        existentes = UltimaLectura.objects.all()
+        if sector_id is not None:
+            existentes = existentes.filter(sector_id=sector_id)
+        invalidar = set(sector_ids) | set(existentes.values_list('sector_id', flat=True))
+        existentes.delete()
+        UltimaLectura.objects.bulk_create(snapshots)
+
+    cache.delete_many([_clave(id_) for id_ in invalidar])
+    logger.info(f"📌 Últimas lecturas reconstruidas: {len(snapshots)} sectores")
+    return len(snapshots)
@@ -9,6 +9,8 @@ urlpatterns = [
     path('home/', views.home, name='home'),
     path('sector/<int:id>/', views.sector_detail, name='sector_detail'),
     path('sector/nuevo/', views.sector_create, name='sector_create'),
+    path('sector/<int:sector_id>/grafico/', views.datos_grafico, name='datos_grafico'),
+    path('sector/<int:sector_id>/lecturas/', views.tabla_lecturas, name='tabla_lecturas'),
     
     # Endpoints de sensores (LOCAL)
     # path('stream-sensores/', views.stream_sensores, name='stream_sensores'),
@@ -17,8 +19,14 @@ urlpatterns = [
     path('detener-sensores/', views.detener_sensores, name='detener_sensores'),
     path('iniciar-grabacion/', views.iniciar_grabacion, name='iniciar_grabacion'),
     path('detener-grabacion/', views.detener_grabacion, name='detener_grabacion'),
+    path('estado-uplink/', views.estado_uplink, name='estado_uplink'),
+    path('estado-serial/', views.estado_serial, name='estado_serial'),
     
     # Exportar a csv
     path('exportar-csv/<int:sector_id>/', views.exportar_csv, name='exportar_csv'),
+    path('exportar/<int:sector_id>/', views.exportar_columnar, name='exportar_columnar'),
+    path('exportaciones/', views.crear_exportacion, name='crear_exportacion'),
+    path('exportaciones/<int:trabajo_id>/', views.estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/<int:trabajo_id>/descargar/', views.descargar_exportacion, name='descargar_exportacion'),
 ]
 
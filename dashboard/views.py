@@ -1,59 +1,68 @@
 import os
 import json
+import tempfile
 import re
-import serial
-import time
 import requests
-import asyncio
 from django.utils import timezone
+from django.db.models import Q
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from django.shortcuts import render, redirect
-from dashboard.models import Sector, Zona
+from django.urls import reverse
+from dashboard.models import Sector, Zona, Lectura, ExportacionTrabajo
+from dashboard.ingesta import normalizar_lectura, escribir_lecturas
+from dashboard.outbox import outbox_local, construir_payload
+from dashboard.adquisicion import gestor_serial
+from dashboard.graficos import serie_grafico
+from dashboard.ultimas import ultimas_lecturas
+from dashboard.exportacion import (
+    alguna_columna, lecturas_a_exportar, csv_streaming, gzip_streaming,
+    FORMATOS_COLUMNARES, escribir_columnar, formato_por_defecto, formatos_disponibles, archivo_streaming,
+)
+from dashboard.trabajos import lanzar_exportacion
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from datetime import datetime, timedelta
 from django.core.files.storage import FileSystemStorage
-from django.http import HttpResponse
-import csv
+from django.http import StreamingHttpResponse
 
 # Importar cliente WebSocket solo en LOCAL
 try:
     if settings.IS_LOCAL:
-        from dashboard.ws_client import sensor_ws_client, enviar_a_nube_ws_sync
+        from dashboard.ws_client import sensor_ws_client, enviar_a_nube_ws_sync, uplink_worker
     else:
         sensor_ws_client = None
         enviar_a_nube_ws_sync = None
+        uplink_worker = None
 except (ImportError, AttributeError):
     sensor_ws_client = None
     enviar_a_nube_ws_sync = None
+    uplink_worker = None
 
 # Importar cliente WebSocket solo en LOCAL
 if settings.IS_LOCAL:
     try:
-        from dashboard.ws_client import sensor_ws_client, enviar_a_nube_ws_sync
+        from dashboard.ws_client import sensor_ws_client, enviar_a_nube_ws_sync, uplink_worker
     except ImportError:
         print("⚠️ ws_client no disponible")
         sensor_ws_client = None
         enviar_a_nube_ws_sync = None
+        uplink_worker = None
 
-# Configuración serial
-SERIAL_PORT = '/dev/ttyACM0'  # Ajustar: Windows=COM3, Linux=/dev/ttyACM0
-# SERIAL_PORT = 'COM3'  # Ajustar: Windows=COM3, Linux=/dev/ttyACM0
-BAUD_RATE = 9600
-TIMEOUT = 3
-
-# Variables globales
-lectura_activa = False
-grabacion_activa = False
-conexion_serial = None
+# Configuración serial: ver SERIAL_* en settings (los puertos los maneja gestor_serial)
 
 
 @login_required
 def home(request):
-    sectores = Sector.objects.all()
+    sectores = list(Sector.objects.all())
+    
+    # Valor actual de cada sector (una sola lectura del snapshot)
+    ultimas = ultimas_lecturas([sector.id for sector in sectores])
+    for sector in sectores:
+        sector.ultima = ultimas[sector.id]
+    
     context = {
         'sectores': sectores,
     }
@@ -67,90 +76,46 @@ def home(request):
     
     return render(request, 'dashboard/home.html', context)
 
+def rango_fechas(request, horas=24):
+    """
+    Rango de fechas de los filtros (?fecha_inicio=...&fecha_fin=..., formato
+    de <input type="datetime-local">; en un POST se leen del formulario).
+    Por defecto las últimas `horas` horas.
+    """
+    datos = request.POST if request.method == 'POST' else request.GET
+    fecha_inicio = datos.get('fecha_inicio')
+    fecha_fin = datos.get('fecha_fin')
+    
+    if not fecha_inicio or not fecha_fin:
+        fecha_fin = timezone.now()
+        fecha_inicio = fecha_fin - timedelta(hours=horas)
+    else:
+        fecha_inicio = timezone.make_aware(datetime.strptime(fecha_inicio, '%Y-%m-%dT%H:%M'))
+        fecha_fin = timezone.make_aware(datetime.strptime(fecha_fin, '%Y-%m-%dT%H:%M'))
+    
+    return fecha_inicio, fecha_fin
+
 @login_required
 def sector_detail(request, id):
     """
     Vista de detalle del sector.
     """
     # ✅ AGREGAR ESTO AL INICIO
-    if settings.IS_LOCAL:
-        global lectura_activa
-        if not lectura_activa:
-            if conectar_arduino():
-                lectura_activa = True
-                print("✅ Arduino conectado automáticamente")
+    if settings.IS_LOCAL and not gestor_serial.activo:
+        if gestor_serial.iniciar():
+            print("✅ Arduino conectado automáticamente")
     
     sector = Sector.objects.prefetch_related('zonas').get(id=id)
     
     # Parámetros de filtro de fecha
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
+    fecha_inicio, fecha_fin = rango_fechas(request)
     
-    if not fecha_inicio or not fecha_fin:
-        fecha_fin = timezone.now()
-        fecha_inicio = fecha_fin - timedelta(hours=24)
-    else:
-        fecha_inicio = timezone.make_aware(datetime.strptime(fecha_inicio, '%Y-%m-%dT%H:%M'))
-        fecha_fin = timezone.make_aware(datetime.strptime(fecha_fin, '%Y-%m-%dT%H:%M'))
+    # La tabla de lecturas se pagina aparte desde tabla_lecturas
+
+    # Valores actuales (cards): snapshot que mantiene la ingesta
+    ultima = ultimas_lecturas([sector.id])[sector.id]
     
-    # Todas las lecturas para la tabla
-    temperaturas = sector.temperaturas.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    ).order_by('-marca_tiempo')
-    ph_registros = sector.ph_registros.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    ).order_by('-marca_tiempo')
-    turbideces = sector.turbideces.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    ).order_by('-marca_tiempo')
-    humedades = sector.humedades.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    ).order_by('-marca_tiempo')
-    
-    # Diccionarios por marca de tiempo
-    ph_dict = {r.marca_tiempo: r for r in ph_registros}
-    turb_dict = {r.marca_tiempo: r for r in turbideces}
-    hum_dict = {r.marca_tiempo: r for r in humedades}
-    
-    # Lecturas combinadas para la tabla
-    lecturas_combinadas = []
-    for temp in temperaturas:
-        lecturas_combinadas.append({
-            'marca_tiempo': temp.marca_tiempo,
-            'temperatura': temp,
-            'ph': ph_dict.get(temp.marca_tiempo),
-            'turbidez': turb_dict.get(temp.marca_tiempo),
-            'humedad': hum_dict.get(temp.marca_tiempo),
-        })
-
-    # Últimos valores (cards)
-    ultima_temperatura = temperaturas.first()
-    ultima_salinidad = sector.salinidades.order_by('-marca_tiempo').first()
-    ultima_ph = ph_registros.first()
-    ultima_turbidez = turbideces.first()
-    ultima_humedad = humedades.first()
-    
-    # Últimos 20 registros para la chart - CONVERTIR A FLOAT
-    MAX_POINTS = 20
-    ultimas_temp = list(temperaturas[:MAX_POINTS])[::-1]
-    ultimos_ph = list(ph_registros[:MAX_POINTS])[::-1]
-    ultimas_turb = list(turbideces[:MAX_POINTS])[::-1]
-    ultimas_hum = list(humedades[:MAX_POINTS])[::-1]
-    
-    chart_data = []
-    for i in range(MAX_POINTS):
-        temp_val = float(ultimas_temp[i].valor) if i < len(ultimas_temp) else 0
-        ph_val = float(ultimos_ph[i].valor) if i < len(ultimos_ph) else 7
-        turb_val = float(ultimas_turb[i].valor) if i < len(ultimas_turb) else 0
-        hum_val = float(ultimas_hum[i].valor) if i < len(ultimas_hum) else 0
-        
-        chart_data.append({
-            'marca_tiempo': ultimas_temp[i].marca_tiempo.strftime('%H:%M:%S') if i < len(ultimas_temp) else '',
-            'temperatura': temp_val,
-            'ph': ph_val,
-            'turbidez': turb_val,
-            'humedad': hum_val,
-        })
+    # La chart se carga aparte desde datos_grafico (reducida con LTTB)
     
     # Imágenes
     carpeta = os.path.join(settings.MEDIA_ROOT, 'sectores')
@@ -168,19 +133,121 @@ def sector_detail(request, id):
         'imagenes': imagenes,
         'MEDIA_URL': settings.MEDIA_URL,
         'siguiente_num': siguiente_num,
-        'ultima_temperatura': ultima_temperatura,
-        'ultima_salinidad': ultima_salinidad,
-        'ultima_ph': ultima_ph,
-        'ultima_turbidez': ultima_turbidez,
-        'ultima_humedad': ultima_humedad,
-        'lecturas_combinadas': lecturas_combinadas,
-        'chart_data_json': chart_data,
+        'ultima': ultima,
+        'grafico_puntos': settings.GRAFICO_PUNTOS,
         'fecha_inicio': fecha_inicio.strftime('%Y-%m-%dT%H:%M'),
         'fecha_fin': fecha_fin.strftime('%Y-%m-%dT%H:%M'),
     }
     return render(request, 'dashboard/sector_detail.html', context)
 
 
+@login_required
+@require_http_methods(["GET"])
+def datos_grafico(request, sector_id):
+    """
+    Serie de la chart de sector_detail para el rango de fechas.
+    
+    GET params: fecha_inicio, fecha_fin (como sector_detail), puntos (opcional)
+    Usa lecturas crudas o agregados según el rango y reduce con LTTB.
+    """
+    try:
+        fecha_inicio, fecha_fin = rango_fechas(request)
+        puntos = int(request.GET.get('puntos', settings.GRAFICO_PUNTOS))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if fecha_inicio >= fecha_fin:
+        return JsonResponse({'error': 'fecha_inicio debe ser anterior a fecha_fin'}, status=400)
+    
+    if not Sector.objects.filter(id=sector_id).exists():
+        return JsonResponse({'error': f'Sector {sector_id} no existe'}, status=404)
+    
+    serie = serie_grafico(sector_id, fecha_inicio, fecha_fin, puntos=puntos)
+    return JsonResponse(serie)
+
+
+# Tope de filas por página que puede pedir el cliente
+TABLA_PAGINA_MAXIMA = 500
+
+# Columnas de la tabla de sector_detail (las mismas que el CSV)
+COLUMNAS_TABLA = ('temperatura', 'ph', 'turbidez', 'humedad')
+
+
+def _parsear_cursor(cursor):
+    """'<marca_tiempo ISO>,<id>' -> (datetime, id)"""
+    marca_tiempo, id_ = cursor.rsplit(',', 1)
+    return datetime.fromisoformat(marca_tiempo), int(id_)
+
+
+@login_required
+@require_http_methods(["GET"])
+async def tabla_lecturas(request, sector_id):
+    """
+    Página de la tabla de lecturas de sector_detail (JSON, más recientes primero).
+    
+    GET params: fecha_inicio, fecha_fin (como sector_detail), limite (opcional),
+    cursor (el 'siguiente' de la página anterior).
+    
+    Paginación por keyset sobre (marca_tiempo, id): cada página es un rango
+    del índice (sector, marca_tiempo), sin OFFSET ni COUNT, así que cuesta
+    lo mismo sin importar el largo del rango ni la página.
+    
+    Muestra las mismas filas que el CSV del mismo rango: las lecturas con
+    al menos una de las columnas de la tabla, aunque no tengan temperatura.
+    """
+    try:
+        fecha_inicio, fecha_fin = rango_fechas(request)
+        limite = min(int(request.GET.get('limite', settings.TABLA_TAMANO_PAGINA)), TABLA_PAGINA_MAXIMA)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            cursor_marca_tiempo, cursor_id = _parsear_cursor(cursor)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if limite < 1:
+        return JsonResponse({'error': 'limite debe ser mayor que 0'}, status=400)
+    
+    if not await Sector.objects.filter(id=sector_id).aexists():
+        return JsonResponse({'error': f'Sector {sector_id} no existe'}, status=404)
+    
+    lecturas = Lectura.objects.filter(
+        alguna_columna(COLUMNAS_TABLA),
+        sector_id=sector_id,
+        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin,
+    )
+    if cursor:
+        lecturas = lecturas.filter(
+            Q(marca_tiempo__lt=cursor_marca_tiempo) |
+            Q(marca_tiempo=cursor_marca_tiempo, id__lt=cursor_id)
+        )
+    
+    # Una fila de más para saber si hay otra página
+    filas = [
+        fila async for fila in lecturas.order_by('-marca_tiempo', '-id').values_list(
+            'id', 'marca_tiempo', *COLUMNAS_TABLA
+        )[:limite + 1]
+    ]
+    
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = f"{filas[-1][1].isoformat()},{filas[-1][0]}"
+    
+    return JsonResponse({
+        'lecturas': [
+            {
+                'marca_tiempo': timezone.localtime(marca_tiempo).isoformat(),
+                **{
+                    columna: float(valor) if valor is not None else None
+                    for columna, valor in zip(COLUMNAS_TABLA, valores)
+                },
+            }
+            for _, marca_tiempo, *valores in filas
+        ],
+        'siguiente': siguiente,
+    })
+
+
 @login_required
 def sector_create(request):
     """
@@ -378,70 +445,25 @@ def borrar_imagen_sector(request):
 
     return JsonResponse({'ok': False})
 
-def conectar_arduino():
-    global conexion_serial
-    try:
-        if conexion_serial is None or not conexion_serial.is_open:
-            conexion_serial = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=TIMEOUT)
-            time.sleep(2)
-        return True
-    except serial.SerialException as e:
-        print(f"Error conectando Arduino: {e}")
-        return False
-
-def leer_datos_arduino():
-    global conexion_serial
-    
-    if conexion_serial is None or not conexion_serial.is_open:
-        if not conectar_arduino():
-            return None
-    
-    try:
-        conexion_serial.reset_input_buffer()
-        conexion_serial.write(b'R')
-        linea = conexion_serial.readline().decode('utf-8').strip()
-        
-        if linea:
-            datos = json.loads(linea)
-            return datos
-    except Exception as e:
-        print(f"Error leyendo datos: {e}")
-        return None
-    
-    return None
-
-
 @csrf_exempt
 @require_http_methods(["POST"])
 def iniciar_sensores(request):
-    global lectura_activa
-    
-    if not conectar_arduino():
+    # Un thread de adquisición por Arduino abre su puerto y muestrea en segundo plano
+    activos = gestor_serial.iniciar()
+    if not activos:
         return JsonResponse({'error': 'No se pudo conectar con Arduino'}, status=500)
     
-    lectura_activa = True
-    print(f"✅ Sensores iniciados - lectura_activa = {lectura_activa}")
+    print(f"✅ Sensores iniciados - {activos} puerto(s), muestreo cada {settings.SERIAL_INTERVALO}s")
     
-    return JsonResponse({'status': 'sensores_iniciados'})
+    return JsonResponse({'status': 'sensores_iniciados', 'puertos_activos': activos})
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def detener_sensores(request):
-    global lectura_activa, grabacion_activa, conexion_serial
-    
-    lectura_activa = False
-    grabacion_activa = False
-    
     print("🛑 Deteniendo sensores...")
     
-    # Cerrar serial primero
-    if conexion_serial and conexion_serial.is_open:
-        try:
-            conexion_serial.close()
-            conexion_serial = None
-            print("✅ Serial cerrado")
-        except Exception as e:
-            print(f"⚠️ Error cerrando serial: {e}")
+    # Detener los threads de adquisición (cierran el serial y la grabación)
+    gestor_serial.detener()
     
     # NO cerrar WebSocket aquí (está causando el crash)
     # El WebSocket se cierra automáticamente cuando detener_grabacion()
@@ -451,137 +473,137 @@ def detener_sensores(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def iniciar_grabacion(request):
-    """Inicia guardado en DB y envío al cloud"""
-    global grabacion_activa
+    """Inicia guardado en DB y envío al cloud de cada muestra del sector"""
+    sector_id = request.POST.get('sector_id')
+    if not sector_id or not Sector.objects.filter(id=sector_id).exists():
+        return JsonResponse({'error': 'Sector inválido'}, status=400)
+    
+    dispositivo = gestor_serial.para_sector(sector_id)
+    if dispositivo is None:
+        return JsonResponse({'error': 'No hay un Arduino asignado a este sector'}, status=400)
     
-    if not lectura_activa:
+    if not dispositivo.activo:
         return JsonResponse({'error': 'Debes iniciar los sensores primero'}, status=400)
     
-    grabacion_activa = True
+    dispositivo.sector_grabacion = int(sector_id)
     
-    # Conectar WebSocket
-    if settings.IS_LOCAL and enviar_a_nube_ws_sync:
-        try:
-            import threading
-            def start_ws():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(sensor_ws_client.connect())
-            
-            ws_thread = threading.Thread(target=start_ws, daemon=True)
-            ws_thread.start()
-            ws_thread.join(timeout=5)
-        except Exception as e:
-            print(f"⚠️ Error WebSocket: {e}")
+    # Arrancar el uplink (conecta el WebSocket en su propio thread)
+    if settings.IS_LOCAL and uplink_worker:
+        uplink_worker.iniciar()
     
-    return JsonResponse({'status': 'grabacion_iniciada'})
+    return JsonResponse({'status': 'grabacion_iniciada', 'puerto': dispositivo.puerto})
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def detener_grabacion(request):
-    """Detiene guardado pero mantiene lectura"""
-    global grabacion_activa
-    grabacion_activa = False
+    """Detiene guardado pero mantiene lectura (del sector, o de todos si no se indica)"""
+    sector_id = request.POST.get('sector_id')
     
-    # Cerrar WebSocket
-    if settings.IS_LOCAL and sensor_ws_client and sensor_ws_client.connected:
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(sensor_ws_client.disconnect())
-            loop.close()
-        except Exception as e:
-            print(f"⚠️ Error: {e}")
+    for dispositivo in gestor_serial.dispositivos.values():
+        if not sector_id or str(dispositivo.sector_grabacion) == sector_id:
+            dispositivo.sector_grabacion = None
+    
+    # El WebSocket queda abierto: es del uplink worker, que todavía puede
+    # tener lecturas pendientes en el outbox
     
     return JsonResponse({'status': 'grabacion_detenida'})
 
 
+@require_http_methods(["GET"])
+def estado_uplink(request):
+    """Estado del envío al cloud: profundidad de la cola y latencia"""
+    if not (settings.IS_LOCAL and uplink_worker):
+        return JsonResponse({'error': 'Solo en local'}, status=400)
+    
+    return JsonResponse(uplink_worker.estadisticas())
+
+
+@require_http_methods(["GET"])
+def estado_serial(request):
+    """Salud y frecuencia de muestreo de cada Arduino"""
+    if not settings.IS_LOCAL:
+        return JsonResponse({'error': 'Solo en local'}, status=400)
+    
+    return JsonResponse({'dispositivos': gestor_serial.estadisticas()})
+
+
 # Nueva vista
 @csrf_exempt
 @require_http_methods(["GET"])
 def obtener_lectura(request):
-    """Obtiene una sola lectura actual"""
-    global lectura_activa, grabacion_activa
+    """
+    Obtiene la lectura actual del sector: la última muestra del thread de
+    adquisición de su Arduino.
+    
+    No toca el puerto serial, así que cualquier cantidad de pestañas puede
+    hacer polling sin generar tráfico extra hacia el Arduino.
+    """
+    dispositivo = gestor_serial.para_sector(request.GET.get('sector_id'))
     
-    if not lectura_activa:
+    if dispositivo is None or not dispositivo.activo:
         return JsonResponse({'error': 'Sensores no activos'}, status=400)
     
-    datos = leer_datos_arduino()
+    datos = dispositivo.ultima_lectura()
     
     if datos:
-        sector_id = request.GET.get('sector_id')
-        
-        # Si está grabando, guardar Y enviar a cloud
-        if grabacion_activa and sector_id:
-            marca_tiempo = timezone.now()
-            
-            # Guardar local
-            guardar_lectura_local(datos, sector_id, marca_tiempo)
-            
-            # Enviar a cloud
-            if settings.IS_LOCAL and enviar_a_nube_ws_sync:
-                enviar_a_nube_ws_sync(datos, sector_id, marca_tiempo)
-        
         return JsonResponse(datos)
     else:
         return JsonResponse({'error': 'Sin datos'}, status=503)
+
+
+def grabar_muestra(dispositivo, datos, marca_tiempo):
+    """
+    Suscriptor de gestor_serial: mientras la grabación del sector está
+    activa, guarda cada muestra y la envía al cloud (una vez por muestra,
+    sin importar cuántos navegadores estén mirando).
+    
+    Corre en el thread de cada puerto, así que los Arduinos se graban en
+    paralelo.
+    """
+    sector_id = dispositivo.sector_grabacion
+    if sector_id is None:
+        return
+    
+    # Guardar local
+    guardar_lectura_local(datos, sector_id, marca_tiempo)
     
+    # Enviar a cloud
+    if settings.IS_LOCAL and enviar_a_nube_ws_sync:
+        enviar_a_nube_ws_sync(datos, sector_id, marca_tiempo)
+
+
+gestor_serial.suscribir(grabar_muestra)
+
 
 def guardar_lectura_local(datos, sector_id, marca_tiempo=None):
     """
     Guarda lecturas en la base de datos LOCAL.
     
-    Sin cambios - mantiene compatibilidad.
+    En LOCAL también agrega la lectura al outbox persistente, de donde el
+    cliente WebSocket la sube al cloud (aunque ahora no haya conexión).
     """
     try:
-        from dashboard.models import (
-            Sector, HistorialTemperatura, HistorialSalinidad,
-            HistorialPh, HistorialTurbidez, HistorialHumedad
-        )
-        
-        sector = Sector.objects.get(id=sector_id)
-        
         # Usar timestamp proporcionado o generar uno nuevo
         if marca_tiempo is None:
             marca_tiempo = timezone.now()
         
-        guardados = 0
-        
-        if datos.get('temperatura') is not None and datos['temperatura'] != -999:
-            HistorialTemperatura.objects.create(
-                sector=sector, valor=datos['temperatura'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        if datos.get('ph') is not None:
-            HistorialPh.objects.create(
-                sector=sector, valor=datos['ph'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
-        
-        if datos.get('turbidez') is not None:
-            HistorialTurbidez.objects.create(
-                sector=sector, valor=datos['turbidez'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
+        # Una sola fila en Lectura con todas las métricas
+        lectura = normalizar_lectura(dict(datos, sector_id=sector_id, marca_tiempo=marca_tiempo))
+        error = escribir_lecturas([lectura])[0]
+        if error:
+            print(f"❌ {error} en local")
+            return False
         
-        if datos.get('humedad') is not None:
-            HistorialHumedad.objects.create(
-                sector=sector, valor=datos['humedad'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
+        guardados = sum(1 for campo in Lectura.METRICAS if lectura[campo] is not None)
+        print(f"💾 {guardados} lecturas guardadas en local")
         
-        if datos.get('salinidad') is not None:
-            HistorialSalinidad.objects.create(
-                sector=sector, valor=datos['salinidad'], marca_tiempo=marca_tiempo
-            )
-            guardados += 1
+        if settings.IS_LOCAL:
+            outbox_local.agregar(construir_payload(datos, sector_id, marca_tiempo))
         
-        print(f"💾 {guardados} lecturas guardadas en local")
         return True
         
-    except Sector.DoesNotExist:
-        print(f"❌ Sector {sector_id} no existe en local")
+    except ValueError as e:
+        print(f"❌ Lectura inválida: {e}")
         return False
     except Exception as e:
         print(f"❌ Error al guardar local: {e}")
@@ -637,52 +659,167 @@ def enviar_a_nube(datos, sector_id, marca_tiempo=None):
     
 @login_required
 def exportar_csv(request, sector_id):
+    """
+    Descargar las lecturas del sector en CSV (streaming).
+    
+    GET params: fecha_inicio, fecha_fin (como sector_detail), gzip=1 para
+    recibir el archivo comprimido (.csv.gz).
+    """
     sector = Sector.objects.get(id=sector_id)
     
     # Filtros de fecha (igual que sector_detail)
-    fecha_inicio = request.GET.get('fecha_inicio')
-    fecha_fin = request.GET.get('fecha_fin')
+    fecha_inicio, fecha_fin = rango_fechas(request)
     
-    if not fecha_inicio or not fecha_fin:
-        fecha_fin = timezone.now()
-        fecha_inicio = fecha_fin - timedelta(hours=24)
+    # Una fila por marca de tiempo, leída en bloques y escrita a medida que sale
+    lecturas = lecturas_a_exportar(sector.id, fecha_inicio, fecha_fin)
+    partes = csv_streaming(lecturas)
+    
+    if request.GET.get('gzip') == '1':
+        response = StreamingHttpResponse(gzip_streaming(partes), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="sector_{sector_id}_datos.csv.gz"'
     else:
-        fecha_inicio = timezone.make_aware(datetime.strptime(fecha_inicio, '%Y-%m-%dT%H:%M'))
-        fecha_fin = timezone.make_aware(datetime.strptime(fecha_fin, '%Y-%m-%dT%H:%M'))
+        response = StreamingHttpResponse(partes, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="sector_{sector_id}_datos.csv"'
     
-    # Obtener datos
-    temperaturas = sector.temperaturas.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    ).order_by('-marca_tiempo')
-    
-    ph_dict = {r.marca_tiempo: r for r in sector.ph_registros.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    )}
-    turb_dict = {r.marca_tiempo: r for r in sector.turbideces.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    )}
-    hum_dict = {r.marca_tiempo: r for r in sector.humedades.filter(
-        marca_tiempo__gte=fecha_inicio, marca_tiempo__lte=fecha_fin
-    )}
-    
-    # Crear CSV
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="sector_{sector_id}_datos.csv"'
-    
-    # Agregar BOM para UTF-8
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    writer.writerow(['Fecha', 'Hora', 'Temperatura (°C)', 'pH', 'Turbidez (NTU)', 'Humedad (%)'])
-    
-    for temp in temperaturas:
-        writer.writerow([
-            temp.marca_tiempo.strftime('%d/%m/%Y'),
-            temp.marca_tiempo.strftime('%H:%M:%S'),
-            temp.valor,
-            ph_dict.get(temp.marca_tiempo).valor if temp.marca_tiempo in ph_dict else '',
-            turb_dict.get(temp.marca_tiempo).valor if temp.marca_tiempo in turb_dict else '',
-            hum_dict.get(temp.marca_tiempo).valor if temp.marca_tiempo in hum_dict else '',
-        ])
-    
-    return response
\ No newline at end of file
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def exportar_columnar(request, sector_id):
+    """
+    Descargar el historial del sector en formato columnar para análisis.
+    
+    GET params: fecha_inicio, fecha_fin (como sector_detail),
+    formato=parquet|arrow|npz (por defecto parquet, o npz sin pyarrow).
+    """
+    sector = Sector.objects.get(id=sector_id)
+    formato = request.GET.get('formato') or formato_por_defecto()
+    
+    try:
+        fecha_inicio, fecha_fin = rango_fechas(request)
+        # Parquet/Arrow necesitan el pie del archivo al final: se escribe a
+        # disco y después se envía por partes
+        archivo = tempfile.TemporaryFile()
+        try:
+            filas = escribir_columnar(archivo, formato, sector.id, fecha_inicio, fecha_fin)
+        except Exception:
+            archivo.close()
+            raise
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    archivo.seek(0)
+    extension, content_type = FORMATOS_COLUMNARES[formato]
+    
+    response = StreamingHttpResponse(archivo_streaming(archivo), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="sector_{sector_id}_datos{extension}"'
+    response['X-Lecturas'] = str(filas)
+    return response
+
+
+def _estado_exportacion(trabajo):
+    estado = {
+        'id': trabajo.id,
+        'estado': trabajo.estado,
+        'formato': trabajo.formato,
+        'sectores': sorted(trabajo.sectores.values_list('id', flat=True)),
+        'desde': trabajo.desde.isoformat(),
+        'hasta': trabajo.hasta.isoformat(),
+        'partes_totales': trabajo.partes_totales,
+        'partes_completadas': trabajo.partes_completadas,
+        'progreso': trabajo.progreso,
+        'lecturas': trabajo.lecturas,
+        'error': trabajo.error or None,
+        'descarga': None,
+    }
+    if trabajo.estado == 'completado' and trabajo.archivo:  # Sin archivo: vencido
+        estado['descarga'] = reverse('descargar_exportacion', args=[trabajo.id])
+    return estado
+
+
+@login_required
+@require_http_methods(["POST"])
+def crear_exportacion(request):
+    """
+    Crear un trabajo de exportación de varios sectores (corre en segundo plano).
+    
+    POST params: sectores (ids separados por coma) o zona (id),
+    fecha_inicio, fecha_fin (como sector_detail), formato=csv|parquet|arrow|npz.
+    
+    Responde 202 con el estado del trabajo; consultar la URL de `estado`
+    hasta que sea 'completado' y descargar desde `descarga`.
+    """
+    formato = request.POST.get('formato') or 'csv'
+    if formato != 'csv' and formato not in formatos_disponibles():
+        return JsonResponse({'error': f'Formato no disponible: {formato}'}, status=400)
+    
+    try:
+        fecha_inicio, fecha_fin = rango_fechas(request)
+        if request.POST.get('zona'):
+            zona = Zona.objects.get(id=int(request.POST['zona']))
+            sectores = list(zona.sectores.all())
+        else:
+            zona = None
+            ids = [int(valor) for valor in request.POST.get('sectores', '').split(',') if valor.strip()]
+            sectores = list(Sector.objects.filter(id__in=ids))
+            if len(sectores) != len(set(ids)):
+                return JsonResponse({'error': 'Sector inexistente'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Zona.DoesNotExist:
+        return JsonResponse({'error': 'Zona inexistente'}, status=404)
+    
+    if not sectores:
+        return JsonResponse({'error': 'Indicar sectores o una zona con sectores'}, status=400)
+    if fecha_inicio > fecha_fin:
+        return JsonResponse({'error': 'fecha_inicio debe ser anterior a fecha_fin'}, status=400)
+    
+    trabajo = ExportacionTrabajo.objects.create(
+        usuario=request.user,
+        zona=zona,
+        formato=formato,
+        desde=fecha_inicio,
+        hasta=fecha_fin,
+    )
+    trabajo.sectores.set(sectores)
+    lanzar_exportacion(trabajo)
+    
+    estado = _estado_exportacion(trabajo)
+    estado['estado_url'] = reverse('estado_exportacion', args=[trabajo.id])
+    return JsonResponse(estado, status=202)
+
+
+@login_required
+@require_http_methods(["GET"])
+def estado_exportacion(request, trabajo_id):
+    """Estado y progreso de un trabajo de exportación (para polling)"""
+    try:
+        trabajo = ExportacionTrabajo.objects.get(id=trabajo_id, usuario=request.user)
+    except ExportacionTrabajo.DoesNotExist:
+        return JsonResponse({'error': 'Trabajo inexistente'}, status=404)
+    
+    return JsonResponse(_estado_exportacion(trabajo))
+
+
+@login_required
+@require_http_methods(["GET"])
+def descargar_exportacion(request, trabajo_id):
+    """Descargar el .zip de un trabajo completado"""
+    try:
+        trabajo = ExportacionTrabajo.objects.get(id=trabajo_id, usuario=request.user)
+    except ExportacionTrabajo.DoesNotExist:
+        return JsonResponse({'error': 'Trabajo inexistente'}, status=404)
+    
+    if trabajo.estado != 'completado':
+        return JsonResponse({'error': 'El trabajo no está completado', 'estado': trabajo.estado}, status=409)
+    
+    try:
+        archivo = open(trabajo.archivo, 'rb')
+    except FileNotFoundError:
+        return JsonResponse({'error': 'El archivo ya no existe'}, status=410)
+    
+    response = StreamingHttpResponse(archivo_streaming(archivo), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="exportacion_{trabajo.id}_{trabajo.formato}.zip"'
+    response['Content-Length'] = str(os.fstat(archivo.fileno()).st_size)
+    return response
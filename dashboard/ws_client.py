@@ -5,9 +5,17 @@ Este módulo reemplaza la función enviar_a_nube() que usaba REST.
 
 Características:
 - Conexión persistente
-- Reconexión automática
+- Reconexión automática (sin límite de intentos, con backoff)
 - Manejo de errores
 - Heartbeat para mantener conexión viva
+- Envío de lotes con un solo ack (send_sensor_batch)
+- Ventana de envío: muchos frames en vuelo, cada lectura con su número de
+  secuencia; un lector en segundo plano empareja los acks y solo se
+  reenvían las lecturas sin ack
+- Drenado en orden del outbox persistente (drenar_outbox)
+- Frames binarios compactos (MessagePack, ver dashboard.protocolo) con
+  CLOUD_WS_FORMATO=msgpack; si el cloud no acepta el subprotocolo se
+  sigue en JSON
 
 Uso:
     from ws_client import sensor_ws_client
@@ -25,9 +33,15 @@ import asyncio
 import websockets
 import json
 import logging
-from typing import Optional, Dict, Any
+import uuid
+from typing import Optional, Dict, Any, List, Tuple
 from django.conf import settings
+import queue
 import threading
+import time
+
+from dashboard.outbox import outbox_local, construir_payload
+from dashboard.protocolo import SUBPROTOCOLO, codificar, decodificar
 
 logger = logging.getLogger(__name__)
 
@@ -45,12 +59,45 @@ class SensorWebSocketClient:
         
         self.connected: bool = False
         self.reconnect_interval: int = 5  # segundos
-        self.max_reconnect_attempts: int = 10
+        self.max_reconnect_interval: int = 60  # segundos (tope del backoff)
         self.heartbeat_interval: int = 30  # segundos
+        self.batch_ack_timeout: float = 30.0  # segundos sin ack antes de reenviar una lectura
+        self.ventana: int = settings.UPLINK_VENTANA  # lecturas en vuelo (enviadas sin ack)
+        
+        # Frames en MessagePack (se confirma en el handshake de cada conexión)
+        self.binario: bool = False
         
-        # Task para mantener la conexión
-        self.connection_task: Optional[asyncio.Task] = None
+        # Tasks de heartbeat, lector de acks y reintentos
         self.heartbeat_task: Optional[asyncio.Task] = None
+        self.lector_task: Optional[asyncio.Task] = None
+        self.reintentos_task: Optional[asyncio.Task] = None
+        
+        # Event loop donde se creó el websocket (no se puede usar desde otro)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Lecturas enviadas esperando ack: seq -> {'payload', 'vence', 'intentos', 'futuro'}
+        self._en_vuelo: Dict[int, Dict[str, Any]] = {}
+        self._hay_espacio: Optional[asyncio.Event] = None
+        self._sin_pendientes: Optional[asyncio.Event] = None
+        
+        # Lotes enviados esperando ack: lote_id -> momento del envío
+        self._lotes_en_vuelo: Dict[str, float] = {}
+        
+        # Secuencia para lecturas que no vienen del outbox (negativa, no choca con sus ids)
+        self._seq_local: int = 0
+        
+        # Mayor id del outbox que ya subió drenar_outbox()
+        self.ultimo_id_drenado: int = 0
+        
+        # Métricas de envío
+        self.lotes_enviados: int = 0
+        self.lecturas_enviadas: int = 0
+        self.lecturas_confirmadas: int = 0
+        self.lecturas_reenviadas: int = 0
+        self.lotes_confirmados: int = 0
+        self.ultima_latencia_ms: float = 0.0
+        self.latencia_maxima_ms: float = 0.0
+        self._latencia_total_ms: float = 0.0
     
     def _build_url(self) -> str:
         # Obtener URL del WebSocket
@@ -89,20 +136,36 @@ class SensorWebSocketClient:
         try:
             logger.info(f"🔌 Intentando conectar a: {self.url.split('?')[0]}...")
             
+            pedir_binario = settings.CLOUD_WS_FORMATO == 'msgpack'
+            
             self.websocket = await websockets.connect(
                 self.url,
+                subprotocols=[SUBPROTOCOLO] if pedir_binario else None,
                 ping_interval=20,  # Enviar ping cada 20s
                 ping_timeout=10,   # Timeout de pong
                 close_timeout=10   # Timeout para cerrar
             )
             
+            # Un cloud que no conoce el subprotocolo no lo confirma: seguir en JSON
+            self.binario = self.websocket.subprotocol == SUBPROTOCOLO
+            if pedir_binario and not self.binario:
+                logger.warning("⚠️ El cloud no aceptó MessagePack, se usa JSON")
+            
             self.connected = True
-            logger.info("✅ WebSocket conectado al cloud")
+            self._loop = asyncio.get_running_loop()
+            logger.info(f"✅ WebSocket conectado al cloud ({'msgpack' if self.binario else 'json'})")
+            
+            # Ventana vacía al empezar cada conexión
+            self._hay_espacio = asyncio.Event()
+            self._hay_espacio.set()
+            self._sin_pendientes = asyncio.Event()
+            self._sin_pendientes.set()
             
-            # Iniciar heartbeat
-            if self.heartbeat_task:
-                self.heartbeat_task.cancel()
+            # Iniciar heartbeat, lector de acks y reintentos
+            self._cancelar_tareas()
             self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            self.lector_task = asyncio.create_task(self._leer_respuestas(self.websocket))
+            self.reintentos_task = asyncio.create_task(self._reintentar_vencidas())
             
             return True
             
@@ -119,15 +182,22 @@ class SensorWebSocketClient:
             self.connected = False
             return False
     
+    def _cancelar_tareas(self):
+        for tarea in (self.heartbeat_task, self.lector_task, self.reintentos_task):
+            if tarea and tarea is not asyncio.current_task():
+                tarea.cancel()
+        self.heartbeat_task = None
+        self.lector_task = None
+        self.reintentos_task = None
+    
     async def disconnect(self):
         """Cerrar conexión WebSocket de forma limpia"""
         
         self.connected = False
         
-        # Cancelar heartbeat
-        if self.heartbeat_task:
-            self.heartbeat_task.cancel()
-            self.heartbeat_task = None
+        # Cancelar heartbeat, lector y reintentos
+        self._cancelar_tareas()
+        self._descartar_en_vuelo()
         
         # Cerrar websocket
         if self.websocket:
@@ -146,7 +216,7 @@ class SensorWebSocketClient:
             try:
                 await asyncio.sleep(self.heartbeat_interval)
                 
-                if self.websocket and not self.websocket.closed:
+                if self.websocket:
                     # Enviar ping
                     pong = await self.websocket.ping()
                     await asyncio.wait_for(pong, timeout=10)
@@ -159,107 +229,333 @@ class SensorWebSocketClient:
                 self.connected = False
                 break
     
-    async def send_sensor_data(self, data: Dict[str, Any]) -> bool:
+    async def _asegurar_conexion(self) -> bool:
+        """Conectar si no hay conexión o si el websocket pertenece a otro event loop"""
+        if self.connected and self.websocket and self._loop is asyncio.get_running_loop():
+            return True
+        
+        logger.warning("⚠️ No hay conexión WebSocket, intentando reconectar...")
+        self._cancelar_tareas()
+        self._descartar_en_vuelo()
+        success = await self.connect()
+        if not success:
+            logger.error("❌ No se pudo establecer conexión")
+        return success
+    
+    # ------------------------------------------------------------------
+    # Ventana de envío: muchos frames en vuelo, acks por número de secuencia
+    # ------------------------------------------------------------------
+    
+    def _siguiente_seq_local(self) -> int:
+        self._seq_local -= 1
+        return self._seq_local
+    
+    def _descartar_en_vuelo(self):
         """
-        Enviar datos de sensores al cloud.
+        Olvidar lo que estaba en vuelo (la conexión se perdió).
+        
+        Las lecturas del outbox siguen ahí y se vuelven a subir al drenarlo;
+        quien esperaba un resultado recibe None.
+        """
+        for entrada in self._en_vuelo.values():
+            futuro = entrada.get('futuro')
+            if futuro and not futuro.done():
+                futuro.set_result(None)
+        self._en_vuelo.clear()
+        self._lotes_en_vuelo.clear()
+        
+        if self._hay_espacio:
+            self._hay_espacio.set()
+        if self._sin_pendientes:
+            self._sin_pendientes.set()
+    
+    async def _enviar_frame(self, lecturas: List[Tuple[int, Dict[str, Any]]]) -> bool:
+        """Mandar un frame de lote con el seq de cada lectura (sin esperar el ack)"""
+        lote_id = uuid.uuid4().hex[:12]
+        lote = {
+            'tipo': 'lote',
+            'lote_id': lote_id,
+            'lecturas': [dict(payload, seq=seq) for seq, payload in lecturas]
+        }
+        
+        try:
+            await self.websocket.send(codificar(lote) if self.binario else json.dumps(lote))
+        except websockets.exceptions.ConnectionClosed:
+            logger.error("❌ Conexión cerrada al enviar lote")
+            self.connected = False
+            return False
+        except Exception as e:
+            logger.error(f"❌ Error al enviar lote: {e}")
+            return False
+        
+        self._lotes_en_vuelo[lote_id] = time.perf_counter()
+        self.lotes_enviados += 1
+        self.lecturas_enviadas += len(lecturas)
+        logger.debug(f"📤 Lote {lote_id} enviado al cloud: {len(lecturas)} lecturas")
+        return True
+    
+    async def enviar_lecturas(
+        self,
+        lecturas: List[Tuple[int, Dict[str, Any]]],
+        futuros: Optional[Dict[int, asyncio.Future]] = None
+    ) -> bool:
+        """
+        Poner lecturas (seq, payload) en vuelo sin esperar el ack.
+        
+        Solo se bloquea si la ventana está llena. El lector de respuestas
+        confirma cada seq en el outbox cuando llega su ack, y las que no
+        tienen ack después de batch_ack_timeout se reenvían solas.
         
         Args:
-            data: Diccionario con los datos del sensor
-                {
-                    'sector_id': int,
-                    'temperatura': float,
-                    'ph': float,
-                    'turbidez': float,
-                    'humedad': float,
-                    'salinidad': float,
-                    'marca_tiempo': str (ISO format)
-                }
+            lecturas: Lista de (seq, payload); seq es el id del outbox
+            futuros: seq -> futuro a resolver con el resultado de esa lectura
         
         Returns:
-            bool: True si se envió correctamente
+            bool: True si quedaron en vuelo
         """
+        if not await self._asegurar_conexion():
+            return False
         
-        # Verificar conexión
-        if not self.connected or not self.websocket:
-            logger.warning("⚠️ No hay conexión WebSocket, intentando reconectar...")
-            success = await self.connect()
-            if not success:
-                logger.error("❌ No se pudo establecer conexión")
+        for desde in range(0, len(lecturas), settings.OUTBOX_TAMANO_LOTE):
+            trozo = lecturas[desde:desde + settings.OUTBOX_TAMANO_LOTE]
+            
+            # Esperar lugar en la ventana
+            while len(self._en_vuelo) >= self.ventana:
+                self._hay_espacio.clear()
+                await self._hay_espacio.wait()
+                if not self.connected:
+                    return False
+            
+            vence = asyncio.get_running_loop().time() + self.batch_ack_timeout
+            for seq, payload in trozo:
+                self._en_vuelo[seq] = {
+                    'payload': payload,
+                    'vence': vence,
+                    'intentos': 1,
+                    'futuro': futuros.get(seq) if futuros else None,
+                }
+            self._sin_pendientes.clear()
+            
+            if not await self._enviar_frame(trozo):
                 return False
         
+        return True
+    
+    async def _leer_respuestas(self, websocket):
+        """Único lector del websocket: empareja cada ack con su número de secuencia"""
         try:
-            # Convertir a JSON
-            json_data = json.dumps(data)
-            
-            # Enviar datos
-            await self.websocket.send(json_data)
-            logger.info(f"📤 Datos enviados al cloud: sector={data.get('sector_id')}")
-            
-            # Esperar confirmación (opcional, con timeout)
-            try:
-                response = await asyncio.wait_for(
-                    self.websocket.recv(),
-                    timeout=5.0
-                )
-                response_data = json.loads(response)
+            async for mensaje in websocket:
+                try:
+                    if isinstance(mensaje, bytes):
+                        respuesta = decodificar(mensaje)
+                    else:
+                        respuesta = json.loads(mensaje)
+                except ValueError:
+                    logger.warning(f"⚠️ Respuesta inválida del cloud: {mensaje!r}")
+                    continue
                 
-                if response_data.get('status') == 'success':
-                    logger.info("✅ Cloud confirmó recepción")
-                    return True
+                if respuesta.get('tipo') == 'ack_lote':
+                    await self._procesar_ack(respuesta.get('lote_id'), respuesta.get('resultados') or [])
+                elif respuesta.get('seq') is not None:
+                    # Ack de una lectura suelta
+                    await self._procesar_ack(None, [{
+                        'seq': respuesta['seq'],
+                        'aceptada': respuesta.get('status') == 'success',
+                        'error': respuesta.get('mensaje'),
+                        'reintentar': False,
+                    }])
                 else:
-                    logger.warning(f"⚠️ Cloud respondió: {response_data}")
-                    return True  # Aún así retornar True porque se envió
-                    
-            except asyncio.TimeoutError:
-                logger.warning("⏱️ Timeout esperando confirmación (datos probablemente recibidos)")
-                return True
-            
+                    logger.warning(f"⚠️ Cloud respondió: {respuesta}")
+        
+        except asyncio.CancelledError:
+            raise
         except websockets.exceptions.ConnectionClosed:
-            logger.error("❌ Conexión cerrada al enviar datos")
-            self.connected = False
-            return False
-            
+            logger.warning("🔌 El cloud cerró la conexión")
         except Exception as e:
-            logger.error(f"❌ Error al enviar datos: {e}")
-            return False
+            logger.error(f"❌ Error leyendo respuestas del cloud: {e}")
+        
+        if websocket is self.websocket:
+            self.connected = False
+            self._descartar_en_vuelo()
     
-    async def maintain_connection(self):
+    async def _procesar_ack(self, lote_id: Optional[str], resultados: List[Dict[str, Any]]):
         """
-        Mantener la conexión activa con reconexión automática.
+        Sacar de la ventana las lecturas con ack y borrarlas del outbox.
         
-        Este método debe ejecutarse en un bucle de eventos separado.
+        El borrado (DELETE + commit en SQLite) va en un thread aparte: en el
+        event loop trabaría el envío y la lectura de los demás acks. Mientras
+        tanto las lecturas siguen en la ventana: así nadie las vuelve a sacar
+        del outbox para reenviarlas antes de que estén borradas.
         """
+        enviado = self._lotes_en_vuelo.pop(lote_id, None)
+        if enviado is not None:
+            latencia_ms = (time.perf_counter() - enviado) * 1000
+            self.lotes_confirmados += 1
+            self.ultima_latencia_ms = latencia_ms
+            self.latencia_maxima_ms = max(self.latencia_maxima_ms, latencia_ms)
+            self._latencia_total_ms += latencia_ms
         
-        attempt = 0
+        cerradas = []
+        ahora = self._loop.time()
         
-        while attempt < self.max_reconnect_attempts:
-            if not self.connected:
-                logger.info(f"🔄 Intento de reconexión {attempt + 1}/{self.max_reconnect_attempts}")
+        for resultado in resultados:
+            seq = resultado.get('seq')
+            entrada = self._en_vuelo.get(seq)
+            if entrada is None:
+                continue  # Ack duplicado o de una conexión anterior
+            
+            if not resultado.get('aceptada') and resultado.get('reintentar'):
+                # Error transitorio en el cloud: reenviar más tarde
+                entrada['vence'] = ahora + self.reconnect_interval
+                continue
+            
+            if not resultado.get('aceptada'):
+                logger.warning(f"⚠️ Lectura {seq} rechazada por el cloud: {resultado.get('error')}")
+            cerradas.append((seq, resultado))
+        
+        # Aceptadas o rechazadas de forma definitiva: ya no hace falta guardarlas
+        borrar = [seq for seq, _ in cerradas if seq > 0]
+        if borrar:
+            self.lecturas_confirmadas += await asyncio.to_thread(outbox_local.confirmar, borrar)
+        
+        for seq, resultado in cerradas:
+            # Si la conexión se perdió durante el borrado la ventana ya está vacía
+            entrada = self._en_vuelo.pop(seq, None)
+            if entrada and entrada['futuro'] and not entrada['futuro'].done():
+                entrada['futuro'].set_result(resultado)
+        
+        if len(self._en_vuelo) < self.ventana:
+            self._hay_espacio.set()
+        if not self._en_vuelo:
+            self._sin_pendientes.set()
+    
+    async def _reintentar_vencidas(self):
+        """Reenviar solo las lecturas cuyo ack no llegó a tiempo"""
+        while self.connected:
+            try:
+                await asyncio.sleep(1)
                 
-                success = await self.connect()
+                ahora = asyncio.get_running_loop().time()
+                vencidas = [
+                    (seq, entrada) for seq, entrada in self._en_vuelo.items()
+                    if entrada['vence'] <= ahora
+                ]
+                if not vencidas:
+                    continue
                 
-                if success:
-                    attempt = 0  # Resetear contador
-                    logger.info("✅ Reconexión exitosa")
-                else:
-                    attempt += 1
-                    await asyncio.sleep(self.reconnect_interval)
-            else:
-                # Conexión activa, esperar un poco
-                await asyncio.sleep(1)
-        
-        logger.error(f"❌ Máximo de intentos de reconexión alcanzado")
+                logger.warning(f"⏱️ {len(vencidas)} lecturas sin ack, reenviando")
+                for _, entrada in vencidas:
+                    entrada['vence'] = ahora + self.batch_ack_timeout
+                    entrada['intentos'] += 1
+                self.lecturas_reenviadas += len(vencidas)
+                
+                for desde in range(0, len(vencidas), settings.OUTBOX_TAMANO_LOTE):
+                    trozo = vencidas[desde:desde + settings.OUTBOX_TAMANO_LOTE]
+                    if not await self._enviar_frame([(seq, entrada['payload']) for seq, entrada in trozo]):
+                        break
+            
+            except asyncio.CancelledError:
+                break
+    
+    async def esperar_acks(self, timeout: Optional[float] = None) -> bool:
+        """Esperar a que no quede nada en vuelo. Retorna False si venció el timeout"""
+        if not self._sin_pendientes:
+            return True
+        try:
+            await asyncio.wait_for(self._sin_pendientes.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
     
-    def start_background_task(self):
+    async def send_sensor_data(self, data: Dict[str, Any]) -> bool:
         """
-        Iniciar tarea en background para mantener conexión.
+        Enviar datos de sensores al cloud.
+        
+        No espera el ack: la lectura queda en la ventana y el lector de
+        respuestas la da por confirmada (o la reenvía) cuando corresponda.
+        
+        Args:
+            data: Diccionario con los datos del sensor
+                {
+                    'sector_id': int,
+                    'temperatura': float,
+                    'ph': float,
+                    'turbidez': float,
+                    'humedad': float,
+                    'salinidad': float,
+                    'marca_tiempo': str (ISO format)
+                }
         
-        Llamar esto al iniciar la aplicación LOCAL.
+        Returns:
+            bool: True si se envió correctamente
         """
-        if not self.connection_task or self.connection_task.done():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            self.connection_task = loop.create_task(self.maintain_connection())
+        enviado = await self.enviar_lecturas([(self._siguiente_seq_local(), data)])
+        if enviado:
+            logger.info(f"📤 Datos enviados al cloud: sector={data.get('sector_id')}")
+        return enviado
+
+    async def send_sensor_batch(self, lecturas: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Enviar varias lecturas y esperar el resultado de cada una.
+
+        Args:
+            lecturas: Lista de payloads con el mismo formato que send_sensor_data
+
+        Returns:
+            list: Resultados por lectura ({'seq', 'aceptada', 'error', 'reintentar'})
+                  o None si se perdió la conexión antes de tener todos los acks
+        """
+        if not await self._asegurar_conexion():
+            return None
+
+        pares = [(self._siguiente_seq_local(), payload) for payload in lecturas]
+        futuros = {seq: asyncio.get_running_loop().create_future() for seq, _ in pares}
+        if not await self.enviar_lecturas(pares, futuros):
+            return None
+
+        resultados = await asyncio.gather(*futuros.values())
+        if any(resultado is None for resultado in resultados):
+            return None
+        return list(resultados)
+
+    async def drenar_outbox(self) -> int:
+        """
+        Subir al cloud, en orden, todo lo pendiente del outbox.
+        
+        Llena la ventana sin esperar acks entre lotes y al final espera a
+        que llegue el ack de todo lo enviado. El lector de respuestas borra
+        del outbox lo aceptado y lo rechazado de forma definitiva (p.ej.
+        sector inexistente en el cloud); lo que el cloud pide reintentar se
+        reenvía solo.
+        
+        Returns:
+            int: Cantidad de lecturas confirmadas
+        """
+        confirmadas_antes = self.lecturas_confirmadas
+        cursor = 0
+        
+        while True:
+            pendientes = outbox_local.pendientes(limite=settings.OUTBOX_TAMANO_LOTE, despues_de=cursor)
+            if not pendientes:
+                break
+            cursor = pendientes[-1][0]
+            
+            # Lo que ya está en vuelo no se vuelve a mandar
+            nuevas = [(id_, payload) for id_, payload in pendientes if id_ not in self._en_vuelo]
+            if nuevas and not await self.enviar_lecturas(nuevas):
+                # Sin conexión: todo sigue en el outbox para el próximo intento
+                break
+            self.ultimo_id_drenado = max(self.ultimo_id_drenado, cursor)
+        
+        if self.connected:
+            await self.esperar_acks(timeout=self.batch_ack_timeout)
+        if not self._en_vuelo:
+            outbox_local.compactar()
+        
+        confirmadas = self.lecturas_confirmadas - confirmadas_antes
+        if confirmadas:
+            logger.info(f"📬 Outbox: {confirmadas} lecturas confirmadas por el cloud")
+        return confirmadas
 
 
 # ============================================================================
@@ -270,6 +566,153 @@ class SensorWebSocketClient:
 sensor_ws_client = SensorWebSocketClient()
 
 
+# ============================================================================
+# UPLINK WORKER (un solo thread dueño del event loop y del websocket)
+# ============================================================================
+
+class UplinkWorker:
+    """
+    Thread de larga vida que sube las lecturas al cloud.
+    
+    Es el único que usa el websocket de `cliente`, siempre desde su propio
+    event loop. Las vistas solo hacen un put en una cola thread-safe (vía la
+    suscripción al outbox), así que el costo por lectura es un queue.put().
+    
+    Flujo:
+    1. Al arrancar (y después de cada falla) drena el outbox completo
+    2. Luego toma lecturas de la cola en lotes y las pone en vuelo con
+       enviar_lecturas, sin esperar el ack del lote anterior
+    3. El lector de respuestas del cliente confirma en el outbox cada
+       lectura que el cloud aceptó y reenvía las que no tuvieron ack
+    """
+    
+    def __init__(self, cliente: SensorWebSocketClient):
+        self.cliente = cliente
+        self.cola: "queue.Queue[tuple]" = queue.Queue()
+        
+        self._thread: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+    
+    def iniciar(self):
+        """Arrancar el thread (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        outbox_local.suscribir(self.encolar)
+        self._detener.clear()
+        self._thread = threading.Thread(target=self._run, name='uplink-ws', daemon=True)
+        self._thread.start()
+        logger.info("🚀 Uplink worker iniciado")
+    
+    def detener(self):
+        """Pedir al thread que cierre el websocket y termine"""
+        self._detener.set()
+    
+    def encolar(self, outbox_id: int, payload: Dict[str, Any]):
+        """Agregar una lectura (ya guardada en el outbox) a la cola de envío"""
+        self.cola.put((outbox_id, payload))
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Profundidad de la cola, lecturas en vuelo y latencia de envío (envío → ack)"""
+        cliente = self.cliente
+        return {
+            'activo': bool(self._thread and self._thread.is_alive()),
+            'conectado': cliente.connected,
+            'en_cola': self.cola.qsize(),
+            'en_vuelo': len(cliente._en_vuelo),
+            'ventana': cliente.ventana,
+            'pendientes_outbox': outbox_local.tamano(),
+            'lotes_enviados': cliente.lotes_enviados,
+            'lecturas_enviadas': cliente.lecturas_enviadas,
+            'lecturas_confirmadas': cliente.lecturas_confirmadas,
+            'lecturas_reenviadas': cliente.lecturas_reenviadas,
+            'ultima_latencia_ms': round(cliente.ultima_latencia_ms, 1),
+            'latencia_maxima_ms': round(cliente.latencia_maxima_ms, 1),
+            'latencia_promedio_ms': round(
+                cliente._latencia_total_ms / cliente.lotes_confirmados if cliente.lotes_confirmados else 0.0, 1
+            ),
+        }
+    
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._bucle())
+        except Exception as e:
+            logger.exception(f"❌ Uplink worker terminó con error: {e}")
+        finally:
+            loop.run_until_complete(self.cliente.disconnect())
+            loop.close()
+    
+    def _tomar_lote(self) -> List[tuple]:
+        """Bloquea hasta 1 s esperando la primera lectura y junta las que ya estén en cola"""
+        try:
+            lote = [self.cola.get(timeout=1)]
+        except queue.Empty:
+            return []
+        
+        while len(lote) < settings.OUTBOX_TAMANO_LOTE:
+            try:
+                lote.append(self.cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+    
+    def _vaciar_cola(self):
+        """Descartar la cola: todo lo que hay en ella está también en el outbox"""
+        while True:
+            try:
+                self.cola.get_nowait()
+            except queue.Empty:
+                return
+    
+    async def _bucle(self):
+        attempt = 0
+        recuperar = True
+        
+        while not self._detener.is_set():
+            if not self.cliente.connected:
+                # Lo que estaba en vuelo se descartó: volver a subirlo desde el outbox
+                recuperar = True
+            
+            if not await self.cliente._asegurar_conexion():
+                attempt += 1
+                recuperar = True
+                espera = min(self.cliente.reconnect_interval * 2 ** (attempt - 1), self.cliente.max_reconnect_interval)
+                await asyncio.sleep(espera)
+                continue
+            attempt = 0
+            
+            if recuperar:
+                # Backlog: subir en orden lo que quedó en el outbox
+                self._vaciar_cola()
+                await self.cliente.drenar_outbox()
+                if outbox_local.tamano() > 0:
+                    await asyncio.sleep(self.cliente.reconnect_interval)
+                    continue
+                recuperar = False
+            
+            lote = await asyncio.to_thread(self._tomar_lote)
+            
+            # Lo que ya subió drenar_outbox (o sigue en vuelo) no se vuelve a mandar
+            lote = [
+                (id_, payload) for id_, payload in lote
+                if id_ > self.cliente.ultimo_id_drenado and id_ not in self.cliente._en_vuelo
+            ]
+            
+            if not lote:
+                # Sin lecturas nuevas: revisar si quedó algo rezagado en el outbox
+                recuperar = outbox_local.tamano() > len(self.cliente._en_vuelo)
+                continue
+            
+            # No esperar el ack: el lector de respuestas confirma en el outbox
+            if not await self.cliente.enviar_lecturas(lote):
+                recuperar = True
+
+
+uplink_worker = UplinkWorker(sensor_ws_client)
+
+
 # ============================================================================
 # HELPER FUNCTIONS (compatibilidad con código existente)
 # ============================================================================
@@ -288,28 +731,7 @@ async def enviar_a_nube_ws(datos: Dict[str, Any], sector_id: int, marca_tiempo=N
     Returns:
         bool: True si se envió correctamente
     """
-    from django.utils import timezone
-    
-    # Preparar timestamp
-    if marca_tiempo is None:
-        marca_tiempo = timezone.now()
-    
-    # Convertir a ISO string si es datetime
-    if hasattr(marca_tiempo, 'isoformat'):
-        marca_tiempo_str = marca_tiempo.isoformat()
-    else:
-        marca_tiempo_str = str(marca_tiempo)
-    
-    # Construir payload
-    payload = {
-        'sector_id': int(sector_id),
-        'temperatura': float(datos.get('temperatura')) if datos.get('temperatura') is not None else None,
-        'salinidad': float(datos.get('salinidad')) if datos.get('salinidad') is not None else None,
-        'ph': float(datos.get('ph')) if datos.get('ph') is not None else None,
-        'turbidez': float(datos.get('turbidez')) if datos.get('turbidez') is not None else None,
-        'humedad': float(datos.get('humedad')) if datos.get('humedad') is not None else None,
-        'marca_tiempo': marca_tiempo_str
-    }
+    payload = construir_payload(datos, sector_id, marca_tiempo)
     
     # Enviar vía WebSocket
     return await sensor_ws_client.send_sensor_data(payload)
@@ -321,24 +743,12 @@ async def enviar_a_nube_ws(datos: Dict[str, Any], sector_id: int, marca_tiempo=N
 
 def enviar_a_nube_ws_sync(datos, sector_id, marca_tiempo):
     """
-    Versión sincrónica que ejecuta el envío async en un thread separado.
+    Versión sincrónica para las vistas de Django.
     NO BLOQUEA el SSE stream.
-    """
-    def run_in_thread():
-        try:
-            # Crear nuevo loop para este thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Ejecutar la coroutine
-            loop.run_until_complete(enviar_a_nube_ws(datos, sector_id, marca_tiempo))
-            
-            loop.close()
-        except Exception as e:
-            print(f"❌ Error en thread async: {e}")
     
-    # Ejecutar en thread separado (fire-and-forget)
-    thread = threading.Thread(target=run_in_thread, daemon=True)
-    thread.start()
-    
-    return True  # Retornar inmediatamente sin esperar
\ No newline at end of file
+    La lectura ya quedó en el outbox (guardar_lectura_local), y el outbox
+    la pone en la cola del uplink worker; aquí solo se asegura que el
+    worker esté corriendo.
+    """
+    uplink_worker.iniciar()
+    return True  # Retornar inmediatamente sin esperar
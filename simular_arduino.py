@@ -10,7 +10,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bivalvia.settings')
 django.setup()
 
 from dashboard.views import guardar_lectura_local
-from dashboard.ws_client import sensor_ws_client, enviar_a_nube_ws
+from dashboard.ws_client import sensor_ws_client
 from django.conf import settings
 from dashboard.models import Sector
 
@@ -70,11 +70,13 @@ async def simular():
                 print("❌")
             
             if settings.IS_LOCAL:
+                # La lectura ya está en el outbox: subir todo lo pendiente
                 print(f"   ☁️  Cloud...", end=" ")
-                if await enviar_a_nube_ws(datos, sector_id, marca_tiempo):
-                    print("✅")
+                confirmadas = await sensor_ws_client.drenar_outbox()
+                if confirmadas:
+                    print(f"✅ ({confirmadas})")
                 else:
-                    print("❌")
+                    print("⏳ en outbox")
             
             contador += 1
             await asyncio.sleep(5)
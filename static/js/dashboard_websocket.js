@@ -7,11 +7,17 @@
  * Uso:
  * - Incluir este script en sector_detail.html
  * - Asegurar que sectorId esté definido en el template
+ * - En una vista de varios sectores (home) definir sectorIds en lugar de
+ *   sectorId: se usa un solo socket multiplexado (ws/dashboard/) suscripto
+ *   a todos, y cada card se busca por [data-sector-id]
  */
 
 class DashboardWebSocket {
-    constructor(sectorId) {
+    constructor(sectorId, sectores = null) {
         this.sectorId = sectorId;
+        this.sectores = sectores;  // Lista de ids => socket multiplexado
+        this.ultimaMarca = null;   // marca_tiempo de la última lectura recibida (resync)
+        this.siguientePedido = 1;
         this.ws = null;
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 10;
@@ -33,6 +39,9 @@ class DashboardWebSocket {
     getWebSocketUrl() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
         const host = window.location.host;
+        if (this.sectores) {
+            return `${protocol}//${host}/ws/dashboard/`;
+        }
         return `${protocol}//${host}/ws/dashboard/${this.sectorId}/`;
     }
 
@@ -40,7 +49,7 @@ class DashboardWebSocket {
      * Conectar al WebSocket
      */
     connect() {
-        console.log(`🔌 Conectando WebSocket para sector ${this.sectorId}...`);
+        console.log(`🔌 Conectando WebSocket para ${this.sectores ? this.sectores.length + ' sectores' : 'sector ' + this.sectorId}...`);
 
         const wsUrl = this.getWebSocketUrl();
 
@@ -52,6 +61,15 @@ class DashboardWebSocket {
                 console.log('✅ WebSocket conectado');
                 this.reconnectAttempts = 0;
 
+                // Suscribirse (también al reconectar). El servidor responde
+                // con un snapshot, así las cards quedan al día sin recargar
+                if (this.sectores) {
+                    this.send({ type: 'subscribe', sectores: this.sectores });
+                } else if (this.ultimaMarca) {
+                    // Reconexión: pedir solo lo que llegó mientras tanto
+                    this.send({ type: 'resync', id: this.siguientePedido++, sector_id: this.sectorId, desde: this.ultimaMarca });
+                }
+
                 // Iniciar heartbeat
                 this.startHeartbeat();
 
@@ -76,11 +94,41 @@ class DashboardWebSocket {
                             console.log(`✅ ${message.message}`);
                             break;
 
+                        case 'subscribed':
+                            console.log(`✅ Suscripto a ${message.sectores.length} sectores`);
+                            break;
+
                         case 'sensor_data':
                             // Datos de sensores
                             this.handleSensorData(message.data);
                             break;
 
+                        case 'snapshot':
+                            this.handleSnapshot(message.sectores);
+                            break;
+
+                        case 'resync':
+                            if (message.completo) {
+                                message.lecturas.forEach(lectura => this.handleSensorData(lectura));
+                            } else {
+                                // Demasiado atraso: traer la serie reducida
+                                this.requestHistory();
+                            }
+                            break;
+
+                        case 'history':
+                            if (typeof aplicarSerie === 'function') {
+                                aplicarSerie(message);
+                            }
+                            break;
+
+                        case 'pong':
+                            break;
+
+                        case 'error':
+                            console.warn('⚠️ Error del servidor:', message.error);
+                            break;
+
                         default:
                             console.log('Mensaje no reconocido:', message);
                     }
@@ -131,11 +179,24 @@ class DashboardWebSocket {
     handleSensorData(data) {
         console.log('📊 Datos de sensores:', data);
 
+        if (!this.sectores && data.marca_tiempo) {
+            this.ultimaMarca = data.marca_tiempo;
+        }
+
         // Callback personalizado
         if (this.onDataReceived) {
             this.onDataReceived(data);
         }
 
+        if (this.sectores) {
+            // Card del sector dentro de la vista general
+            const card = document.querySelector(`[data-sector-id="${data.sector_id}"]`);
+            if (card) {
+                this.updateCards(data, card);
+            }
+            return;
+        }
+
         // Actualizar cards
         this.updateCards(data);
 
@@ -146,12 +207,44 @@ class DashboardWebSocket {
     }
 
     /**
-     * Actualizar cards con nuevos valores
+     * Último valor de cada sector (al conectar o suscribirse)
+     */
+    handleSnapshot(sectores) {
+        Object.entries(sectores).forEach(([id, ultima]) => {
+            if (!ultima) return;
+
+            const raiz = this.sectores ? document.querySelector(`[data-sector-id="${id}"]`) : document;
+            if (raiz) {
+                this.updateCards(ultima, raiz);
+            }
+            if (!this.sectores && !this.ultimaMarca) {
+                this.ultimaMarca = ultima.marca_tiempo;
+            }
+        });
+    }
+
+    /**
+     * Pedir la serie del gráfico por el socket (agregados + LTTB en el servidor)
+     */
+    requestHistory(desde = null, hasta = null, puntos = null) {
+        const rango = typeof rangoGrafico !== 'undefined' ? rangoGrafico : {};
+        this.send({
+            type: 'request_history',
+            id: this.siguientePedido++,
+            sector_id: this.sectorId,
+            desde: desde || rango.desde,
+            hasta: hasta,  // null = ahora
+            puntos: puntos || rango.puntos
+        });
+    }
+
+    /**
+     * Actualizar cards con nuevos valores (dentro de `raiz`)
      */
-    updateCards(datos) {
+    updateCards(datos, raiz = document) {
         // Temperatura
         if (datos.temperatura !== null && datos.temperatura !== undefined) {
-            const tempElement = document.querySelector('[data-sensor="temperatura"]');
+            const tempElement = raiz.querySelector('[data-sensor="temperatura"]');
             if (tempElement) {
                 tempElement.textContent = `${datos.temperatura.toFixed(1)}°C`;
                 this.animateCard(tempElement);
@@ -160,7 +253,7 @@ class DashboardWebSocket {
 
         // pH
         if (datos.ph !== null && datos.ph !== undefined) {
-            const phElement = document.querySelector('[data-sensor="ph"]');
+            const phElement = raiz.querySelector('[data-sensor="ph"]');
             if (phElement) {
                 phElement.textContent = datos.ph.toFixed(2);
                 this.animateCard(phElement);
@@ -169,7 +262,7 @@ class DashboardWebSocket {
 
         // Turbidez
         if (datos.turbidez !== null && datos.turbidez !== undefined) {
-            const turbElement = document.querySelector('[data-sensor="turbidez"]');
+            const turbElement = raiz.querySelector('[data-sensor="turbidez"]');
             if (turbElement) {
                 turbElement.textContent = `${datos.turbidez.toFixed(1)} NTU`;
                 this.animateCard(turbElement);
@@ -178,7 +271,7 @@ class DashboardWebSocket {
 
         // Humedad
         if (datos.humedad !== null && datos.humedad !== undefined) {
-            const humElement = document.querySelector('[data-sensor="humedad"]');
+            const humElement = raiz.querySelector('[data-sensor="humedad"]');
             if (humElement) {
                 humElement.textContent = `${datos.humedad.toFixed(1)}%`;
                 this.animateCard(humElement);
@@ -187,7 +280,7 @@ class DashboardWebSocket {
 
         // Salinidad
         if (datos.salinidad !== null && datos.salinidad !== undefined) {
-            const salElement = document.querySelector('[data-sensor="salinidad"]');
+            const salElement = raiz.querySelector('[data-sensor="salinidad"]');
             if (salElement) {
                 salElement.textContent = `${datos.salinidad.toFixed(1)} PSU`;
                 this.animateCard(salElement);
@@ -199,6 +292,7 @@ class DashboardWebSocket {
      * Animar card cuando se actualiza
      */
     animateCard(element) {
+        element.classList.remove('hidden');
         element.classList.add('sensor-update');
         setTimeout(() => {
             element.classList.remove('sensor-update');
@@ -315,6 +409,9 @@ document.addEventListener('DOMContentLoaded', function () {
             dashboardWS.onDataReceived = function (data) {
                 console.log('📊 Callback: Datos recibidos', data);
             };
+        } else if (typeof sectorIds !== 'undefined') {
+            // Vista general: un socket para todos los sectores de la página
+            dashboardWS = new DashboardWebSocket(null, sectorIds);
         } else {
             console.error('❌ sectorId no está definido');
         }